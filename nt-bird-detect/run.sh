@@ -7,7 +7,7 @@
 #   ./run.sh test    # test monitor (test_audio1, 4-file batch)
 #
 # The ONLY difference between the two is NT_ENV, which config.py reads to pick the
-# monitor + DataLoad batch. Outputs are keyed by monitor, so a test run never
+# monitor(s) to process. Outputs are keyed by monitor, so a test run never
 # touches production folders. This script just orchestrates the existing scripts.
 
 set -euo pipefail
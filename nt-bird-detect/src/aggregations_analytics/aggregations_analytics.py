@@ -30,17 +30,34 @@ PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "../../")) # root dir of
 
 # Add src to path so we can import config and utils
 sys.path.append(os.path.join(PROJECT_ROOT, "src"))
-from config import PROCESSED_DATA_DIR, ANALYTICS_DATA_DIR, monitor_name
+from config import (RAW_DATA_DIR, PROCESSED_DATA_DIR, ANALYTICS_DATA_DIR, scheduled_monitors, gold_engine,
+                    gold_memory_limit)
 from utils.analytics_gold_utils import (
-    calculate_species_daily_profiles
+    build_gold_layer_duckdb,
+    build_gold_layer_pandas,
+    update_daily_summary
 )
+from utils.processing_silver_utils import discover_dataload_batches, read_detections
 
 # ==========================================
 # 3. Function to process recordings and create analytics
 # ==========================================
 
-def aggregations_analytics():
-    #monitor_name = "wrangcombe_audio1"
+def aggregations_analytics(engine=gold_engine, monitors=scheduled_monitors):
+    """
+    Builds the gold-layer outputs for every monitor run_audio_analysis
+    analyses, each into its own analytics folder.
+    """
+    for monitor_name in sorted({b[0] for b in discover_dataload_batches(RAW_DATA_DIR, monitors)}):
+        print(f"Building analytics for: {monitor_name}")
+        build_monitor_analytics(monitor_name, engine)
+
+
+def build_monitor_analytics(monitor_name, engine=gold_engine):
+    """
+    Builds the gold-layer outputs for one monitor, with DuckDB (default: one
+    out-of-core scan of the parquet files) or the original pandas groupbys.
+    """
     processed_recordings_path = os.path.join(PROCESSED_DATA_DIR, monitor_name, "recordings_MASTER.parquet")
     analytics_dir = os.path.join(ANALYTICS_DATA_DIR, monitor_name)
     
@@ -50,35 +67,37 @@ def aggregations_analytics():
     csv_dir = os.path.join(analytics_dir, "csv")
     os.makedirs(csv_dir, exist_ok=True)
 
-    if not os.path.exists(processed_recordings_path):
-        print("!! No processed data found to aggregate.")
-        return
-
-    # Load the processed_recordings file
-    df = pd.read_parquet(processed_recordings_path)
-
-    # SPECIES TOTALS (For pie/bar charts: What's out there?)
-    df_species_totals = df.groupby('label').agg(count=('label', 'count')).reset_index()
-    df_species_totals.to_parquet(os.path.join(analytics_dir, "species_totals.parquet"), index=False)
-
-    # DAILY UNIQUE SPECIES (For stacked area charts: Diversity over time)
-    df_daily_unique_species = df.groupby(['file_date', 'label']).agg(count=('label', 'nunique')).reset_index()
-    df_daily_unique_species.to_parquet(os.path.join(analytics_dir, "daily_unique_species.parquet"), index=False)
-
-    # HOURLY PATTERNS (For heatmaps: When are they singing?)
-    df_hourly_activity_patterns = df.groupby(['file_time', 'label']).agg(count=('label', 'count')).reset_index()
-    df_hourly_activity_patterns.to_parquet(os.path.join(analytics_dir, "hourly_activity_patterns.parquet"), index=False)
-
-    # Calculate species daily profiles
-    df_calculate_species_daily_profiles = calculate_species_daily_profiles(df)
-    df_calculate_species_daily_profiles.to_parquet(os.path.join(analytics_dir, "calculate_species_daily_profiles.parquet"), index=False)
-
-    # CSV EXPORTS (for sharing via spreadsheet)
-    df[df['confidence'] > 0.9].groupby('label').agg(counts=('scientific_name', 'count')).sort_values(by='counts', ascending=False).reset_index().to_csv(os.path.join(csv_dir, "bird_call_counts.csv"), index=False)
-
-    df[df['confidence'] > 0.9].groupby(['file_date', 'label']).agg(call_counts=('scientific_name', 'count')).sort_values(by=['file_date', 'call_counts'], ascending=[True, False]).reset_index().to_csv(os.path.join(csv_dir, "date_bird_call_counts.csv"), index=False)
-
-    df[df['confidence'] > 0.9].groupby(['file_date', 'file_time']).agg(call_counts=('scientific_name', 'count')).sort_values(by=['file_date', 'call_counts'], ascending=[True, False]).reset_index().to_csv(os.path.join(csv_dir, "date_time_call_counts.csv"), index=False)
+    if engine == "duckdb":
+        # DuckDB reads the parquet files directly: this monitor's dataset
+        # partitions, or the master file if the dataset hasn't been published
+        partitions_dir = os.path.join(PROCESSED_DATA_DIR, "detections", f"monitor={monitor_name}")
+        if os.path.isdir(partitions_dir):
+            sources = [os.path.join(partitions_dir, "**", "*.parquet")]
+        elif os.path.exists(processed_recordings_path):
+            sources = [processed_recordings_path]
+        else:
+            print("!! No processed data found to aggregate.")
+            return
+        build_gold_layer_duckdb(sources, analytics_dir, csv_dir, memory_limit=gold_memory_limit)
+    else:
+        # Load this monitor's detections from the partitioned dataset (only the
+        # columns used below), or the master file if it hasn't been published
+        columns = ['label', 'scientific_name', 'confidence', 'file_date', 'file_time', 'hour']
+        df = read_detections(PROCESSED_DATA_DIR, monitor_name=monitor_name, columns=columns)
+        if df is None:
+            if not os.path.exists(processed_recordings_path):
+                print("!! No processed data found to aggregate.")
+                return
+            df = pd.read_parquet(processed_recordings_path)
+
+        # Dictionary-encoded columns load as categoricals; the outputs keep
+        # plain string columns (and string sort order) as before
+        df = df.astype({c: str for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)})
+        build_gold_layer_pandas(df, analytics_dir, csv_dir)
+
+    # DAILY SUMMARY (richness, Shannon, Simpson, occupancy, confidence; daily,
+    # 7-day and 30-day) from the detection cube, for nt-webapp's /api/daily-stats
+    update_daily_summary(analytics_dir)
 
     print(f"--- SUCCESS: aggregations_analytics layers created in {analytics_dir} ---")
 
@@ -21,21 +21,68 @@ ANALYTICS_DATA_DIR = os.path.join(DATA_DIR, "data/analytics")
 # Pipeline profile: "prod" (default) or "test"
 # ==========================================
 # Set NT_ENV=test (e.g. via `run.sh test`) to run the whole pipeline against the
-# test monitor and batch instead of production. Both profiles' values are kept
-# here, side by side. Outputs are keyed by monitor_name, so a test run never
-# touches the production folders.
+# test monitor instead of production. Both profiles' values are kept here, side
+# by side. Outputs are keyed by monitor_name, so a test run never touches the
+# production folders.
+#
+# scheduled_monitors: the monitors process_audio_data_files.py analyses. Every
+# DataLoad_* batch found under RAW_DATA_DIR/<monitor>/ is queued automatically.
+# None = every monitor folder under RAW_DATA_DIR except the test_* ones.
 ENV = os.environ.get("NT_ENV", "prod")
 
 if ENV == "test":
     monitor_name = "test_audio1"
-    dataload_folder = "DataLoad_20260612"
+    scheduled_monitors = ["test_audio1"]
 else:
     monitor_name = "wrangcombe_audio1"
-    dataload_folder = "DataLoad_20260428"
+    scheduled_monitors = None
+
+# Order of the audio work queue within each monitor: "newest" (default) analyses
+# the most recent recordings first, "oldest" works forwards through history.
+# Monitors always take turns, so one big backlog can't starve the others.
+schedule_order = os.environ.get("NT_SCHEDULE_ORDER", "newest")
+
+# Number of BirdNET worker processes used by process_audio_data_files.py.
+# 1 (default) keeps the original single-process loop. Override with the
+# NT_WORKERS env var, e.g. NT_WORKERS=6 on the multi-core analysis box.
+analysis_workers = int(os.environ.get("NT_WORKERS", "1"))
+
+# Optional acoustic pre-screen before BirdNET (see prescreen_keep_mask). Off by
+# default. Set NT_PRESCREEN_K to turn it on (e.g. NT_PRESCREEN_K=3): windows
+# whose bird-band energy and spectral flux both sit below the file's
+# median + k * MAD are skipped. Lower k keeps more windows; check recall with
+# audit_prescreen.py before using it on production data.
+prescreen_k = float(os.environ["NT_PRESCREEN_K"]) if os.environ.get("NT_PRESCREEN_K") else None
+
+# Prometheus textfile with the audio analysis run's throughput (files, audio
+# seconds, stage timings, real-time factor, ETA). Point NT_PROM_TEXTFILE at
+# node_exporter's --collector.textfile.directory to scrape it.
+prometheus_textfile = os.environ.get("NT_PROM_TEXTFILE", os.path.join(PROCESSED_DATA_DIR, "analysis_metrics.prom"))
+
+# CSV export written next to recordings_MASTER.parquet by process_parquet_files.py.
+# NT_CSV_COMPRESSION: unset (plain .csv), "gzip" (.csv.gz) or "zstd" (.csv.zst).
+# NT_CSV_MODE: "full" (default) keeps one recordings_MASTER.csv up to date;
+# "delta" only writes each run's new/changed days to recordings_MASTER_delta_*.csv.
+csv_compression = os.environ.get("NT_CSV_COMPRESSION") or None
+csv_mode = os.environ.get("NT_CSV_MODE", "full")
+
+# Memory budget (MB) for building recordings_MASTER.parquet: days are streamed
+# through in record batches and written as a row group whenever this much is
+# buffered, so the build's peak memory doesn't grow with the history.
+consolidate_memory_mb = int(os.environ.get("NT_CONSOLIDATE_MEMORY_MB", "256"))
+
+# Engine for the aggregations_analytics (gold) layer: "duckdb" (default) scans
+# the parquet files once, out of core, on every core; "pandas" is the original
+# in-memory build. NT_GOLD_MEMORY_LIMIT (e.g. "2GB") caps DuckDB's memory,
+# beyond which it spills to disk.
+gold_engine = os.environ.get("NT_GOLD_ENGINE", "duckdb")
+gold_memory_limit = os.environ.get("NT_GOLD_MEMORY_LIMIT") or None
 
 # Fallback field-site coordinates (lat, lon) per monitor, keyed by the monitor's
 # folder name. Used only as a last resort when the summary log has no usable
-# coordinates (see get_monitor_coords). Add an entry here for each new monitor.
+# coordinates (see get_monitor_coords). A new monitor whose SM4 summary logs
+# carry valid LAT/LON needs no entry: process_monitor_summary_log.py saves its
+# coordinates before the audio analysis runs.
 monitor_coords = {
     "wrangcombe_audio1": (50.9481, -3.2503),
     "test_audio1": (50.9481, -3.2503),  # placeholder (same as wrangcombe) — test only
@@ -0,0 +1,135 @@
+import os
+import sys
+import time
+import pandas as pd
+from birdnetlib.analyzer import Analyzer
+
+# ==========================================
+# Files created by this script
+# ==========================================
+
+# Checks the acoustic pre-screen before it is switched on (NT_PRESCREEN_K).
+# Runs BirdNET twice on a sample of recordings - every window, then only the
+# windows the pre-screen keeps - and reports the speedup and the recall.
+# Writes prescreen_audit_missed.csv (the detections the pre-screen lost) to
+# data/processed/{monitor}/ for each monitor in the sample. The manifest and
+# daily parquet files are not touched.
+
+# ==========================================
+# 1. DIRECTORY CONFIGURATION
+# ==========================================
+
+### Project Root Discovery
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__)) # dir of this file 'processing'
+PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "../../")) # root dir of project 'nt-bird-detect'
+
+# ==========================================
+# 2. Import config & utility functions
+# ==========================================
+
+# Add src to path so we can import config and utils
+sys.path.append(os.path.join(PROJECT_ROOT, "src"))
+from config import RAW_DATA_DIR, PROCESSED_DATA_DIR, scheduled_monitors, prescreen_k
+from utils.processing_silver_utils import (
+    BatchedInferenceEngine,
+    SpeciesListCache,
+    get_monitor_coords,
+    discover_dataload_batches,
+    build_work_queue,
+    prescreen_recall
+)
+
+# ==========================================
+# 3. Function to audit the pre-screen
+# ==========================================
+
+def run_engine(engine, tasks):
+    """
+    Runs every task through the engine. Returns (detections DataFrame,
+    windows seen, windows skipped, seconds taken).
+    """
+    rows, windows, skipped = [], 0, 0
+    started = time.perf_counter()
+    for file_path, detections, error, stats in engine.run(tasks):
+        if error is not None:
+            print(f"!! Error with {os.path.basename(file_path)}: {error}")
+            continue
+        windows += stats['windows']
+        skipped += len(stats['skipped'])
+        for detection in detections:
+            rows.append({'file_path': file_path, 'file_name': os.path.basename(file_path), **detection})
+    return pd.DataFrame(rows), windows, skipped, time.perf_counter() - started
+
+
+def audit_prescreen(k=prescreen_k if prescreen_k is not None else 3.0, sample_size=20, monitors=scheduled_monitors):
+    """
+    Compares a full BirdNET run with a pre-screened one (threshold median +
+    k * MAD) on sample_size recordings spread evenly over every scheduled
+    monitor's batches (processed or not).
+    """
+    print(f"--- Pre-screen audit (k={k}) ---")
+
+    # Minimum confidence threshold for BirdNET detections (same as the pipeline)
+    min_conf = 0.5
+
+    batches = discover_dataload_batches(RAW_DATA_DIR, monitors)
+    queue, _ = build_work_queue(batches, None)
+    if not queue:
+        print(f"!! No recordings found under: {RAW_DATA_DIR}")
+        return
+
+    # Spread the sample over the whole queue, so it covers dates and monitors
+    step = max(1, len(queue) // sample_size)
+    sample = queue[::step][:sample_size]
+
+    coords = {m: get_monitor_coords(PROCESSED_DATA_DIR, m) for m in {item['monitor_name'] for item in sample}}
+    tasks = [(item['file_path'], item['file_path'], *coords[item['monitor_name']], item['date'], min_conf)
+             for item in sample]
+    print(f"Sampled {len(tasks)} of {len(queue)} recordings.")
+
+    species_cache = SpeciesListCache(os.path.join(PROCESSED_DATA_DIR, "species_list_cache.json"))
+    species_cache.prefetch(tasks)
+    engine = BatchedInferenceEngine(Analyzer(), batch_size=64, num_threads=os.cpu_count(),
+                                    species_cache=species_cache)
+
+    # 1. Full run: every window
+    df_full, windows, _, full_secs = run_engine(engine, tasks)
+    print(f"Full run: {len(df_full)} detections in {full_secs:.1f}s")
+
+    # 2. Pre-screened run, same engine and files
+    engine.prescreen_k = k
+    df_screened, _, skipped, screened_secs = run_engine(engine, tasks)
+    print(f"Pre-screened run: {len(df_screened)} detections in {screened_secs:.1f}s")
+
+    recall, df_missed = prescreen_recall(df_full, df_screened, keys=("file_path", "start_time", "label"))
+
+    print(f"\nWindows skipped: {skipped} of {windows} ({skipped / max(windows, 1):.0%})")
+    print(f"Speedup: {full_secs / max(screened_secs, 1e-9):.2f}x")
+    print(f"Recall vs full run: {recall:.1%} ({len(df_missed)} detections missed)")
+
+    if not df_missed.empty:
+        print("\nMost-missed species:")
+        print(df_missed['common_name'].value_counts().head(10))
+
+    # Save what was missed, per monitor, for a closer look
+    for monitor in coords:
+        paths = {item['file_path'] for item in sample if item['monitor_name'] == monitor}
+        df_monitor = df_missed[df_missed['file_path'].isin(paths)] if not df_missed.empty else df_missed
+        output_path = os.path.join(PROCESSED_DATA_DIR, monitor, "prescreen_audit_missed.csv")
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        df_monitor.to_csv(output_path, index=False)
+        print(f"-> Saved missed detections to: {output_path}")
+
+    print("\n--- Pre-screen audit complete ---")
+
+# ==========================================
+# 4. RUN THE FUNCTION
+# ==========================================
+
+if __name__ == "__main__":
+    # Optional: python audit_prescreen.py [k] [sample_size]
+    args = sys.argv[1:]
+    audit_prescreen(
+        k=float(args[0]) if len(args) > 0 else (prescreen_k if prescreen_k is not None else 3.0),
+        sample_size=int(args[1]) if len(args) > 1 else 20,
+    )
@@ -1,6 +1,7 @@
 import os
 import sys
-from datetime import datetime
+import time
+import multiprocessing
 import pandas as pd
 from birdnetlib.analyzer import Analyzer
 
@@ -8,9 +9,13 @@ from birdnetlib.analyzer import Analyzer
 # Files created by this script
 # ==========================================
 
-# For each day of .wav files, this script creates a parquet file named with that date
-# This script also creates a manifest parquet file to track processed files
-# to start process again on same files, delete the parquet files 
+# For each monitor and day of .wav files, this script creates a parquet file named with that date
+# (detections are buffered in _parts/ while the batch runs and each day file is written once at the end)
+# This script also keeps a manifest per monitor (processing_manifest.sqlite, exported to
+# processing_manifest.parquet at the end of each run) to track processed files
+# Per-file stage timings are appended to analysis_metrics.jsonl, and the run's
+# throughput is kept in a Prometheus textfile (analysis_metrics.prom, or NT_PROM_TEXTFILE)
+# to start process again on same files, delete the parquet files and the manifest
 
 # ==========================================
 # 1. DIRECTORY CONFIGURATION
@@ -26,109 +31,228 @@ PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "../../")) # root dir of
 
 # Add src to path so we can import config and utils
 sys.path.append(os.path.join(PROJECT_ROOT, "src"))
-from config import RAW_DATA_DIR, PROCESSED_DATA_DIR, monitor_name, dataload_folder
+from config import (RAW_DATA_DIR, PROCESSED_DATA_DIR, scheduled_monitors, schedule_order, analysis_workers, prescreen_k,
+                    prometheus_textfile)
 from utils.processing_silver_utils import (
-    analyze_audio_file, 
-    get_monitor_coords, 
-    get_processing_manifest, 
-    update_manifest
+    BatchedInferenceEngine,
+    SpeciesListCache,
+    analyze_audio_files_task,
+    init_analysis_worker,
+    get_monitor_coords,
+    get_processing_manifest,
+    discover_dataload_batches,
+    build_work_queue,
+    format_window_ranges,
+    file_fingerprint,
+    DailyDetectionWriter,
+    AnalysisMetrics
 )
 
 # ==========================================
 # 3. Function to process audio files
 # ==========================================
 
-def run_audio_analysis():
+def run_audio_analysis(workers=analysis_workers, monitors=scheduled_monitors, order=schedule_order,
+                       prescreen=prescreen_k):
+    """
+    Analyzes every unprocessed .wav in every DataLoad_* batch of every monitor.
+    Files from all monitors go into one work queue: newest (or oldest) first
+    within each monitor, with monitors taking turns so they share the workers.
+    workers=1 runs one Analyzer in this process, file after file.
+    workers>1 starts a process pool: each worker loads its own Analyzer once
+    and pulls groups of files from the pool's shared task queue. Either way,
+    segments from many files are scored together in fixed-size model batches
+    (BatchedInferenceEngine), and this process is the only one that writes
+    the manifests and daily parquet files.
+    prescreen: the pre-screen's k (None = off). Skipped windows are recorded
+    in the manifest.
+    """
     print("--- Starting BirdNET Audio Analysis ---")
-    print(f"Monitor: {monitor_name} | Batch: {dataload_folder}")
-    
-    # Use the coordinates from your SM4 log
-    lat, lon = get_monitor_coords(PROCESSED_DATA_DIR, monitor_name)
-    print(f"Using coordinates from log: Lat {lat}, Lon {lon}")
-    
+
     # Minimum confidence threshold for BirdNET detections
     min_conf = 0.5
 
-    recordings_dir = os.path.join(RAW_DATA_DIR, monitor_name, dataload_folder, "Data")
-    #output_path = os.path.join(PROCESSED_DATA_DIR, monitor_name, "recordings_batch.parquet")
-    manifest_path = os.path.join(PROCESSED_DATA_DIR, monitor_name, "processing_manifest.parquet")
+    # 3 s segments per model call, packed across files (64 x 3 s = 192 s of audio)
+    batch_size = 64
+    # Files handed to a pool worker at a time, so its batches can span files
+    files_per_task = 8
 
-    # Initialize Analyzer once
-    analyzer = Analyzer()
-    
-    # Check if recordings directory exists (eg. wrangcombe_audio1/DataLoad_20260121/Data)
-    if not os.path.exists(recordings_dir):
-        print(f"!! Directory not found: {recordings_dir}")
+    # Find every DataLoad batch (eg. wrangcombe_audio1/DataLoad_20260121/Data)
+    batches = discover_dataload_batches(RAW_DATA_DIR, monitors)
+    if not batches:
+        print(f"!! No DataLoad batches found under: {RAW_DATA_DIR}")
         return
+    for monitor, folder, _ in batches:
+        print(f"Found batch: {monitor} | {folder}")
 
-    # Get sorted list of audio files
-    entries = sorted(os.listdir(recordings_dir))
-    counter = 0
+    # Per-monitor state, owned by this process only: coordinates, manifest
+    # (to check if a file has already been processed) and daily detection writer
+    coords, manifests, writers = {}, {}, {}
+    for monitor in sorted({b[0] for b in batches}):
+        try:
+            coords[monitor] = get_monitor_coords(PROCESSED_DATA_DIR, monitor)
+        except ValueError as e:
+            print(f"!! Skipping monitor {monitor}: {e}")
+            continue
+        print(f"{monitor}: using coordinates Lat {coords[monitor][0]}, Lon {coords[monitor][1]}")
+        manifests[monitor] = get_processing_manifest(PROCESSED_DATA_DIR, monitor)
+        # Detections are buffered per day and appended as part files; each day
+        # file is written once, by writer.finalize(), when the batch ends
+        writers[monitor] = DailyDetectionWriter(os.path.join(PROCESSED_DATA_DIR, monitor))
+    batches = [b for b in batches if b[0] in manifests]
 
-    # Load manifest or create it - to check if file has already been processed
-    df_manifest = get_processing_manifest(PROCESSED_DATA_DIR, monitor_name)
-    print(df_manifest.head())
+    # Build the global work queue: every .wav not yet processed, with its date parsed
+    queue, rejected = build_work_queue(batches, manifests, newest_first=(order != "oldest"),
+                                       group_size=files_per_task)
+    for monitor, file in rejected:
+        manifests[monitor].update(file, processed=1, success=0)
+    for manifest in manifests.values():
+        manifest.checkpoint()
+    changed = sum(1 for item in queue if item['status'] == 'changed')
+    if changed:
+        print(f"{changed} previously analysed file(s) changed on disk and will be reprocessed.")
 
-    # Process each audio file
-    for file in entries:
-        if not file.lower().endswith('.wav') or file.startswith('.'): continue
-        
-        counter += 1
-    
-        # check if we have already processed this file using the manifest
-        print(f"Checking manifest for: {file}")
-        if not df_manifest.empty and file in df_manifest['file_name'].values:
-            if df_manifest.loc[df_manifest['file_name'] == file, 'processed'].iloc[0] == 1:
-                print(f"Skipping (Already Processed): {file}")
-                continue
-
-        # Full path to audio file
-        file_path = os.path.join(recordings_dir, file)
-
-        # Parse date from filename
-        try:
-            raw_date, raw_time = file[9:17], file[18:24]   # YYYYMMDD, HHMMSS 
-            file_year, file_month, file_day = int(file[9:13]), int(file[13:15]), int(file[15:17]) # YYYY, MM, DD
-            file_date_obj = datetime(year=file_year, month=file_month, day=file_day)
-            
-            # Define output path - daily parquet file
-            daily_output_path = os.path.join(PROCESSED_DATA_DIR, monitor_name, f"recordings_batch_{raw_date}.parquet")
-
-            print(f"[{counter}/{len(entries)}] Analyzing: {file}")
-            
-            # Call utility function to analyze audio file
-            detections = analyze_audio_file(analyzer, file_path, lat, lon, file_date_obj, min_conf)
-
-            # Determine success (were birds found?)
-            has_output = 1 if len(detections) > 0 else 0
-
-            # Convert detections data into DataFrame and add metadata
-            if has_output:
-                df_current = pd.DataFrame(detections)
-                df_current['file_name'] = file
-                df_current['file_date'] = raw_date
-                df_current['file_time'] = raw_time
-                df_current['monitor_name'] = monitor_name
-                df_current['dataload_batch'] = dataload_folder
-                
-                if os.path.exists(daily_output_path):
-                    df_existing = pd.read_parquet(daily_output_path)
-                    df_combined = pd.concat([df_existing, df_current], ignore_index=True)
-                else:
-                    df_combined = df_current
-                
-                df_combined.to_parquet(daily_output_path, index=False)
-                print(f"-> Saved {len(detections)} detections to {os.path.basename(daily_output_path)}")
-            
-            # Update manifest (In-Memory)
-            df_manifest = update_manifest(df_manifest, file, processed=1, success=has_output)
-            df_manifest.to_parquet(manifest_path, index=False)
-            print(df_manifest.tail(5))
+    # The engine identifies each task by file path (unique across monitors)
+    items = {item['file_path']: item for item in queue}
+    tasks = [(item['file_path'], item['file_path'], *coords[item['monitor_name']], item['date'], min_conf)
+             for item in queue]
+    print(f"{len(tasks)} file(s) queued for analysis across {len(manifests)} monitor(s), {order} first.")
+
+    # Location/week species lists: built once per week of data and kept on disk
+    # for later runs; the same lists are shared with every worker
+    species_cache = SpeciesListCache(os.path.join(PROCESSED_DATA_DIR, "species_list_cache.json"))
+    species_cache.prefetch(tasks)
+
+    # Manifest rows wait here until the monitor's writer has flushed their
+    # detections to disk, so a crash can never mark a file processed while its rows are lost
+    pending_manifest = {monitor: [] for monitor in manifests}
 
+    def commit_manifest(monitor):
+        for file, success, stats, fingerprint in pending_manifest[monitor]:
+            if stats is None:
+                manifests[monitor].update(file, processed=1, success=success, fingerprint=fingerprint)
+            else:
+                manifests[monitor].update(file, processed=1, success=success,
+                                          windows_total=stats['windows'],
+                                          windows_skipped=len(stats['skipped']),
+                                          skipped_windows=format_window_ranges(stats['skipped']) or None,
+                                          fingerprint=fingerprint)
+        pending_manifest[monitor].clear()
+        manifests[monitor].checkpoint()
+
+    # Windows seen / skipped by the pre-screen, for the end-of-run summary
+    window_counts = {'windows': 0, 'skipped': 0}
+
+    # Per-file stage timings (decode, pre-screen, inference, write) and batch rollups
+    metrics = AnalysisMetrics(os.path.join(PROCESSED_DATA_DIR, "analysis_metrics.jsonl"),
+                              prometheus_textfile, total_files=len(tasks))
+
+    # Results arrive here one file at a time, from this process or the pool
+    def save_result(task_id, detections, error, stats):
+        item = items[task_id]
+        writer = writers[item['monitor_name']]
+        started, flushed_before = time.perf_counter(), writer.flush_secs
+        try:
+            store_result(item, detections, error, stats)
         except Exception as e:
+            # One file that can't be stored is marked failed; the run carries on
+            monitor, file = item['monitor_name'], item['file_name']
             print(f"!! Error with {file}: {e}")
-            df_manifest = update_manifest(df_manifest, file, processed=1, success=0)
-            df_manifest.to_parquet(manifest_path, index=False)
+            pending_manifest[monitor][:] = [p for p in pending_manifest[monitor] if p[0] != file]
+            pending_manifest[monitor].append((file, 0, None, (None, None, None)))
+            detections, error, stats = [], str(e), None
+        # A flush triggered by this file is logged on its own, not as this file's write time
+        flush_secs = writer.flush_secs - flushed_before
+        if flush_secs:
+            metrics.record_write(item['monitor_name'], 'flush', flush_secs)
+        metrics.record(item['monitor_name'], item['dataload_batch'], item['file_name'],
+                       detections, error, stats, write_secs=time.perf_counter() - started - flush_secs)
+        print(f"[{metrics.done}/{len(tasks)}] Analyzed: {item['monitor_name']} | {item['file_name']} | {metrics.progress()}")
+
+    def store_result(item, detections, error, stats):
+        monitor, file = item['monitor_name'], item['file_name']
+
+        if error is not None:
+            print(f"!! Error with {file}: {error}")
+            pending_manifest[monitor].append((file, 0, None, (None, None, None)))
+            return
+
+        # Size, mtime and partial hash of what was analysed, so a later
+        # re-copy of the same card is recognised without decoding it
+        try:
+            fingerprint = file_fingerprint(item['file_path'])
+        except OSError as e:
+            print(f"!! Could not fingerprint {file}: {e}")
+            fingerprint = (None, None, None)
+
+        if prescreen is None:
+            stats = None
+        else:
+            window_counts['windows'] += stats['windows']
+            window_counts['skipped'] += len(stats['skipped'])
+
+        # Determine success (were birds found?)
+        has_output = 1 if len(detections) > 0 else 0
+
+        # Convert detections data into DataFrame and add metadata
+        df_current = pd.DataFrame(detections)
+        if has_output:
+            df_current['file_name'] = file
+            df_current['file_date'] = item['file_date']
+            df_current['file_time'] = item['file_time']
+            df_current['monitor_name'] = monitor
+            df_current['dataload_batch'] = item['dataload_batch']
+            print(f"-> Buffered {len(detections)} detections for {monitor} {item['file_date']}")
+
+        pending_manifest[monitor].append((file, has_output, stats, fingerprint))
+        # A changed file's old rows are replaced, even if it has no detections now
+        reprocessed = file if item['status'] == 'changed' else None
+        if writers[monitor].add(item['file_date'], df_current, reprocessed=reprocessed):
+            commit_manifest(monitor)
+
+    # Process each audio file
+    try:
+        if workers > 1 and len(tasks) > 1:
+            # "spawn" gives every worker a clean interpreter (the macOS default anyway),
+            # so no model or file state is shared between processes
+            ctx = multiprocessing.get_context("spawn")
+            task_groups = [tasks[i:i + files_per_task] for i in range(0, len(tasks), files_per_task)]
+            with ctx.Pool(processes=workers, initializer=init_analysis_worker,
+                          initargs=(batch_size, species_cache.lists, prescreen)) as pool:
+                # chunksize=1: idle workers take the next group as soon as they finish
+                for results in pool.imap_unordered(analyze_audio_files_task, task_groups, chunksize=1):
+                    for task_id, detections, error, stats in results:
+                        save_result(task_id, detections, error, stats)
+        else:
+            # Initialize Analyzer once; one interpreter using every core
+            engine = BatchedInferenceEngine(Analyzer(), batch_size=batch_size, num_threads=os.cpu_count(),
+                                            species_cache=species_cache, prescreen_k=prescreen)
+
+            for task_id, detections, error, stats in engine.run(tasks):
+                save_result(task_id, detections, error, stats)
+    finally:
+        for monitor in manifests:
+            # Flush what's buffered (also on Ctrl-C), then write each touched day once
+            flushed_before = writers[monitor].flush_secs
+            writers[monitor].flush()
+            metrics.record_write(monitor, 'flush', writers[monitor].flush_secs - flushed_before)
+            commit_manifest(monitor)
+            started = time.perf_counter()
+            writers[monitor].finalize()
+            metrics.record_write(monitor, 'finalize', time.perf_counter() - started)
+
+            # Compacted parquet copy of the manifest, for anything still reading it
+            df_manifest = manifests[monitor].export_parquet()
+            manifests[monitor].close()
+            print(f"{monitor} manifest:")
+            print(df_manifest.tail(5))
+        metrics.close()
+
+    print(metrics.summary())
+    if prescreen is not None and window_counts['windows']:
+        share = window_counts['skipped'] / window_counts['windows']
+        print(f"Pre-screen (k={prescreen}) skipped {window_counts['skipped']} of {window_counts['windows']} "
+              f"windows ({share:.0%}); BirdNET ran on {1 - share:.0%} of the audio.")
 
     print("\n--- Audio analysis batch complete ---")
 
@@ -137,4 +261,4 @@ def run_audio_analysis():
 # ==========================================
 
 if __name__ == "__main__":
-    run_audio_analysis()
\ No newline at end of file
+    run_audio_analysis()
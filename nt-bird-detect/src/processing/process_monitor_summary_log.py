@@ -1,6 +1,14 @@
 import os
 import sys
 
+# ==========================================
+# Files created by this script
+# ==========================================
+
+# In data/processed/{monitor}/, for every scheduled monitor:
+# monitor_summary_log.parquet - every row of the SM4 summary logs (DataLoad_*/*.txt)
+# monitor_summary_log_sources.json - size/mtime of each log parsed, so only new or changed logs are re-read
+# monitor_coords.json - the latest valid coordinates, read by get_monitor_coords at analysis startup
 
 # ==========================================
 # 1. DIRECTORY CONFIGURATION
@@ -16,38 +24,48 @@ PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "../../")) # root dir of
 
 # Add src to path so we can import config and utils
 sys.path.append(os.path.join(PROJECT_ROOT, "src"))
-from config import RAW_DATA_DIR, PROCESSED_DATA_DIR, monitor_name
-from utils.processing_silver_utils import parse_sm4_summary
+from config import RAW_DATA_DIR, PROCESSED_DATA_DIR, scheduled_monitors
+from utils.processing_silver_utils import discover_dataload_batches, update_sm4_summary_log
 
 
 # ==========================================
 # 3. Function to parse summary file
 # ==========================================
 
-def run_summary_log_processing():
+def run_summary_log_processing(monitors=scheduled_monitors):
+    """
+    Updates the summary log (and coordinates) of every monitor that
+    run_audio_analysis will analyse, so a new monitor's coordinates are
+    picked up from its SM4 logs without any config change.
+    """
     print("--- Starting Monitor Summary Log Processing ---")
-    
-    # Input path: data/raw/wrangcombe_audio1/
-    raw_monitor_path = os.path.join(RAW_DATA_DIR, monitor_name)
-
-    # Output path: data/processed/wrangcombe_audio1/monitor_summary_log.parquet
-    output_dir = os.path.join(PROCESSED_DATA_DIR, monitor_name)
-    output_file = os.path.join(output_dir, "monitor_summary_log.parquet")
-
-    # Ensure the output directory exists
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Call the utility function with the monitor name
-    df = parse_sm4_summary(raw_monitor_path, monitor_name)
-    
-    if df is not None:
+
+    for monitor_name in sorted({b[0] for b in discover_dataload_batches(RAW_DATA_DIR, monitors)}):
+        print(f"\n{monitor_name}:")
+
+        # Input path: data/raw/wrangcombe_audio1/
+        raw_monitor_path = os.path.join(RAW_DATA_DIR, monitor_name)
+
+        # Output path: data/processed/wrangcombe_audio1/monitor_summary_log.parquet
+        output_dir = os.path.join(PROCESSED_DATA_DIR, monitor_name)
+        output_file = os.path.join(output_dir, "monitor_summary_log.parquet")
+
+        # Ensure the output directory exists
+        os.makedirs(output_dir, exist_ok=True)
+
+        # Call the utility function with the monitor name; only logs that are
+        # new or changed since the last run are parsed
+        table = update_sm4_summary_log(raw_monitor_path, output_dir, monitor_name)
+
+        if table is None:
+            print(f"!! No summary logs found for {monitor_name}.")
+            continue
+
         print("\nPreview of combined data:")
-        print(df.tail(5))
-        
-        # Save to Parquet format
-        df.to_parquet(output_file, index=False)
+        print(table.slice(max(table.num_rows - 5, 0)).to_pandas())
+
         print(f"\n--- SUCCESS ---")
-        print(f"Combined {len(df)} rows from all DataLoad batches.")
+        print(f"Summary log holds {table.num_rows} rows from all DataLoad batches.")
         print(f"Saved metadata to: {output_file}")
 
 # ==========================================
@@ -55,4 +73,4 @@ def run_summary_log_processing():
 # ==========================================
 
 if __name__ == "__main__":
-    run_summary_log_processing()
\ No newline at end of file
+    run_summary_log_processing()
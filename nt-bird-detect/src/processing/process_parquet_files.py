@@ -16,28 +16,49 @@ PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "../../")) # root dir of
 
 # Add src to path so we can import config and utils
 sys.path.append(os.path.join(PROJECT_ROOT, "src"))
-from config import PROCESSED_DATA_DIR, monitor_name
+from config import (RAW_DATA_DIR, PROCESSED_DATA_DIR, ANALYTICS_DATA_DIR, scheduled_monitors, csv_compression,
+                    csv_mode, consolidate_memory_mb)
 from utils.processing_silver_utils import (
-    consolidate_daily_parquets
+    discover_dataload_batches,
+    consolidate_daily_parquets,
+    publish_detections_dataset
 )
+from utils.analytics_gold_utils import update_detection_cube, update_confidence_histograms
 
 # ==========================================
 # 3. Functions to run on parquet files
 # ==========================================
 
-def run_data_processing():
+def run_data_processing(monitors=scheduled_monitors):
     print("--- Starting Post-Analysis Data Processing ---")
-    
-    # STEP 1: CONSOLIDATION
-    # Uses the utility function to merge detections_*.parquet into MASTER.parquet
-    print(f"Executing consolidation for: {monitor_name}")
-    master_file = consolidate_daily_parquets(PROCESSED_DATA_DIR, monitor_name)
-    
-    if master_file:
-        print(f"Step 1 Complete: {os.path.basename(master_file)} generated.")
-    
-    # STEP 2: FUTURE TABLE JOINS (Placeholder)
-    # print("Step 2: Joining with secondary data tables...")
+
+    # Every monitor run_audio_analysis analyses, each into its own folders
+    for monitor_name in sorted({b[0] for b in discover_dataload_batches(RAW_DATA_DIR, monitors)}):
+        # STEP 1: CONSOLIDATION
+        # Uses the utility function to merge detections_*.parquet into MASTER.parquet
+        # (and stream the CSV export: NT_CSV_COMPRESSION / NT_CSV_MODE), within NT_CONSOLIDATE_MEMORY_MB
+        print(f"Executing consolidation for: {monitor_name}")
+        master_file = consolidate_daily_parquets(PROCESSED_DATA_DIR, monitor_name,
+                                                 csv_compression=csv_compression, csv_mode=csv_mode,
+                                                 memory_budget_mb=consolidate_memory_mb)
+
+        if master_file:
+            print(f"Step 1 Complete: {os.path.basename(master_file)} generated.")
+
+        # STEP 2: PARTITIONED DATASET
+        # Publishes the same detections as detections/monitor=/year=/month=/date=/
+        # so consumers can read just the dates/species they need (read_detections)
+        publish_detections_dataset(PROCESSED_DATA_DIR, monitor_name)
+
+        # STEP 3: DETECTION CUBE
+        # Counts / confidence per (date, hour, species, confidence bin), so the
+        # dashboard's charts don't have to re-aggregate every detection
+        update_detection_cube(PROCESSED_DATA_DIR, os.path.join(ANALYTICS_DATA_DIR, monitor_name), monitor_name)
+        # ...and its cumulative confidence histograms, for the dashboard's Min Confidence slider
+        update_confidence_histograms(os.path.join(ANALYTICS_DATA_DIR, monitor_name))
+
+    # STEP 4: FUTURE TABLE JOINS (Placeholder)
+    # print("Step 4: Joining with secondary data tables...")
     # This is where we will add the code for your upcoming data merges.
 
     print("--- All Data Processing Tasks Complete ---")
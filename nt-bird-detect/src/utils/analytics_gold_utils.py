@@ -1,6 +1,8 @@
 import os
 import glob
+import json
 
+import duckdb
 import numpy as np
 import pandas as pd
 
@@ -21,17 +23,529 @@ def calculate_species_daily_profiles(df):
         return pd.DataFrame()
 
     # 1. Ensure hour is available
-   # Ensure file_time is a string padded to 6 digits (HHMMSS)
-    df['file_time'] = df['file_time'].astype(str).str.zfill(6)
-    df['hour'] = df['file_time'].str[:2].astype(int)
+    # Stored with the detections since the compact schema; older data parses
+    # it from file_time (HHMMSS, zero-padded), on a copy - the caller's frame is left alone
+    if 'hour' not in df.columns:
+        df = df.assign(hour=df['file_time'].astype(str).str.zfill(6).str[:2].astype(int))
 
-    # 2. Group and aggregate in one clean step
+    # 2. Group and aggregate in one clean step (built-in aggregations only,
+    #    so pandas runs them vectorized instead of calling Python per group)
     df_profiles = df.groupby(['file_date', 'label']).agg(
         calls=('label', 'count'),              # Total abundance
         hours_active=('hour', 'nunique'),      # Count unique hours (how many hours had detections from this species)
-        occupancy_pct=('hour', lambda x: round((x.nunique() / 24) * 100, 2)),  # Occupancy percentage
         confidence=('confidence', 'mean'),      # Mean certainty
         max_confidence=('confidence', 'max')    # Max certainty
     ).reset_index()
+    # Occupancy percentage
+    df_profiles.insert(4, 'occupancy_pct', (df_profiles['hours_active'] / 24 * 100).round(2))
 
-    return df_profiles
\ No newline at end of file
+    return df_profiles
+
+# ==========================================
+# Gold Layer Build Utilities
+# ==========================================
+
+# Outputs of the gold layer, written by either engine:
+#   {analytics_dir}/species_totals.parquet, daily_unique_species.parquet,
+#   hourly_activity_patterns.parquet, calculate_species_daily_profiles.parquet
+#   {csv_dir}/bird_call_counts.csv, date_bird_call_counts.csv, date_time_call_counts.csv
+# Known issues kept on purpose (legacy, see aggregations_analytics.py):
+#   - daily_unique_species: nunique('label') within ['file_date', 'label'] is always 1.
+#   - hourly_activity_patterns: groups by full file_time (HHMMSS), not by hour.
+
+def build_gold_layer_pandas(df, analytics_dir, csv_dir):
+    """
+    The original pandas build: every output is its own groupby over the
+    full detections DataFrame (which must fit in memory).
+    """
+    # SPECIES TOTALS (For pie/bar charts: What's out there?)
+    df_species_totals = df.groupby('label').agg(count=('label', 'count')).reset_index()
+    df_species_totals.to_parquet(os.path.join(analytics_dir, "species_totals.parquet"), index=False)
+
+    # DAILY UNIQUE SPECIES (For stacked area charts: Diversity over time)
+    df_daily_unique_species = df.groupby(['file_date', 'label']).agg(count=('label', 'nunique')).reset_index()
+    df_daily_unique_species.to_parquet(os.path.join(analytics_dir, "daily_unique_species.parquet"), index=False)
+
+    # HOURLY PATTERNS (For heatmaps: When are they singing?)
+    df_hourly_activity_patterns = df.groupby(['file_time', 'label']).agg(count=('label', 'count')).reset_index()
+    df_hourly_activity_patterns.to_parquet(os.path.join(analytics_dir, "hourly_activity_patterns.parquet"), index=False)
+
+    # Calculate species daily profiles
+    df_calculate_species_daily_profiles = calculate_species_daily_profiles(df)
+    df_calculate_species_daily_profiles.to_parquet(os.path.join(analytics_dir, "calculate_species_daily_profiles.parquet"), index=False)
+
+    # CSV EXPORTS (for sharing via spreadsheet)
+    df[df['confidence'] > 0.9].groupby('label').agg(counts=('scientific_name', 'count')).sort_values(by='counts', ascending=False).reset_index().to_csv(os.path.join(csv_dir, "bird_call_counts.csv"), index=False)
+
+    df[df['confidence'] > 0.9].groupby(['file_date', 'label']).agg(call_counts=('scientific_name', 'count')).sort_values(by=['file_date', 'call_counts'], ascending=[True, False]).reset_index().to_csv(os.path.join(csv_dir, "date_bird_call_counts.csv"), index=False)
+
+    # file_time as zero-padded HHMMSS text, as the DuckDB build writes it
+    df_high = df[df['confidence'] > 0.9]
+    df_high = df_high.assign(file_time=df_high['file_time'].astype(str).str.zfill(6))
+    df_high.groupby(['file_date', 'file_time']).agg(call_counts=('scientific_name', 'count')).sort_values(by=['file_date', 'call_counts'], ascending=[True, False]).reset_index().to_csv(os.path.join(csv_dir, "date_time_call_counts.csv"), index=False)
+
+# Single scan of the detections: one row per (file_date, file_time, label)
+# holding everything the outputs need, so each output is a small rollup of it
+# instead of another pass over every detection
+GOLD_BASE_SQL = """
+CREATE TEMP TABLE base AS
+SELECT
+    CAST(file_date AS VARCHAR) AS file_date,
+    CAST(file_time AS VARCHAR) AS file_time,
+    CAST(label AS VARCHAR) AS label,
+    count(*) AS n_rows,
+    count(label) AS n_label,
+    count(confidence) AS n_confidence,
+    sum(confidence) AS confidence_sum,
+    max(confidence) AS confidence_max,
+    count(*) FILTER (WHERE confidence > 0.9) AS n_high,
+    count(scientific_name) FILTER (WHERE confidence > 0.9) AS n_high_scientific
+FROM read_parquet($sources, union_by_name = true)
+GROUP BY ALL
+"""
+
+# (output file, query over base); ordered as the pandas build orders them
+GOLD_OUTPUT_SQL = [
+    ("species_totals.parquet", """
+        SELECT label, CAST(sum(n_label) AS BIGINT) AS count
+        FROM base WHERE label IS NOT NULL
+        GROUP BY label ORDER BY label"""),
+    ("daily_unique_species.parquet", """
+        SELECT file_date, label, count(DISTINCT label) AS count
+        FROM base WHERE file_date IS NOT NULL AND label IS NOT NULL
+        GROUP BY file_date, label ORDER BY file_date, label"""),
+    ("hourly_activity_patterns.parquet", """
+        SELECT file_time, label, CAST(sum(n_label) AS BIGINT) AS count
+        FROM base WHERE file_time IS NOT NULL AND label IS NOT NULL
+        GROUP BY file_time, label ORDER BY file_time, label"""),
+    ("calculate_species_daily_profiles.parquet", """
+        SELECT file_date, label,
+               CAST(sum(n_label) AS BIGINT) AS calls,
+               count(DISTINCT substr(lpad(file_time, 6, '0'), 1, 2)) AS hours_active,
+               round(count(DISTINCT substr(lpad(file_time, 6, '0'), 1, 2)) / 24 * 100, 2) AS occupancy_pct,
+               sum(confidence_sum) / sum(n_confidence) AS confidence,
+               max(confidence_max) AS max_confidence
+        FROM base WHERE file_date IS NOT NULL AND label IS NOT NULL
+        GROUP BY file_date, label ORDER BY file_date, label"""),
+    ("csv/bird_call_counts.csv", """
+        SELECT label, CAST(sum(n_high_scientific) AS BIGINT) AS counts
+        FROM base WHERE label IS NOT NULL
+        GROUP BY label HAVING sum(n_high) > 0
+        ORDER BY counts DESC, label"""),
+    ("csv/date_bird_call_counts.csv", """
+        SELECT file_date, label, CAST(sum(n_high_scientific) AS BIGINT) AS call_counts
+        FROM base WHERE file_date IS NOT NULL AND label IS NOT NULL
+        GROUP BY file_date, label HAVING sum(n_high) > 0
+        ORDER BY file_date, call_counts DESC, label"""),
+    ("csv/date_time_call_counts.csv", """
+        SELECT file_date, lpad(file_time, 6, '0') AS file_time, CAST(sum(n_high_scientific) AS BIGINT) AS call_counts
+        FROM base WHERE file_date IS NOT NULL AND file_time IS NOT NULL
+        GROUP BY ALL HAVING sum(n_high) > 0
+        ORDER BY file_date, call_counts DESC, file_time"""),
+]
+
+def build_gold_layer_duckdb(sources, analytics_dir, csv_dir, memory_limit=None, threads=None):
+    """
+    The same outputs as build_gold_layer_pandas, as one DuckDB plan over the
+    parquet files themselves (sources: paths or globs, e.g. the monitor's
+    detections dataset partitions). The detections are scanned once, on
+    every core, into a per (date, time, species) base table; every output
+    is a rollup of that. Nothing is loaded into pandas, and DuckDB spills to
+    {analytics_dir}/.duckdb_tmp if memory_limit (e.g. "2GB") is reached.
+    Ties in the CSVs' count order are broken by name (pandas left them unordered).
+    """
+    con = duckdb.connect()
+    try:
+        con.execute("SET temp_directory = ?", [os.path.join(analytics_dir, ".duckdb_tmp")])
+        con.execute("SET preserve_insertion_order = false")
+        if memory_limit:
+            con.execute("SET memory_limit = ?", [memory_limit])
+        if threads:
+            con.execute(f"SET threads = {int(threads)}")
+
+        con.execute(GOLD_BASE_SQL, {'sources': list(sources)})
+        for output, query in GOLD_OUTPUT_SQL:
+            out_path = os.path.join(analytics_dir if not output.startswith("csv/") else csv_dir,
+                                    os.path.basename(output))
+            file_format = "(FORMAT csv, HEADER)" if output.endswith(".csv") else "(FORMAT parquet)"
+            quoted_path = out_path.replace("'", "''")
+            con.execute(f"COPY ({query}) TO '{quoted_path}' {file_format}")
+    finally:
+        con.close()
+
+# ==========================================
+# Detection Cube Utilities
+# ==========================================
+
+# One row per (monitor, date, hour, species, confidence bin). Every chart in the
+# dashboard is a sum over some of these keys, so it can be answered from the
+# cube (thousands of rows) instead of the detections (millions).
+CUBE_KEYS = ['monitor_name', 'file_date', 'hour', 'label', 'common_name', 'scientific_name', 'confidence_bin']
+# Width of a confidence bin: thresholds on its edges (0.05, 0.10, ... - the
+# dashboard slider's steps) give exact counts
+CUBE_BIN_WIDTH = 0.05
+
+def confidence_bin_edges(bin_width=CUBE_BIN_WIDTH):
+    """
+    Lower edge of every confidence bin, 0 to 1. Rounded so the edges equal
+    the decimal literals (0.15, not 0.15000000000000002) a threshold is typed as.
+    """
+    return np.round(np.arange(round(1 / bin_width) + 1) * bin_width, 10)
+
+def build_detection_cube(df, bin_width=CUBE_BIN_WIDTH):
+    """
+    Aggregates detections into cube rows: detections (count), confidence_sum
+    and confidence_max per CUBE_KEYS. A detection is in bin b when
+    confidence >= edges[b], so "confidence >= edge" filters stay exact.
+    Uses the stored hour, or parses file_time for older data.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=CUBE_KEYS + ['detections', 'confidence_sum', 'confidence_max'])
+
+    if 'hour' in df.columns:
+        hour = df['hour'].astype('int8')
+    else:
+        hour = df['file_time'].astype(str).str.zfill(6).str[:2].astype('int8')
+    edges = confidence_bin_edges(bin_width)
+    # Binned in the column's own precision: a float32 0.9 is below the
+    # float64 edge 0.9, but ">= 0.9" on the column (pandas, Arrow) counts it
+    stored = df['confidence'].to_numpy()
+    precision = stored.dtype if stored.dtype.kind == 'f' else np.dtype('float64')
+    confidence = stored.astype('float64')
+
+    keys = pd.DataFrame({
+        'monitor_name': df['monitor_name'].astype(str),
+        'file_date': df['file_date'].astype(str),
+        'hour': hour,
+        'label': df['label'].astype(str),
+        'common_name': df['common_name'].astype(str),
+        'scientific_name': df['scientific_name'].astype(str),
+        'confidence_bin': (np.searchsorted(edges.astype(precision), stored.astype(precision), side='right') - 1).astype('int8'),
+        'confidence': confidence,
+    })
+    return keys.groupby(CUBE_KEYS, observed=True, sort=True).agg(
+        detections=('confidence', 'size'),
+        confidence_sum=('confidence', 'sum'),
+        confidence_max=('confidence', 'max'),
+    ).reset_index()
+
+def update_detection_cube(processed_dir, analytics_dir, monitor_name, bin_width=CUBE_BIN_WIDTH):
+    """
+    Keeps {analytics_dir}/detection_cube.parquet in step with the monitor's
+    daily recordings_batch_*.parquet files. A watermark
+    (detection_cube_watermark.json) of each day file's size and mtime means
+    only new or changed days are re-aggregated; their old slices, and those
+    of removed days, are replaced. Changing bin_width rebuilds the cube.
+    Returns the cube path, or None if there are no daily files.
+    """
+    monitor_dir = os.path.join(processed_dir, monitor_name)
+    cube_path = os.path.join(analytics_dir, "detection_cube.parquet")
+    watermark_path = os.path.join(analytics_dir, "detection_cube_watermark.json")
+
+    daily_files = sorted(glob.glob(os.path.join(monitor_dir, "recordings_batch_*.parquet")))
+    if not daily_files:
+        print(f"No daily files found for {monitor_name}; detection cube not built.")
+        return None
+    current = {}
+    for f in daily_files:
+        st = os.stat(f)
+        current[os.path.basename(f)] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+    previous, df_cube = {}, None
+    if os.path.exists(watermark_path) and os.path.exists(cube_path):
+        with open(watermark_path, "r") as f:
+            stored = json.load(f)
+        if stored.get('bin_width') == bin_width:
+            previous = stored['days']
+            df_cube = pd.read_parquet(cube_path)
+
+    changed = [day for day, sig in current.items() if previous.get(day) != sig]
+    removed = [day for day in previous if day not in current]
+    if not changed and not removed:
+        print(f"Detection cube is up to date ({len(current)} days).")
+        return cube_path
+
+    # Day files are named by date, so a day's slice is its file_date rows
+    def file_date(day):
+        return day[len("recordings_batch_"):-len(".parquet")]
+
+    frames = []
+    if df_cube is not None:
+        stale = {file_date(day) for day in changed + removed}
+        frames.append(df_cube[~df_cube['file_date'].isin(stale)])
+    for day in changed:
+        df_day = pd.read_parquet(os.path.join(monitor_dir, day)).assign(monitor_name=monitor_name)
+        frames.append(build_detection_cube(df_day, bin_width))
+
+    frames = [f for f in frames if not f.empty]
+    df_cube = pd.concat(frames, ignore_index=True) if frames else build_detection_cube(pd.DataFrame())
+    df_cube = df_cube.astype({'hour': 'int8', 'confidence_bin': 'int8', 'detections': 'int64'})
+    df_cube = df_cube.sort_values(['file_date', 'hour', 'label', 'confidence_bin'], ignore_index=True)
+
+    os.makedirs(analytics_dir, exist_ok=True)
+    df_cube.to_parquet(cube_path + ".tmp", index=False)
+    os.replace(cube_path + ".tmp", cube_path)
+    with open(watermark_path + ".tmp", "w") as f:
+        json.dump({'bin_width': bin_width, 'days': current}, f)
+    os.replace(watermark_path + ".tmp", watermark_path)
+
+    print(f"Success: Detection cube updated ({len(changed)} day(s) re-aggregated, {len(removed)} removed, "
+          f"{len(df_cube)} rows) at {cube_path}")
+    return cube_path
+
+def query_detection_cube(df_cube, by, min_confidence=0.0, start_date=None, end_date=None, species=None):
+    """
+    Rolls the cube up to the `by` columns (e.g. ['common_name'] or
+    ['hour', 'common_name']) for detections with confidence >= min_confidence,
+    optionally within [start_date, end_date] ('YYYYMMDD') and for some
+    species (common names). Returns detections, confidence_mean and
+    confidence_max per group. A min_confidence between bin edges is
+    taken down to the edge below it.
+    """
+    edges = confidence_bin_edges(CUBE_BIN_WIDTH)
+    min_bin = max(int(np.searchsorted(edges, min_confidence, side='right')) - 1, 0)
+
+    mask = df_cube['confidence_bin'] >= min_bin
+    if start_date is not None:
+        mask &= df_cube['file_date'] >= start_date
+    if end_date is not None:
+        mask &= df_cube['file_date'] <= end_date
+    if species is not None:
+        mask &= df_cube['common_name'].isin(species)
+
+    df = df_cube[mask].groupby(list(by), observed=True).agg(
+        detections=('detections', 'sum'),
+        confidence_sum=('confidence_sum', 'sum'),
+        confidence_max=('confidence_max', 'max'),
+    ).reset_index()
+    df['confidence_mean'] = df['confidence_sum'] / df['detections']
+    return df.drop(columns='confidence_sum')
+
+
+# ==========================================
+# Biodiversity Index Utilities
+# ==========================================
+
+# Trailing windows (days, including the day itself) for the rolling indices
+DIVERSITY_WINDOWS = (7, 30)
+
+def diversity_indices(counts):
+    """
+    Species richness, Shannon (H = -sum p ln p) and Gini-Simpson (1 - sum p^2)
+    for every row of a (dates x species) matrix of detection counts, in
+    one vectorized pass. Rows without detections get NaN indices.
+    """
+    counts = np.asarray(counts, dtype='float64')
+    totals = counts.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = counts / totals[:, None]
+        shannon = -np.where(counts > 0, p * np.log(p), 0.0).sum(axis=1)
+        simpson = 1 - np.where(counts > 0, p * p, 0.0).sum(axis=1)
+    empty = totals == 0
+    shannon[empty] = np.nan
+    simpson[empty] = np.nan
+    return (counts > 0).sum(axis=1), shannon, simpson
+
+def _trailing_sums(values, window):
+    """
+    Sum of the last `window` rows (fewer at the start) for every row of a
+    calendar-day array, from one cumulative sum.
+    """
+    cumulative = np.concatenate([np.zeros((1,) + values.shape[1:]), np.cumsum(values, axis=0)])
+    end = np.arange(1, len(values) + 1)
+    return cumulative[end] - cumulative[np.maximum(end - window, 0)]
+
+def compute_daily_summary(df_cube, windows=DIVERSITY_WINDOWS, start_date=None):
+    """
+    Daily biodiversity and activity indices from the detection cube, one row
+    per recorded date:
+      detections, richness, shannon_index, simpson_index,
+      hours_active / occupancy_pct (hours of the day with any detection),
+      confidence_mean, confidence_max
+    plus the same over each trailing window (e.g. shannon_index_7d), from the
+    species counts pooled over the window's days; occupancy is the mean over
+    the window's recorded days.
+    start_date ('YYYYMMDD'): only return rows from this date on (the cube
+    may start earlier - rolling windows need the days before it).
+    """
+    columns = ['file_date', 'date', 'detections', 'richness', 'shannon_index', 'simpson_index',
+               'hours_active', 'occupancy_pct', 'confidence_mean', 'confidence_max']
+    if df_cube.empty:
+        return pd.DataFrame(columns=columns)
+
+    # Dense calendar (one row per day, gaps included) x species matrix
+    dates = pd.to_datetime(df_cube['file_date'], format='%Y%m%d')
+    calendar = pd.date_range(dates.min(), dates.max(), freq='D')
+    day = ((dates - calendar[0]).dt.days).to_numpy()
+    species_codes, species = pd.factorize(df_cube['label'])
+    counts = np.zeros((len(calendar), len(species)))
+    np.add.at(counts, (day, species_codes), df_cube['detections'].to_numpy())
+
+    detections = counts.sum(axis=1)
+    confidence_sum = np.bincount(day, weights=df_cube['confidence_sum'].to_numpy(), minlength=len(calendar))
+    confidence_max = pd.Series(df_cube['confidence_max'].to_numpy(dtype='float64')).groupby(day).max().reindex(
+        range(len(calendar))).to_numpy()
+    hours = np.zeros((len(calendar), 24), dtype=bool)
+    hours[day, df_cube['hour'].to_numpy(dtype='int64')] = True
+    hours_active = hours.sum(axis=1)
+    recorded = detections > 0
+
+    richness, shannon, simpson = diversity_indices(counts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        summary = {
+            'file_date': calendar.strftime('%Y%m%d'),
+            'date': calendar.strftime('%Y-%m-%d'),
+            'detections': detections.astype('int64'),
+            'richness': richness,
+            'shannon_index': shannon,
+            'simpson_index': simpson,
+            'hours_active': hours_active,
+            'occupancy_pct': np.round(hours_active / 24 * 100, 2),
+            'confidence_mean': confidence_sum / detections,
+            'confidence_max': confidence_max,
+        }
+        for window in windows:
+            suffix = f"_{window}d"
+            window_counts = _trailing_sums(counts, window)
+            window_detections = window_counts.sum(axis=1)
+            window_days = _trailing_sums(recorded.astype('float64'), window)
+            richness, shannon, simpson = diversity_indices(window_counts)
+            summary.update({
+                'detections' + suffix: window_detections.astype('int64'),
+                'richness' + suffix: richness,
+                'shannon_index' + suffix: shannon,
+                'simpson_index' + suffix: simpson,
+                'occupancy_pct' + suffix: np.round(_trailing_sums(hours_active * 1.0, window) / window_days / 24 * 100, 2),
+                'confidence_mean' + suffix: _trailing_sums(confidence_sum, window) / window_detections,
+                'confidence_max' + suffix: pd.Series(confidence_max).rolling(window, min_periods=1).max().to_numpy(),
+            })
+
+    df_summary = pd.DataFrame(summary)[recorded]
+    if start_date is not None:
+        df_summary = df_summary[df_summary['file_date'] >= start_date]
+    return df_summary.reset_index(drop=True)
+
+def update_daily_summary(analytics_dir, windows=DIVERSITY_WINDOWS):
+    """
+    Keeps {analytics_dir}/daily_summary.parquet (read by nt-webapp's
+    /api/daily-stats) in step with the detection cube in the same folder.
+    The cube's watermark at the last update is kept in
+    daily_summary_watermark.json: only rows from the earliest new, changed
+    or removed day onwards are recomputed (a day moves the rolling windows
+    after it), from the cube rows the longest window needs.
+    Returns the summary path, or None if there is no cube yet.
+    """
+    cube_path = os.path.join(analytics_dir, "detection_cube.parquet")
+    cube_watermark_path = os.path.join(analytics_dir, "detection_cube_watermark.json")
+    summary_path = os.path.join(analytics_dir, "daily_summary.parquet")
+    watermark_path = os.path.join(analytics_dir, "daily_summary_watermark.json")
+
+    if not os.path.exists(cube_path) or not os.path.exists(cube_watermark_path):
+        print("!! No detection cube found; run process_parquet_files.py first. Daily summary not built.")
+        return None
+    with open(cube_watermark_path, "r") as f:
+        current = json.load(f)['days']
+
+    previous, df_old = None, None
+    if os.path.exists(watermark_path) and os.path.exists(summary_path):
+        with open(watermark_path, "r") as f:
+            stored = json.load(f)
+        if stored.get('windows') == list(windows):
+            previous = stored['days']
+            df_old = pd.read_parquet(summary_path)
+
+    if previous is None:
+        start_date = None
+    else:
+        touched = [day for day in current if previous.get(day) != current[day]]
+        touched += [day for day in previous if day not in current]
+        if not touched:
+            print(f"Daily summary is up to date ({len(df_old)} days).")
+            return summary_path
+        start_date = min(day[len("recordings_batch_"):-len(".parquet")] for day in touched)
+
+    # Rolling windows reach back max(windows) - 1 days before the first recomputed row
+    if start_date is None:
+        df_cube = pd.read_parquet(cube_path)
+    else:
+        first_needed = (pd.Timestamp(start_date) - pd.Timedelta(days=max(windows) - 1)).strftime('%Y%m%d')
+        df_cube = pd.read_parquet(cube_path, filters=[('file_date', '>=', first_needed)])
+
+    df_new = compute_daily_summary(df_cube, windows, start_date=start_date)
+    if df_old is not None:
+        df_new = pd.concat([df_old[df_old['file_date'] < start_date], df_new], ignore_index=True)
+
+    df_new.to_parquet(summary_path + ".tmp", index=False)
+    os.replace(summary_path + ".tmp", summary_path)
+    with open(watermark_path + ".tmp", "w") as f:
+        json.dump({'windows': list(windows), 'days': current}, f)
+    os.replace(watermark_path + ".tmp", watermark_path)
+
+    print(f"Success: Daily summary updated ({'all' if start_date is None else 'from ' + start_date}, "
+          f"{len(df_new)} days) at {summary_path}")
+    return summary_path
+
+
+# ==========================================
+# Confidence Histogram Utilities
+# ==========================================
+
+# Rows of the cumulative confidence histograms; every threshold's counts sit side by side
+HISTOGRAM_KEYS = ['file_date', 'hour', 'common_name', 'scientific_name']
+
+def histogram_column(min_confidence, bin_width=CUBE_BIN_WIDTH):
+    """
+    Name of the confidence_histograms column holding the detections with
+    confidence >= min_confidence (a bin edge), e.g. 0.9 -> 'ge_090'.
+    Raises ValueError for a threshold between edges: no column counts it
+    exactly, and taking a neighbouring edge would silently change the count.
+    """
+    index = min_confidence / bin_width
+    if abs(index - round(index)) > 1e-9 or not 0 <= round(index) <= round(1 / bin_width):
+        raise ValueError(f"min_confidence {min_confidence} is not a multiple of the bin width {bin_width:g}")
+    edge = confidence_bin_edges(bin_width)[round(index)]
+    return f"ge_{round(edge * 100):03d}"
+
+def build_confidence_histograms(df_cube, bin_width=CUBE_BIN_WIDTH):
+    """
+    Cumulative confidence histograms per (date, hour, species) from the
+    detection cube: one column per bin edge (ge_000 ... ge_100) counting the
+    detections with confidence >= that edge. Counts for any threshold are
+    then one column read, whatever the number of detections.
+    """
+    edges = confidence_bin_edges(bin_width)
+    columns = [histogram_column(edge, bin_width) for edge in edges]
+    if df_cube.empty:
+        return pd.DataFrame(columns=HISTOGRAM_KEYS + columns)
+
+    groups = df_cube.groupby(HISTOGRAM_KEYS, sort=True, observed=True)
+    codes, keys = groups.ngroup().to_numpy(), groups.size().index
+    counts = np.zeros((len(keys), len(edges)), dtype='int64')
+    np.add.at(counts, (codes, df_cube['confidence_bin'].to_numpy(dtype='int64')), df_cube['detections'].to_numpy())
+    # Reverse cumulative sum over the bins: column b = detections in bins >= b
+    cumulative = counts[:, ::-1].cumsum(axis=1)[:, ::-1].astype('int32')
+
+    df_hist = keys.to_frame(index=False)
+    df_hist[columns] = cumulative
+    return df_hist
+
+def update_confidence_histograms(analytics_dir):
+    """
+    Rewrites {analytics_dir}/confidence_histograms.parquet from the
+    detection cube when the cube is newer. Returns the path, or None if
+    there is no cube yet.
+    """
+    cube_path = os.path.join(analytics_dir, "detection_cube.parquet")
+    histograms_path = os.path.join(analytics_dir, "confidence_histograms.parquet")
+    if not os.path.exists(cube_path):
+        print("!! No detection cube found; confidence histograms not built.")
+        return None
+    if os.path.exists(histograms_path) and os.stat(histograms_path).st_mtime_ns >= os.stat(cube_path).st_mtime_ns:
+        print("Confidence histograms are up to date.")
+        return histograms_path
+
+    df_hist = build_confidence_histograms(pd.read_parquet(cube_path))
+    df_hist.to_parquet(histograms_path + ".tmp", index=False)
+    os.replace(histograms_path + ".tmp", histograms_path)
+    print(f"Success: Confidence histograms updated ({len(df_hist)} rows) at {histograms_path}")
+    return histograms_path
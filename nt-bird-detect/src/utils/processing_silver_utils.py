@@ -1,90 +1,760 @@
 import os
 import glob
+import hashlib
+import json
+import math
+import struct
+import time
+import sqlite3
+from datetime import datetime
 
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.csv as pacsv
 
 from birdnetlib import Recording
-from birdnetlib.analyzer import Analyzer
+from birdnetlib.analyzer import Analyzer, LOCATION_FILTER_THRESHOLD, MODEL_VERSION, tflite
+from birdnetlib.species import SpeciesList
+from birdnetlib.utils import return_week_48_from_datetime
 
 # Central config (src is on sys.path via the calling script / conftest)
 from config import monitor_coords
 
 # ==========================================
-# parse_sm4_summary() - Parse SM4 Summary Utility
-# analyze_audio_file() - Parse Audio File Utility
+# read_sm4_summary_file() / update_sm4_summary_log() - Parse SM4 Summary Utility
+# read_wav_header() / open_wav_memmap() - Streaming WAV Reader Utilities
+# iter_wav_segments() - Streaming WAV Reader Utilities
+# window_activity_features() / prescreen_keep_mask() - Acoustic Pre-screen Utilities
+# format_window_ranges() / prescreen_recall() - Acoustic Pre-screen Utilities
+# SpeciesListCache - Species List Cache Utility
+# BatchedInferenceEngine - Batched Inference Engine
+# init_analysis_worker() - Parallel Analysis Worker Utilities
+# analyze_audio_files_task() - Parallel Analysis Worker Utilities
 # get_monitor_coords() - Get Monitor Coordinates Utility
+# file_fingerprint() - Processing Manifest Utilities
+# ProcessingManifest - Processing Manifest Utilities
 # get_processing_manifest() - Processing Manifest Utilities
-# update_manifest() - Processing Manifest Utilities
+# discover_dataload_batches() - Audio Work Queue Utilities
+# build_work_queue() - Audio Work Queue Utilities
+# DETECTIONS_SCHEMA / conform_detections_table() - Detections Schema Utilities
+# DailyDetectionWriter - Daily Detection Writer Utility
+# AnalysisMetrics - Analysis Metrics Utility
+# csv_export_path() / export_parquet_to_csv() - CSV Export Utilities
 # consolidate_daily_parquets() - Consolidate Daily Parquets Utility
+# publish_detections_dataset() - Detections Dataset Utilities
+# open_detections_dataset() / read_detections() - Detections Dataset Utilities
 # ==========================================
 
 # ==========================================
 # Parse SM4 Summary Utility
 # ==========================================
 
-def parse_sm4_summary(raw_monitor_path, monitor_name):
+# Summary log columns with a fixed type (the rest are kept as strings), so
+# every log parses to the same schema whatever its values look like
+SM4_SUMMARY_TYPES = {
+    'LAT': pa.float64(),
+    'LON': pa.float64(),
+    'POWER(V)': pa.float64(),
+    'TEMP(C)': pa.float64(),
+    '#FILES': pa.int64(),
+}
+
+def read_sm4_summary_file(txt_path):
     """
-    Finds all 'DataLoad_YYYYMMDD' folders and extracts metadata.
-    In each folder, find the .txt summary file
-    and add monitor/file metadata columns,
-    then return it as a Pandas DataFrame.
+    Parses one SM4 summary .txt with Arrow's multithreaded CSV reader and
+    returns a pyarrow Table. Values are trimmed (the logs pad them with
+    spaces), blanks become nulls and the SM4_SUMMARY_TYPES columns are cast;
+    a column that won't cast is nulled with a warning rather than changing type.
     """
-    all_dataframes = []
+    with open(txt_path, "r", errors="replace") as f:
+        header = [name.strip() for name in f.readline().rstrip("\r\n").split(",")]
+    # Blank header cells get pandas-style names, as the logs always had
+    names = [name or f"Unnamed: {i}" for i, name in enumerate(header)]
+
+    table = pacsv.read_csv(
+        txt_path,
+        read_options=pacsv.ReadOptions(column_names=names, skip_rows=1),
+        convert_options=pacsv.ConvertOptions(column_types={name: pa.string() for name in names}),
+    )
 
-    # 1. Look for folders starting with 'DataLoad'
-    dataload_folders = [f for f in os.listdir(raw_monitor_path) 
-                        if os.path.isdir(os.path.join(raw_monitor_path, f)) 
-                        and f.startswith('DataLoad')]
+    columns = []
+    for name in names:
+        col = pc.utf8_trim_whitespace(table.column(name))
+        col = pc.if_else(pc.equal(col, ""), pa.scalar(None, pa.string()), col)
+        if name in SM4_SUMMARY_TYPES:
+            try:
+                col = col.cast(SM4_SUMMARY_TYPES[name])
+            except pa.ArrowInvalid as e:
+                print(f"!! {os.path.basename(txt_path)}: column {name} is not numeric ({e}); leaving it empty.")
+                col = pa.nulls(len(table), SM4_SUMMARY_TYPES[name])
+        columns.append(col)
+    return pa.Table.from_arrays(columns, names=names)
 
-    for folder in dataload_folders:
-        load_date = folder.replace('DataLoad_', '') # Extract '20260121'
+def _summary_log_sources(raw_monitor_path):
+    """
+    {'DataLoad_*/file.txt': {'size', 'mtime_ns'}} for every summary log of the
+    monitor, in batch order. Hidden / macOS AppleDouble files (e.g.
+    "._S4A27301_A_Summary.txt") that the SSD's filesystem creates are
+    skipped - they end in .txt but are binary.
+    """
+    sources = {}
+    for folder in sorted(os.listdir(raw_monitor_path)):
         folder_path = os.path.join(raw_monitor_path, folder)
-        
-        # 2. Look for the .txt file inside that specific DataLoad folder.
-        #    Skip hidden / macOS AppleDouble files (e.g. "._S4A27301_A_Summary.txt")
-        #    that the SSD's filesystem creates — they end in .txt but are binary.
-        txt_files = [f for f in os.listdir(folder_path)
-                     if f.endswith('.txt') and not f.startswith('.')]
-        
-        for file_name in txt_files:
-            txt_path = os.path.join(folder_path, file_name)
-            df = pd.read_csv(txt_path, skipinitialspace=True)
-
-            # 3. Add the columns you requested
-            df['monitor_name'] = monitor_name
-            df['dataload_batch'] = folder      # e.g., DataLoad_20260121
-            df['load_date'] = load_date        # e.g., 20260121
-            df['source_file'] = file_name
-            
-            all_dataframes.append(df)
-            print(f"Successfully parsed {file_name} from {folder}")
+        if not folder.startswith('DataLoad') or not os.path.isdir(folder_path):
+            continue
+        for file_name in sorted(os.listdir(folder_path)):
+            if file_name.endswith('.txt') and not file_name.startswith('.'):
+                st = os.stat(os.path.join(folder_path, file_name))
+                sources[f"{folder}/{file_name}"] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    return sources
+
+def latest_summary_coords(table):
+    """
+    (lat, lon, row) from the last summary-log row with usable coordinates,
+    or None if no row has any.
+    """
+    if table.num_rows == 0 or 'LAT' not in table.column_names or 'LON' not in table.column_names:
+        return None
+    valid = pc.and_(pc.is_valid(table.column('LAT')), pc.is_valid(table.column('LON')))
+    indices = pc.indices_nonzero(valid)
+    if len(indices) == 0:
+        return None
+    row = table.slice(indices[-1].as_py(), 1).to_pylist()[0]
+    lat, lon = _coords_from_row(row)
+    return lat, lon, row
 
-    if not all_dataframes:
+def update_sm4_summary_log(raw_monitor_path, output_dir, monitor_name):
+    """
+    Keeps {output_dir}/monitor_summary_log.parquet in step with the monitor's
+    summary logs (DataLoad_*/*.txt), parsing each log only once:
+    1. List the logs with their size and mtime, and compare them with
+       monitor_summary_log_sources.json from the last run
+    2. Parse only new or changed logs (read_sm4_summary_file) and add the
+       monitor/file metadata columns; rows of changed or removed logs are dropped
+    3. Rewrite the log (only if something changed) and the sources file
+    4. Save the latest valid coordinates to monitor_coords.json, so
+       get_monitor_coords doesn't have to load the log
+    Returns the log as a pyarrow Table, or None if the monitor has no logs.
+    """
+    log_path = os.path.join(output_dir, "monitor_summary_log.parquet")
+    sources_path = os.path.join(output_dir, "monitor_summary_log_sources.json")
+    coords_path = os.path.join(output_dir, "monitor_coords.json")
+
+    # 1. List the logs and compare them with the last run
+    current = _summary_log_sources(raw_monitor_path)
+    if not current:
         return None
-        
-    return pd.concat(all_dataframes, ignore_index=True)
+
+    previous, table = {}, None
+    if os.path.exists(sources_path) and os.path.exists(log_path):
+        with open(sources_path, "r") as f:
+            previous = json.load(f)
+        table = pq.read_table(log_path)
+
+    changed = [source for source, sig in current.items() if previous.get(source) != sig]
+    removed = [source for source in previous if source not in current]
+
+    if not changed and not removed and table is not None:
+        print(f"Summary log is up to date ({len(current)} log(s), nothing changed).")
+    else:
+        # 2. Drop the rows of changed/removed logs, parse the new/changed ones
+        tables = []
+        if table is not None:
+            keys = pc.binary_join_element_wise(table.column('dataload_batch'), table.column('source_file'), "/")
+            tables.append(table.filter(pc.invert(pc.is_in(keys, value_set=pa.array(changed + removed, pa.string())))))
+
+        for source in changed:
+            folder, file_name = source.split("/", 1)
+            parsed = read_sm4_summary_file(os.path.join(raw_monitor_path, folder, file_name))
+            n = parsed.num_rows
+            parsed = (parsed.append_column('monitor_name', pa.array([monitor_name] * n, pa.string()))
+                            .append_column('dataload_batch', pa.array([folder] * n, pa.string()))       # e.g., DataLoad_20260121
+                            .append_column('load_date', pa.array([folder.replace('DataLoad_', '')] * n, pa.string()))  # e.g., 20260121
+                            .append_column('source_file', pa.array([file_name] * n, pa.string())))
+            tables.append(parsed)
+            print(f"Successfully parsed {file_name} from {folder}")
+
+        # Batch order; rows within a batch keep their log order (the sort is stable)
+        table = pa.concat_tables(tables, promote_options="permissive")
+        table = table.take(pc.sort_indices(table, [('dataload_batch', 'ascending')]))
+
+        # 3. Rewrite the log and remember what it was built from
+        pq.write_table(table, log_path + ".tmp")
+        os.replace(log_path + ".tmp", log_path)
+        print(f"-> Summary log updated: {len(changed)} new/changed, {len(removed)} removed log(s)")
+
+    with open(sources_path + ".tmp", "w") as f:
+        json.dump(current, f)
+    os.replace(sources_path + ".tmp", sources_path)
+
+    # 4. Coordinates sidecar
+    latest = latest_summary_coords(table)
+    if latest is None:
+        print("!! No summary log row has usable coordinates; no coordinates saved.")
+        if os.path.exists(coords_path):
+            os.remove(coords_path)
+    else:
+        lat, lon, row = latest
+        with open(coords_path + ".tmp", "w") as f:
+            json.dump({'lat': lat, 'lon': lon, 'dataload_batch': row['dataload_batch'],
+                       'source_file': row['source_file'], 'DATE': row.get('DATE'), 'TIME': row.get('TIME')}, f)
+        os.replace(coords_path + ".tmp", coords_path)
+
+    return table
 
 # ==========================================
-# Parse Audio File Utility
+# Streaming WAV Reader Utilities
 # ==========================================
 
-def analyze_audio_file(analyzer, directory_path_file, lat, lon, date, min_conf):
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+def read_wav_header(file_path, clip=True):
     """
-    Uses BirdNET to analyze a single wav file and returns detections.
+    Walks the RIFF chunks of a .wav file without reading any audio.
+    Returns ((format_tag, channels, sample_rate, bits), data_offset, data_bytes).
+    data_bytes is clipped to the file size, so truncated copies still open
+    (clip=False gives the size the header declares).
     """
-    recording = Recording(
-        analyzer,
-        directory_path_file,
-        lat=lat,
-        lon=lon,
-        date=date,
-        min_conf=min_conf,
-    )
-    
-    # We run the analysis and return the result list
-    recording.analyze()
-    return recording.detections
+    with open(file_path, "rb") as f:
+        riff, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave_id != b"WAVE":
+            raise ValueError(f"Not a RIFF/WAVE file: {file_path}")
+
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"No data chunk found in {file_path}")
+            chunk_id, size = struct.unpack("<4sI", header)
+
+            if chunk_id == b"fmt ":
+                body = f.read(size + (size & 1))
+                format_tag, channels, sample_rate, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+                if format_tag == WAVE_FORMAT_EXTENSIBLE:
+                    format_tag = struct.unpack("<H", body[24:26])[0]  # first 2 bytes of the sub-format GUID
+                fmt = (format_tag, channels, sample_rate, bits)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise ValueError(f"data chunk before fmt chunk in {file_path}")
+                offset = f.tell()
+                if clip:
+                    size = min(size, os.fstat(f.fileno()).st_size - offset)
+                return fmt, offset, size
+            else:
+                # Skip other chunks (SM4 files carry a wamd metadata chunk), word-aligned
+                f.seek(size + (size & 1), 1)
+
+def open_wav_memmap(file_path):
+    """
+    Memory-maps the PCM samples of a .wav file as a (frames, channels) array.
+    Nothing is read until a slice is touched. Returns (pcm, sample_rate, scale),
+    where pcm * scale gives float samples in [-1, 1] like librosa.
+    Raises ValueError for encodings it doesn't handle (e.g. 24-bit PCM).
+    """
+    (format_tag, channels, sample_rate, bits), offset, size = read_wav_header(file_path)
+
+    if format_tag == WAVE_FORMAT_PCM and bits == 16:
+        dtype, scale = np.int16, 1 / 32768.0
+    elif format_tag == WAVE_FORMAT_PCM and bits == 32:
+        dtype, scale = np.int32, 1 / 2147483648.0
+    elif format_tag == WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+        dtype, scale = np.float32, 1.0
+    else:
+        raise ValueError(f"Unsupported WAV encoding (format {format_tag}, {bits}-bit): {file_path}")
+
+    frames = size // (channels * np.dtype(dtype).itemsize)
+    pcm = np.memmap(file_path, dtype=dtype, mode="r", offset=offset, shape=(frames, channels))
+    return pcm, sample_rate, scale
+
+def _polyphase_resample_matrix(up, down, taps_per_phase=16, rolloff=0.9, beta=8.6):
+    """
+    Builds the filter for resampling by up/down as one small matrix.
+    Output block j (up samples) = x[down*j + base : down*j + base + span] @ matrix,
+    so a whole segment resamples in a single strided matmul.
+    The filter is a Kaiser-windowed sinc low-pass at rolloff x the lower Nyquist.
+    """
+    n = up * taps_per_phase
+    center = n // 2
+    cutoff = rolloff * 0.5 / max(up, down)   # in cycles per sample at the upsampled rate
+    k = np.arange(n) - center
+    h = 2 * cutoff * np.sinc(2 * cutoff * k) * np.kaiser(2 * center + 1, beta)[:n] * up
+
+    # Output r of each block always uses the same filter phase and input offset
+    r = np.arange(up)
+    q, phase = np.divmod(r * down + center, up)
+    base = int(q.min()) - taps_per_phase + 1
+    span = int(q.max()) - base + 1
+
+    matrix = np.zeros((span, up), dtype=np.float32)
+    for t in range(taps_per_phase):
+        matrix[q - t - base, r] = h[phase + up * t]
+    return matrix, base
+
+def iter_wav_segments(file_path, target_sr=48000, segment_secs=3.0, min_segment_secs=1.5):
+    """
+    Streams a .wav file as (start, end, segment) analysis windows at target_sr,
+    without ever decoding the whole file. Only the input samples for the
+    current window are read from the memory map and resampled, so peak memory
+    is a few MB however long the recording is.
+    Windows match birdnetlib: back-to-back 3 s, a short tail is zero-padded,
+    and a tail under 1.5 s is dropped. Multi-channel audio is averaged to mono.
+    """
+    pcm, source_sr, scale = open_wav_memmap(file_path)
+    g = math.gcd(target_sr, source_sr)
+    up, down = target_sr // g, source_sr // g
+
+    seg_len = int(segment_secs * target_sr)
+    min_len = int(min_segment_secs * target_sr)
+    n_in = pcm.shape[0]
+    n_out = (n_in * up) // down
+
+    def read(lo, hi):
+        # Float mono samples [lo, hi), zeros outside the file
+        out = np.zeros(hi - lo, dtype=np.float32)
+        a, b = max(lo, 0), min(hi, n_in)
+        if a < b:
+            block = pcm[a:b]
+            out[a - lo:b - lo] = (block.mean(axis=1) if block.shape[1] > 1 else block[:, 0]) * scale
+        return out
+
+    if up != down:
+        matrix, base = _polyphase_resample_matrix(up, down)
+        span = matrix.shape[0]
+
+    for i, n0 in enumerate(range(0, n_out, seg_len)):
+        n1 = min(n0 + seg_len, n_out)
+        if n1 - n0 < min_len:
+            break
+
+        if up == down:
+            segment = read(n0, n1)
+        else:
+            # seg_len is a multiple of up, so every window starts on a block boundary
+            j0, blocks = n0 // up, -(-(n1 - n0) // up)
+            lo = down * j0 + base
+            x = read(lo, lo + down * (blocks - 1) + span)
+            frames = np.lib.stride_tricks.sliding_window_view(x, span)[::down]
+            segment = (frames @ matrix).reshape(-1)[:n1 - n0]
+
+        if len(segment) < seg_len:
+            segment = np.pad(segment, (0, seg_len - len(segment)))
+
+        start = i * segment_secs
+        yield start, start + segment_secs, segment
+
+# ==========================================
+# Acoustic Pre-screen Utilities
+# ==========================================
+
+def window_activity_features(segment, sample_rate=48000, band=(1000, 10000), frame=1024):
+    """
+    Two cheap activity features for one analysis window, from a short-time
+    FFT restricted to the bird band (1-10 kHz by default, so wind and traffic
+    rumble don't count):
+      - band_energy_db: peak (95th percentile) frame energy in the band, in dB.
+        A call lifts it well above the background; steady noise doesn't.
+      - band_flux: peak frame-to-frame rise of the log spectrum (spectral
+        flux), high at call onsets and low for steady noise or silence
+    Returns (band_energy_db, band_flux).
+    """
+    frames = np.lib.stride_tricks.sliding_window_view(segment, frame)[::frame // 2]
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(frame).astype(np.float32), axis=1))
+    freqs = np.fft.rfftfreq(frame, 1 / sample_rate)
+    spectrum = spectrum[:, (freqs >= band[0]) & (freqs < band[1])]
+
+    frame_db = 10 * np.log10(np.mean(spectrum ** 2, axis=1) + 1e-12)
+    flux = np.maximum(np.diff(np.log(spectrum + 1e-6), axis=0), 0).mean(axis=1)
+    return float(np.percentile(frame_db, 95)), float(flux.max()) if len(flux) else 0.0
+
+def prescreen_keep_mask(features, k=3.0, min_margin=(1.0, 0.05), dilate=1, min_windows=5):
+    """
+    Decides which windows of a file go to BirdNET.
+    features: (n_windows, n_features) array from window_activity_features.
+    A window is kept if any feature is above that file's adaptive threshold,
+    median + max(k * MAD, min_margin), so the threshold follows each
+    recording's own background level (a windy night and a quiet one both get
+    a fair floor). min_margin stops near-constant features (e.g. a silent
+    file, where the MAD is a fraction of a dB) from keeping random windows.
+    Kept windows also keep `dilate` neighbours each side, so a call that
+    straddles a window edge isn't lost. Files with fewer than min_windows
+    windows are always kept in full.
+    """
+    features = np.asarray(features, dtype=np.float64)
+    n = len(features)
+    if n < min_windows:
+        return np.ones(n, dtype=bool)
+
+    median = np.median(features, axis=0)
+    mad = np.median(np.abs(features - median), axis=0)
+    keep = (features > median + np.maximum(k * mad, min_margin)).any(axis=1)
+
+    for shift in range(1, dilate + 1):
+        keep[shift:] |= keep[:-shift]
+        keep[:-shift] |= keep[shift:]
+    return keep
+
+def format_window_ranges(starts, segment_secs=3.0):
+    """
+    Compacts a list of window start times (seconds) into a string of
+    back-to-back ranges, e.g. [0, 3, 6, 27] -> "0-9,27-30". Used for the
+    manifest's skipped_windows column.
+    """
+    ranges = []
+    for start in sorted(starts):
+        if ranges and start == ranges[-1][1]:
+            ranges[-1][1] = start + segment_secs
+        else:
+            ranges.append([start, start + segment_secs])
+    return ",".join(f"{a:g}-{b:g}" for a, b in ranges)
+
+def prescreen_recall(df_full, df_screened, keys=('file_name', 'start_time', 'label')):
+    """
+    Compares a pre-screened run against a full run of the same files.
+    Returns (recall, missed): the share of full-run detections that the
+    screened run also found, and a DataFrame of the ones it missed.
+    """
+    keys = list(keys)
+    if df_full.empty:
+        return 1.0, df_full
+    # A screened run that found nothing comes back with no columns at all
+    if df_screened.empty or not set(keys) <= set(df_screened.columns):
+        return 0.0, df_full
+    merged = df_full.merge(df_screened[keys].drop_duplicates(), on=keys, how='left', indicator=True)
+    missed = merged[merged['_merge'] == 'left_only'].drop(columns='_merge')
+    return 1 - len(missed) / len(df_full), missed
+
+# ==========================================
+# Species List Cache Utility
+# ==========================================
+
+class SpeciesListCache:
+    """
+    Location/week species lists from BirdNET's meta model, keyed by
+    (lat, lon, week_48), so the list is built once per week of data instead
+    of once per Recording.
+
+    With cache_path set, lists are also kept in a small JSON file that later
+    runs reuse. prefetch(tasks) computes every list a batch needs up front, in
+    the parent process; the resulting dict (self.lists) is handed to each pool
+    worker, so workers never run the meta model themselves.
+    """
+
+    def __init__(self, cache_path=None, lists=None):
+        self.cache_path = cache_path
+        self.lists = dict(lists or {})
+
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, "r") as f:
+                stored = json.load(f)
+            # Lists depend on the model release and filter threshold - drop stale ones
+            if stored.get('model_version') == MODEL_VERSION and stored.get('threshold') == LOCATION_FILTER_THRESHOLD:
+                self.lists.update(stored.get('lists', {}))
+
+    @staticmethod
+    def key(lat, lon, week_48):
+        return f"{lat:.4f},{lon:.4f},{week_48}"
+
+    def get(self, lat, lon, week_48, compute=None):
+        """
+        Returns the species list ('Scientific_Common' labels) for the key.
+        On a miss, calls compute(lat, lon, week_48) and caches the result.
+        """
+        key = self.key(lat, lon, week_48)
+        if key not in self.lists:
+            if compute is None:
+                compute = _species_list_from_meta_model
+            self.lists[key] = list(compute(lat, lon, week_48))
+            self.save()
+        return self.lists[key]
+
+    def prefetch(self, tasks):
+        """
+        Fills the cache for every (lat, lon, week) in a list of analysis tasks
+        (file_name, file_path, lat, lon, date, min_conf). The meta model is
+        only loaded if something is missing.
+        """
+        needed = {(lat, lon, return_week_48_from_datetime(date))
+                  for _, _, lat, lon, date, _ in tasks if lat and lon and date}
+        missing = [k for k in needed if self.key(*k) not in self.lists]
+
+        if missing:
+            species_model = SpeciesList()
+            for lat, lon, week_48 in missing:
+                self.lists[self.key(lat, lon, week_48)] = species_model.return_list_for_analyzer(
+                    lat=lat, lon=lon, week_48=week_48, threshold=LOCATION_FILTER_THRESHOLD)
+            self.save()
+
+        print(f"Species lists: {len(needed) - len(missing)} cached, {len(missing)} computed")
+
+    def save(self):
+        if not self.cache_path:
+            return
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                'model_version': MODEL_VERSION,
+                'threshold': LOCATION_FILTER_THRESHOLD,
+                'lists': self.lists,
+            }, f)
+        os.replace(tmp_path, self.cache_path)
+
+
+def _species_list_from_meta_model(lat, lon, week_48):
+    return SpeciesList().return_list_for_analyzer(
+        lat=lat, lon=lon, week_48=week_48, threshold=LOCATION_FILTER_THRESHOLD)
+
+# ==========================================
+# Batched Inference Engine
+# ==========================================
+
+class BatchedInferenceEngine:
+    """
+    Scores 3-second segments from many recordings in large, fixed-size model
+    batches, instead of one small batch per file (as Recording.analyze does).
+
+    run(tasks) decodes each file, packs its segments into a shared batch of
+    batch_size rows (padding only the very last batch), runs the BirdNET
+    model once per batch and maps every score row back to its
+    (file, start, end). Detections are filtered exactly as birdnetlib does:
+    confidence > min_conf and the species is on the location/week list.
+
+    num_threads: if set, the engine loads its own TFLite interpreter with that
+    many threads (birdnetlib always uses 1). Leave as None inside pool workers,
+    where the parallelism comes from the processes instead.
+    species_cache: a SpeciesListCache shared with other engines/workers. Without
+    one, lists are computed with the analyzer's meta model and cached locally.
+    prescreen_k: if set, each file is first scanned with the cheap acoustic
+    pre-screen (prescreen_keep_mask, threshold median + k * MAD) and only the
+    windows it keeps are sent to the model. This decodes the file twice -
+    decoding is a small fraction of the model's cost. None = score every window.
+    """
+
+    SAMPLE_RATE = 48000
+    SEGMENT_SECS = 3.0
+
+    def __init__(self, analyzer, batch_size=64, num_threads=None, species_cache=None, prescreen_k=None):
+        self.analyzer = analyzer
+        self.batch_size = batch_size
+        self.prescreen_k = prescreen_k
+        self.labels = np.array(analyzer.labels)
+        self.species_cache = species_cache if species_cache is not None else SpeciesListCache()
+        self._species_masks = {}   # cache key -> bool mask over labels
+        self._pending = []         # (file_name, start, end, segment) waiting for a batch
+        self._files = {}           # file_name -> per-file state while it is in flight
+        self._inference_clock = 0.0   # total seconds spent in _score_pending
+
+        if num_threads:
+            self.interpreter = tflite.Interpreter(model_path=analyzer.model_path, num_threads=num_threads)
+            self.input_index = self.interpreter.get_input_details()[0]["index"]
+            self.output_index = self.interpreter.get_output_details()[0]["index"]
+        else:
+            self.interpreter = analyzer.interpreter
+            self.input_index = analyzer.input_layer_index
+            self.output_index = analyzer.output_layer_index
+
+        # Fixed batch shape: tensors are allocated once, not per file
+        segment_samples = int(self.SEGMENT_SECS * self.SAMPLE_RATE)
+        self.interpreter.resize_tensor_input(self.input_index, [batch_size, segment_samples])
+        self.interpreter.allocate_tensors()
+
+    def read_segments(self, file_path):
+        """
+        Decodes a file into (start, end, segment) tuples of 3 s at 48 kHz.
+        .wav files are streamed from a memory map (iter_wav_segments); other
+        formats, or WAV encodings it doesn't handle, go through birdnetlib's
+        full in-memory decode.
+        """
+        if file_path.lower().endswith('.wav'):
+            try:
+                open_wav_memmap(file_path)   # checks the header/encoding up front
+            except ValueError as e:
+                print(f"!! Streaming reader can't open {os.path.basename(file_path)} ({e}); using birdnetlib decode.")
+            else:
+                yield from iter_wav_segments(file_path, self.SAMPLE_RATE, self.SEGMENT_SECS)
+                return
+
+        recording = Recording(self.analyzer, file_path)
+        recording.read_audio_data()
+        step = recording.sample_secs - recording.overlap
+        for i, segment in enumerate(recording.chunks):
+            start = i * step
+            yield start, start + recording.sample_secs, segment
+
+    def species_mask(self, lat, lon, date):
+        """
+        Boolean mask over the model labels for the species expected at
+        (lat, lon) in the week of date. All True when no location is given.
+        """
+        if not (lat and lon):
+            return np.ones(len(self.labels), dtype=bool)
+
+        week_48 = return_week_48_from_datetime(date) if date else -1
+        key = self.species_cache.key(lat, lon, week_48)
+        if key not in self._species_masks:
+            species_list = self.species_cache.get(lat, lon, week_48, compute=self._compute_species_list)
+            self._species_masks[key] = np.isin(self.labels, species_list) if species_list else np.ones(len(self.labels), dtype=bool)
+        return self._species_masks[key]
+
+    def _compute_species_list(self, lat, lon, week_48):
+        return self.analyzer.return_predicted_species_list(lon=lon, lat=lat, week_48=week_48)
+
+    def prescreen(self, file_path):
+        """
+        Boolean keep-mask over the file's windows (see prescreen_keep_mask).
+        """
+        features = [window_activity_features(segment, self.SAMPLE_RATE)
+                    for _, _, segment in self.read_segments(file_path)]
+        return prescreen_keep_mask(features, k=self.prescreen_k)
+
+    def run(self, tasks):
+        """
+        tasks: iterable of (file_name, file_path, lat, lon, date, min_conf).
+        Yields (file_name, detections, error, stats) as soon as every segment
+        of a file has been scored - the same tuple analyze_audio_files_task
+        returns. stats holds:
+          windows / skipped: window count, and the starts of the windows the
+            pre-screen kept away from the model
+          decode_secs / prescreen_secs / inference_secs: time spent on this
+            file. A model batch's time is shared between the files in it, by
+            number of rows.
+        """
+        for file_name, file_path, lat, lon, date, min_conf in tasks:
+            try:
+                state = {
+                    'remaining': 0,
+                    'detections': [],
+                    'mask': self.species_mask(lat, lon, date),
+                    'min_conf': max(0.01, min(min_conf, 0.99)),
+                    'queued': False,
+                    'stats': {'windows': 0, 'skipped': [], 'decode_secs': 0.0,
+                              'prescreen_secs': 0.0, 'inference_secs': 0.0},
+                }
+                self._files[file_name] = state
+
+                started = time.perf_counter()
+                keep = self.prescreen(file_path) if self.prescreen_k is not None else None
+                state['stats']['prescreen_secs'] = time.perf_counter() - started
+
+                # Decode time = time in this loop, minus the model batches run inside it
+                started, inference_before = time.perf_counter(), self._inference_clock
+                for i, (start, end, segment) in enumerate(self.read_segments(file_path)):
+                    state['stats']['windows'] += 1
+                    if keep is not None and not keep[i]:
+                        state['stats']['skipped'].append(start)
+                        continue
+                    state['remaining'] += 1
+                    self._pending.append((file_name, start, end, segment))
+                    if len(self._pending) == self.batch_size:
+                        yield from self._score_pending()
+                        if file_name not in self._files:
+                            break   # its model batch failed (already reported)
+                state['stats']['decode_secs'] = (time.perf_counter() - started
+                                                 - (self._inference_clock - inference_before))
+                state['queued'] = True
+            except Exception as e:
+                # Drop the failed file's segments; already-scored ones are discarded too
+                self._pending = [p for p in self._pending if p[0] != file_name]
+                self._files.pop(file_name, None)
+                yield file_name, [], str(e), None
+                continue
+
+            if file_name not in self._files:
+                continue
+            if state['remaining'] == 0:
+                # Every segment already scored (or the file had none)
+                del self._files[file_name]
+                yield file_name, state['detections'], None, state['stats']
+
+        # Score whatever is left, padded up to the fixed batch size
+        yield from self._score_pending()
+
+    def _score_pending(self):
+        """
+        Runs the model on the pending segments and yields finished files.
+        If the model call fails, every file with a segment in the batch is
+        yielded as an error (and dropped), so one bad batch can't end the run.
+        """
+        if not self._pending:
+            return
+
+        started = time.perf_counter()
+        try:
+            batch = np.zeros((self.batch_size, int(self.SEGMENT_SECS * self.SAMPLE_RATE)), dtype=np.float32)
+            for row, (_, _, _, segment) in enumerate(self._pending):
+                batch[row, :len(segment)] = segment
+
+            self.interpreter.set_tensor(self.input_index, batch)
+            self.interpreter.invoke()
+            scores = self.analyzer.flat_sigmoid(self.interpreter.get_tensor(self.output_index), sensitivity=-1.0)
+        except Exception as e:
+            failed = list(dict.fromkeys(p[0] for p in self._pending))
+            self._pending = []
+            for file_name in failed:
+                self._files.pop(file_name, None)
+                yield file_name, [], f"model batch failed: {e}", None
+            return
+
+        for row, (file_name, start, end, _) in enumerate(self._pending):
+            state = self._files[file_name]
+            row_scores = scores[row]
+            hits = np.flatnonzero((row_scores > state['min_conf']) & state['mask'])
+            for idx in hits[np.argsort(-row_scores[hits])]:
+                label = self.labels[idx]
+                scientific_name, common_name = label.split("_", 1)
+                state['detections'].append({
+                    'common_name': common_name,
+                    'scientific_name': scientific_name,
+                    'start_time': float(start),
+                    'end_time': float(end),
+                    'confidence': float(row_scores[idx]),
+                    'label': label,
+                })
+            state['remaining'] -= 1
+
+        elapsed = time.perf_counter() - started
+        self._inference_clock += elapsed
+        for file_name, _, _, _ in self._pending:
+            self._files[file_name]['stats']['inference_secs'] += elapsed / len(self._pending)
+        self._pending = []
+
+        for file_name in [f for f, st in self._files.items() if st['queued'] and st['remaining'] == 0]:
+            state = self._files.pop(file_name)
+            yield file_name, state['detections'], None, state['stats']
+
+# ==========================================
+# Parallel Analysis Worker Utilities
+# ==========================================
+
+# Each worker process loads its own Analyzer and inference engine exactly once
+# (via the pool initializer) and keeps them here for every file it is handed.
+_worker_engine = None
+
+def init_analysis_worker(batch_size, species_lists, prescreen_k=None):
+    """
+    Pool initializer: loads the BirdNET model once per worker process.
+    species_lists is the parent's prefetched SpeciesListCache.lists.
+    """
+    global _worker_engine
+    _worker_engine = BatchedInferenceEngine(
+        Analyzer(), batch_size=batch_size, species_cache=SpeciesListCache(lists=species_lists),
+        prescreen_k=prescreen_k)
+
+def analyze_audio_files_task(tasks):
+    """
+    Runs inside a worker process. Analyzes a group of files from the shared
+    queue through the worker's batched engine, so model batches span files.
+    tasks is a list of (file_name, file_path, lat, lon, date, min_conf).
+    Returns a list of (file_name, detections, error, stats) and never raises, so one
+    bad file can't take down the pool. Workers never write to disk - the
+    parent process is the single writer for the manifest and daily parquets.
+    """
+    return list(_worker_engine.run(tasks))
 
 # ==========================================
 # Get Monitor Coordinates Utility
@@ -101,9 +771,11 @@ def _coords_from_row(row):
 
     lat, lon = float(lat), float(lon)
 
-    # Adjust longitude if it is marked as West
+    # Adjust longitude if it is marked as West (and latitude if South)
     if str(row['EW']).strip().lower() == 'w':
         lon = -abs(lon)
+    if str(row.get('NS', '')).strip().lower() == 's':
+        lat = -abs(lat)
 
     return lat, lon
 
@@ -111,23 +783,32 @@ def _coords_from_row(row):
 def get_monitor_coords(processed_dir, monitor_name):
     """
     Returns (lat, lon) for the monitor, in order of preference:
-      1. Last row of the summary log  (most recent recorded location)
-      2. First row of the summary log (if the last row has no usable coords)
-      3. Hardcoded fallback for this monitor from config.monitor_coords
+      1. monitor_coords.json, the latest valid log row saved by
+         update_sm4_summary_log (no need to load the log)
+      2. Last row of the summary log  (most recent recorded location)
+      3. First row of the summary log (if the last row has no usable coords)
+      4. Hardcoded fallback for this monitor from config.monitor_coords
     """
     fallback = monitor_coords.get(monitor_name)
     monitor_summary_log_path = os.path.join(processed_dir, monitor_name, "monitor_summary_log.parquet")
+    coords_path = os.path.join(processed_dir, monitor_name, "monitor_coords.json")
+
+    # 1. Coordinates sidecar
+    if os.path.exists(coords_path):
+        with open(coords_path, "r") as f:
+            saved = json.load(f)
+        return saved['lat'], saved['lon']
 
     if os.path.exists(monitor_summary_log_path):
         df_log = pd.read_parquet(monitor_summary_log_path)
 
-        # 1. Last row (most recent location)
+        # 2. Last row (most recent location)
         try:
             return _coords_from_row(df_log.iloc[-1])
         except Exception as e:
             print(f"!! Could not read coords from last log row ({e}); trying first row.")
 
-        # 2. First row
+        # 3. First row
         try:
             return _coords_from_row(df_log.iloc[0])
         except Exception as e:
@@ -135,7 +816,7 @@ def get_monitor_coords(processed_dir, monitor_name):
     else:
         print(f"!! No summary log found at {monitor_summary_log_path}; using hardcoded fallback.")
 
-    # 3. Hardcoded fallback from config
+    # 4. Hardcoded fallback from config
     if fallback is None:
         raise ValueError(
             f"No fallback coordinates configured for monitor '{monitor_name}'. "
@@ -147,79 +828,1205 @@ def get_monitor_coords(processed_dir, monitor_name):
 # Processing Manifest Utilities
 # ==========================================
 
-def get_processing_manifest(processed_dir, monitor_name):
+def file_fingerprint(file_path, sample_bytes=1 << 20, with_hash=True):
+    """
+    Cheap identity for a raw recording: (size, mtime, content_hash).
+    content_hash is a blake2b digest of the size plus the first and last
+    sample_bytes of the file - enough to tell a re-copied card from a
+    different or truncated recording without reading hundreds of MB.
+    with_hash=False only stats the file (content_hash is None).
     """
-    Loads the manifest parquet. If it doesn't exist, creates a new one.
+    st = os.stat(file_path)
+    if not with_hash:
+        return st.st_size, st.st_mtime, None
+
+    digest = hashlib.blake2b(str(st.st_size).encode(), digest_size=16)
+    with open(file_path, "rb") as f:
+        digest.update(f.read(sample_bytes))
+        if st.st_size > sample_bytes:
+            f.seek(max(sample_bytes, st.st_size - sample_bytes))
+            digest.update(f.read(sample_bytes))
+    return st.st_size, st.st_mtime, digest.hexdigest()
+
+class ProcessingManifest:
+    """
+    Tracks which .wav files have been sent to BirdNET, in an SQLite table
+    ({monitor}/processing_manifest.sqlite) keyed by file_name.
     processed: means that we have sent the file to birdnet for analysis
     success: means that birdnet returned results for that file
+
+    - Lookups hit the primary-key index, so the skip check is O(1) per file
+      no matter how many recordings the manifest holds.
+    - update() stages rows; checkpoint() commits them in one transaction.
+      SQLite's WAL journal makes each commit atomic, so a crash loses at most
+      the rows staged since the last checkpoint - never the table.
+    - export_parquet() writes the compacted processing_manifest.parquet that
+      older notebooks and scripts read.
+    - windows_total / windows_skipped / skipped_windows record what the
+      acoustic pre-screen did with each file (skipped_windows as second
+      ranges, e.g. "0-9,27-30"). Empty when the pre-screen was off.
+    - file_size / file_mtime / content_hash fingerprint the recording that
+      was analysed (file_fingerprint), so check() can tell a re-copied
+      duplicate from a changed file with the same name.
     """
-    manifest_path = os.path.join(processed_dir, monitor_name, "processing_manifest.parquet")
-    print(f"Loading manifest from: {manifest_path}")
-    
-    if os.path.exists(manifest_path):
-        return pd.read_parquet(manifest_path)
-    
-    # Create an empty manifest with the structure you requested
-    return pd.DataFrame(columns=['file_name', 'processed', 'success', 'last_updated'])
-
-def update_manifest(df_manifest, file_name, processed, success):
-    """
-    Updates or adds a file's status in the manifest.
-    """
-    from datetime import datetime
-    
-    new_row = {
-        'file_name': file_name,
-        'processed': processed,
-        'success': success,
-        'last_updated': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    COLUMNS = ['file_name', 'processed', 'success', 'last_updated']
+    # Added after the first release; older databases gain them on open
+    ADDED_COLUMNS = {
+        'windows_total': 'INTEGER', 'windows_skipped': 'INTEGER', 'skipped_windows': 'TEXT',
+        'file_size': 'INTEGER', 'file_mtime': 'REAL', 'content_hash': 'TEXT',
     }
-    
-    # If file exists, remove the old record before adding the new one
-    df_manifest = df_manifest[df_manifest['file_name'] != file_name]
-    df_manifest = pd.concat([df_manifest, pd.DataFrame([new_row])], ignore_index=True)
-    
-    return df_manifest
+
+    def __init__(self, processed_dir, monitor_name):
+        monitor_dir = os.path.join(processed_dir, monitor_name)
+        os.makedirs(monitor_dir, exist_ok=True)
+        self.db_path = os.path.join(monitor_dir, "processing_manifest.sqlite")
+        self.parquet_path = os.path.join(monitor_dir, "processing_manifest.parquet")
+
+        is_new = not os.path.exists(self.db_path)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS manifest ("
+            " file_name TEXT PRIMARY KEY,"
+            " processed INTEGER NOT NULL,"
+            " success INTEGER NOT NULL,"
+            " last_updated TEXT NOT NULL)"
+        )
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(manifest)")}
+        for column, sql_type in self.ADDED_COLUMNS.items():
+            if column not in existing:
+                self.conn.execute(f"ALTER TABLE manifest ADD COLUMN {column} {sql_type}")
+        self.conn.commit()
+
+        # One-off migration from the old parquet-only manifest
+        if is_new and os.path.exists(self.parquet_path):
+            df_old = pd.read_parquet(self.parquet_path)
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO manifest ({', '.join(self.COLUMNS)}) VALUES (?, ?, ?, ?)",
+                df_old[self.COLUMNS].astype({'processed': int, 'success': int, 'last_updated': str})
+                    .itertuples(index=False, name=None),
+            )
+            self.conn.commit()
+            print(f"Imported {len(df_old)} rows from {os.path.basename(self.parquet_path)}")
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM manifest").fetchone()[0]
+
+    def is_processed(self, file_name):
+        """
+        True if file_name has already been sent to BirdNET.
+        """
+        row = self.conn.execute(
+            "SELECT processed FROM manifest WHERE file_name = ?", (file_name,)
+        ).fetchone()
+        return row is not None and row[0] == 1
+
+    def check(self, file_name, file_path, hash_file=None):
+        """
+        Decides whether a recording on disk still needs analysing, without
+        decoding it. Returns one of:
+          'new'       - never processed
+          'unchanged' - processed, same size and mtime (or an older row
+                        with no fingerprint - trusted by name, as before)
+          'duplicate' - processed, same content under a new mtime, e.g. the
+                        card was offloaded again into another DataLoad folder.
+                        The stored mtime is refreshed so the next run only stats it.
+          'changed'   - processed, but the content differs (re-copied after
+                        truncation, or a different recording with the same name)
+        Only 'new' and 'changed' files need analysing.
+        hash_file: content hash function to use instead of file_fingerprint,
+        e.g. one that remembers the hashes already taken this run.
+        """
+        row = self.conn.execute(
+            "SELECT processed, file_size, file_mtime, content_hash FROM manifest WHERE file_name = ?",
+            (file_name,),
+        ).fetchone()
+        if row is None or row[0] != 1:
+            return 'new'
+
+        _, size, mtime, content_hash = row
+        if size is None:
+            return 'unchanged'
+
+        st = os.stat(file_path)
+        if st.st_size != size:
+            return 'changed'
+        if st.st_mtime == mtime:
+            return 'unchanged'
+        digest = hash_file(file_path) if hash_file else file_fingerprint(file_path)[2]
+        if digest != content_hash:
+            return 'changed'
+
+        self.conn.execute("UPDATE manifest SET file_mtime = ? WHERE file_name = ?", (st.st_mtime, file_name))
+        return 'duplicate'
+
+    def update(self, file_name, processed, success, windows_total=None, windows_skipped=None, skipped_windows=None,
+               fingerprint=(None, None, None)):
+        """
+        Updates or adds a file's status. Staged until the next checkpoint().
+        fingerprint is file_fingerprint() of the recording that was analysed.
+        """
+        self.conn.execute(
+            "INSERT OR REPLACE INTO manifest VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (file_name, int(processed), int(success), datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+             windows_total, windows_skipped, skipped_windows, *fingerprint),
+        )
+
+    def checkpoint(self):
+        """
+        Commits every staged update in one transaction.
+        """
+        self.conn.commit()
+
+    def to_dataframe(self):
+        return pd.read_sql_query(
+            "SELECT * FROM manifest ORDER BY last_updated, file_name", self.conn
+        )
+
+    def export_parquet(self):
+        """
+        Writes the compacted manifest (one row per file) to processing_manifest.parquet.
+        """
+        self.checkpoint()
+        df_manifest = self.to_dataframe()
+        df_manifest.to_parquet(self.parquet_path, index=False)
+        return df_manifest
+
+    def close(self):
+        self.checkpoint()
+        self.conn.close()
+
+
+def get_processing_manifest(processed_dir, monitor_name):
+    """
+    Opens the monitor's processing manifest, creating it if it doesn't exist.
+    """
+    manifest = ProcessingManifest(processed_dir, monitor_name)
+    print(f"Loaded manifest from: {manifest.db_path} ({len(manifest)} files)")
+    return manifest
+
+# ==========================================
+# Audio Work Queue Utilities
+# ==========================================
+
+def discover_dataload_batches(raw_data_dir, monitors=None):
+    """
+    Finds every DataLoad_* batch with a Data/ folder under raw_data_dir.
+    Returns a list of (monitor_name, dataload_folder, recordings_dir).
+    monitors: only look in these monitor folders. None = every monitor
+    folder except the test_* ones.
+    """
+    if monitors is None:
+        monitors = sorted(m for m in os.listdir(raw_data_dir)
+                          if os.path.isdir(os.path.join(raw_data_dir, m))
+                          and not m.startswith(('.', 'test_')))
+
+    batches = []
+    for monitor in monitors:
+        monitor_dir = os.path.join(raw_data_dir, monitor)
+        if not os.path.isdir(monitor_dir):
+            print(f"!! Monitor folder not found: {monitor_dir}")
+            continue
+        for folder in sorted(os.listdir(monitor_dir)):
+            recordings_dir = os.path.join(monitor_dir, folder, "Data")
+            if folder.startswith('DataLoad') and os.path.isdir(recordings_dir):
+                batches.append((monitor, folder, recordings_dir))
+    return batches
+
+def _copy_evidence(file_path):
+    """
+    Ranks differing copies of one recording: (complete, size), where complete
+    means the WAV header parses and its data chunk fits in the file. A copy
+    cut short while offloading loses on both.
+    """
+    size = os.path.getsize(file_path)
+    try:
+        _, offset, data_bytes = read_wav_header(file_path, clip=False)
+    except (ValueError, struct.error):
+        return False, size
+    return offset + data_bytes <= size, size
+
+def build_work_queue(batches, manifests, newest_first=True, group_size=1):
+    """
+    Builds one global queue of unprocessed .wav files across monitors/batches.
+
+    batches: output of discover_dataload_batches.
+    manifests: dict of monitor_name -> ProcessingManifest, used for the skip check
+    (ProcessingManifest.check: new and changed files are queued, unchanged
+    files and re-copied duplicates are not). None = queue every file.
+    newest_first: order each monitor's files newest recording first (else oldest).
+    group_size: monitors take turns in runs of this many files (round robin),
+    so every monitor keeps moving however big another one's backlog is.
+
+    Returns (queue, rejected). Each queue item is a dict with monitor_name,
+    dataload_batch, file_name, file_path, file_date (YYYYMMDD), file_time
+    (HHMMSS), date (datetime) and status ('new' or 'changed'). rejected lists
+    (monitor_name, file_name) for files whose names can't be parsed.
+    """
+    per_monitor = {}
+    rejected = []
+    copies = {}       # (monitor, file) -> [(folder, file_path), ...] in batch order
+    duplicates = {}   # (monitor, folder) -> files skipped as re-copies
+    hashes = {}       # file_path -> content hash, so no copy is hashed twice in a run
+
+    def content_hash(file_path):
+        if file_path not in hashes:
+            hashes[file_path] = file_fingerprint(file_path)[2]
+        return hashes[file_path]
+
+    def skip_copy(monitor, folder):
+        duplicates[(monitor, folder)] = duplicates.get((monitor, folder), 0) + 1
+
+    # 1. Every copy of each recording: the same name can turn up in several
+    # DataLoad folders when a card is offloaded twice
+    for monitor, folder, recordings_dir in batches:
+        for file in sorted(os.listdir(recordings_dir)):
+            if not file.lower().endswith('.wav') or file.startswith('.'): continue
+            copies.setdefault((monitor, file), []).append((folder, os.path.join(recordings_dir, file)))
+
+    for (monitor, file), file_copies in copies.items():
+        # 2. Skip check against the monitor's manifest, on the latest copy.
+        # Nothing is hashed when its size and mtime match what was analysed,
+        # so re-copied cards aren't re-read on every run
+        manifest = manifests[monitor] if manifests is not None else None
+        latest_folder, latest_path = file_copies[-1]
+        status = manifest.check(file, latest_path, hash_file=content_hash) if manifest is not None else 'new'
+        if status not in ('new', 'changed'):
+            for folder, _ in file_copies[:-1]:
+                skip_copy(monitor, folder)
+            if status == 'duplicate':
+                skip_copy(monitor, latest_folder)
+            continue
+
+        # 3. One copy to analyse. Identical re-copies are skipped; if the
+        # content differs, the copies themselves decide rather than batch
+        # order: a complete WAV beats a truncated one, then the larger file,
+        # then the earlier batch
+        distinct = []
+        for copy_folder, copy_path in file_copies:
+            if any(content_hash(copy_path) == content_hash(kept) for _, kept in distinct):
+                skip_copy(monitor, copy_folder)
+            else:
+                distinct.append((copy_folder, copy_path))
+        folder, file_path = max(distinct, key=lambda copy: _copy_evidence(copy[1]))
+        if len(distinct) > 1:
+            print(f"!! {file} differs between {', '.join(f for f, _ in distinct)}; using {folder}")
+
+        # Parse date from filename (YYYYMMDD, HHMMSS)
+        try:
+            raw_date, raw_time = file[9:17], file[18:24]
+            date = datetime(year=int(file[9:13]), month=int(file[13:15]), day=int(file[15:17]))
+        except Exception as e:
+            print(f"!! Error with {file}: {e}")
+            rejected.append((monitor, file))
+            continue
+
+        per_monitor.setdefault(monitor, []).append({
+            'monitor_name': monitor,
+            'dataload_batch': folder,
+            'file_name': file,
+            'file_path': file_path,
+            'file_date': raw_date,
+            'file_time': raw_time,
+            'date': date,
+            'status': status,
+        })
+
+    for (monitor, folder), count in duplicates.items():
+        print(f"{monitor} | {folder}: skipped {count} re-copied file(s) already analysed")
+
+    for items in per_monitor.values():
+        items.sort(key=lambda item: (item['file_date'], item['file_time']), reverse=newest_first)
+
+    # Round robin across monitors, group_size files per turn
+    queue = []
+    position = 0
+    while any(position < len(items) for items in per_monitor.values()):
+        for items in per_monitor.values():
+            queue.extend(items[position:position + group_size])
+        position += group_size
+
+    return queue, rejected
+
+# ==========================================
+# Detections Schema Utilities
+# ==========================================
+
+_DICT_STRING = pa.dictionary(pa.int32(), pa.string())
+
+# Canonical on-disk schema for detections (daily files, master, dataset).
+# Repeated strings are dictionary-encoded (pandas loads them as categoricals),
+# scores and times are float32, and the recording start is stored once as a
+# timestamp with its hour precomputed, so nothing downstream has to re-parse
+# file_date / file_time. file_date (YYYYMMDD) and file_time (HHMMSS) stay as
+# strings for the scripts and exports that already use them.
+DETECTIONS_SCHEMA = pa.schema([
+    ('common_name', _DICT_STRING),
+    ('scientific_name', _DICT_STRING),
+    ('start_time', pa.float32()),
+    ('end_time', pa.float32()),
+    ('confidence', pa.float32()),
+    ('label', _DICT_STRING),
+    ('file_name', _DICT_STRING),
+    ('file_date', _DICT_STRING),
+    ('file_time', _DICT_STRING),
+    ('recorded_at', pa.timestamp('ms')),
+    ('hour', pa.int8()),
+    ('monitor_name', _DICT_STRING),
+    ('dataload_batch', _DICT_STRING),
+])
+# Bumped whenever DETECTIONS_SCHEMA changes; watermarks written under another
+# version trigger a one-off full rebuild of the master and dataset
+DETECTIONS_SCHEMA_VERSION = 2
+# Written with every detections parquet file
+PARQUET_COMPRESSION = "zstd"
+
+def conform_detections_table(data):
+    """
+    Converts detections (a DataFrame or pyarrow Table, in the old or new
+    layout) to DETECTIONS_SCHEMA:
+      - known columns are cast (integer file_date / file_time are zero-padded)
+      - recorded_at and hour are derived from file_date + file_time if missing
+      - missing columns become nulls; unknown extra columns are kept at the end
+    """
+    table = data if isinstance(data, pa.Table) else pa.Table.from_pandas(data, preserve_index=False)
+
+    def column(name):
+        col = table.column(name)
+        if pa.types.is_dictionary(col.type):
+            col = col.cast(col.type.value_type)
+        return col
+
+    def text(name, width):
+        col = column(name)
+        if not pa.types.is_string(col.type) and not pa.types.is_large_string(col.type):
+            col = pc.utf8_lpad(col.cast(pa.string()), width, "0")
+        return col.cast(pa.string())
+
+    names = set(table.column_names)
+    derived = {}
+    if {'file_date', 'file_time'} <= names:
+        derived['file_date'] = text('file_date', 8)
+        derived['file_time'] = text('file_time', 6)
+        if 'recorded_at' not in names:
+            stamp = pc.binary_join_element_wise(derived['file_date'], derived['file_time'], "")
+            derived['recorded_at'] = pc.strptime(stamp, format="%Y%m%d%H%M%S", unit="ms", error_is_null=True)
+        if 'hour' not in names:
+            recorded_at = derived.get('recorded_at', column('recorded_at') if 'recorded_at' in names else None)
+            derived['hour'] = pc.hour(recorded_at)
+
+    arrays, fields = [], []
+    for field in DETECTIONS_SCHEMA:
+        if field.name in derived:
+            col = derived[field.name]
+        elif field.name in names:
+            col = column(field.name)
+        else:
+            col = pa.nulls(len(table), field.type)
+        arrays.append(col.cast(field.type))
+        fields.append(field)
+
+    for name in table.column_names:
+        if name not in DETECTIONS_SCHEMA.names:
+            arrays.append(table.column(name))
+            fields.append(table.schema.field(name))
+
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+# ==========================================
+# Daily Detection Writer Utility
+# ==========================================
+
+class DailyDetectionWriter:
+    """
+    Buffered, append-only sink for detection rows, grouped by day.
+
+    add() keeps rows in memory. Once flush_rows rows are buffered, or
+    flush_seconds have passed since the last flush, every buffered day is
+    written out as a new part file - existing files are never re-read:
+        {output_dir}/_parts/{YYYYMMDD}/part-00000.parquet
+    finalize() runs once, when the batch ends: for each day with parts it
+    merges the existing recordings_batch_{date}.parquet (if any) with the
+    parts, writes the day file once and removes the parts. Leftover parts
+    from a crashed run are picked up by the next finalize().
+    Parts and day files are written in DETECTIONS_SCHEMA (zstd).
+    Parts are authoritative for the files they contain: a recording that was
+    reprocessed (e.g. it changed on disk) replaces its old rows in the day file.
+    Reprocessed recordings are also listed in each part's metadata, so one
+    that no longer has any detections still loses its old rows.
+    """
+
+    # Re-running a file after a crash can land the same detections twice
+    DEDUP_COLUMNS = ['file_name', 'start_time', 'end_time', 'label']
+
+    def __init__(self, output_dir, flush_rows=50000, flush_seconds=300):
+        self.output_dir = output_dir
+        self.parts_dir = os.path.join(output_dir, "_parts")
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self._buffers = {}          # file_date -> list of DataFrames
+        self._reprocessed = {}      # file_date -> file_names whose old rows are replaced
+        self._buffered_rows = 0
+        self._last_flush = time.monotonic()
+        self.flush_secs = 0.0       # total time spent writing part files
+
+    def add(self, file_date, df, reprocessed=None):
+        """
+        Buffers one file's detections for file_date (YYYYMMDD).
+        reprocessed: the file_name, if the file was analysed before - its old
+        rows are dropped from the day file even when df is empty.
+        Returns True if this call flushed the buffer to disk.
+        """
+        if reprocessed is not None:
+            self._reprocessed.setdefault(file_date, set()).add(reprocessed)
+        if not df.empty:
+            self._buffers.setdefault(file_date, []).append(df)
+            self._buffered_rows += len(df)
+
+        if (self._buffered_rows >= self.flush_rows
+                or time.monotonic() - self._last_flush >= self.flush_seconds):
+            self.flush()
+            return True
+        return False
+
+    def flush(self):
+        """
+        Writes each buffered day as one new part file, then empties the buffer.
+        """
+        started = time.perf_counter()
+        for file_date in sorted(set(self._buffers) | set(self._reprocessed)):
+            day_dir = os.path.join(self.parts_dir, file_date)
+            os.makedirs(day_dir, exist_ok=True)
+            part_no = len(glob.glob(os.path.join(day_dir, "part-*.parquet")))
+            part_path = os.path.join(day_dir, f"part-{part_no:05d}.parquet")
+            frames = self._buffers.get(file_date)
+            table = (conform_detections_table(pd.concat(frames, ignore_index=True)) if frames
+                     else DETECTIONS_SCHEMA.empty_table())
+            reprocessed = sorted(self._reprocessed.get(file_date, ()))
+            table = table.replace_schema_metadata({b'reprocessed': json.dumps(reprocessed)})
+            pq.write_table(table, part_path, compression=PARQUET_COMPRESSION)
+
+        if self._buffered_rows:
+            print(f"-> Flushed {self._buffered_rows} detections across {len(self._buffers)} day(s)")
+        self._buffers = {}
+        self._reprocessed = {}
+        self._buffered_rows = 0
+        self._last_flush = time.monotonic()
+        self.flush_secs += time.perf_counter() - started
+
+    def finalize(self):
+        """
+        Flushes anything still buffered, then writes each day file once.
+        Returns the list of day files written (or removed, if no rows are left).
+        """
+        self.flush()
+        written = []
+
+        for day_dir in sorted(glob.glob(os.path.join(self.parts_dir, "*"))):
+            file_date = os.path.basename(day_dir)
+            part_files = sorted(glob.glob(os.path.join(day_dir, "part-*.parquet")))
+            if not part_files:
+                continue
+
+            daily_output_path = os.path.join(self.output_dir, f"recordings_batch_{file_date}.parquet")
+            df_parts = pd.concat([pd.read_parquet(f) for f in part_files], ignore_index=True)
+            # Files whose old rows go: every file in the parts, and reprocessed
+            # files that no longer have any detections
+            replaced = set(df_parts['file_name'].dropna().astype(str))
+            for f in part_files:
+                metadata = pq.read_schema(f).metadata or {}
+                replaced.update(json.loads(metadata.get(b'reprocessed', b'[]')))
+
+            frames = [df_parts]
+            if os.path.exists(daily_output_path):
+                # Conformed first, so a day written in the old layout dedupes
+                # against the new parts (float32 times, etc.)
+                df_existing = conform_detections_table(pq.read_table(daily_output_path)).to_pandas()
+                frames.insert(0, df_existing[~df_existing['file_name'].astype(str).isin(replaced)])
+            df_day = pd.concat(frames, ignore_index=True)
+            df_day = df_day.drop_duplicates(subset=self.DEDUP_COLUMNS, ignore_index=True)
+
+            if df_day.empty:
+                # Every detection of the day was replaced by none: no day file
+                if os.path.exists(daily_output_path):
+                    os.remove(daily_output_path)
+                    written.append(daily_output_path)
+                    print(f"-> Removed {os.path.basename(daily_output_path)} (no detections left)")
+            else:
+                # Write to a temp file and swap it in, so a crash never leaves a half-written day
+                tmp_path = daily_output_path + ".tmp"
+                pq.write_table(conform_detections_table(df_day), tmp_path, compression=PARQUET_COMPRESSION)
+                os.replace(tmp_path, daily_output_path)
+                written.append(daily_output_path)
+                print(f"-> Finalized {len(df_day)} detections in {os.path.basename(daily_output_path)}")
+
+            for f in part_files:
+                os.remove(f)
+            os.rmdir(day_dir)
+
+        return written
+
+# ==========================================
+# Analysis Metrics Utility
+# ==========================================
+
+class AnalysisMetrics:
+    """
+    Per-file timing and throughput for run_audio_analysis.
+
+    record() takes one finished file and:
+      - appends a JSON line to jsonl_path (one row per file: audio seconds,
+        chunks scored, detections, decode / pre-screen / inference / write
+        seconds), tagged with this run's run_id
+      - rewrites the Prometheus textfile at prom_path (for node_exporter's
+        textfile collector), atomically
+    A file's write seconds only cover buffering its rows. The parquet I/O
+    happens in the writers' flushes and finalize, logged by record_write()
+    as their own JSON lines (with an 'event' instead of a file_name). The
+    'write' stage adds up all three (buffer, flush, finalize).
+    progress() and summary() give the batch rollups: real-time factor
+    (wall-clock seconds per second of audio, so 0.05 = 20x faster than real
+    time), files per minute and an ETA for the rest of the queue. These use
+    wall-clock time, so they already include the speedup from parallel workers.
+    """
+
+    STAGES = ['decode', 'prescreen', 'inference', 'write']
+    WRITE_STEPS = ['buffer', 'flush', 'finalize']
+
+    def __init__(self, jsonl_path, prom_path=None, total_files=0, segment_secs=3.0):
+        self.jsonl_path = jsonl_path
+        self.prom_path = prom_path
+        self.total_files = total_files
+        self.segment_secs = segment_secs
+        self.run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.started = time.monotonic()
+
+        self.files = {}         # (monitor, status) -> count
+        self.detections = {}    # monitor -> count
+        self.audio_secs = {}    # monitor -> seconds of audio scored
+        self.chunks = 0
+        self.stage_secs = dict.fromkeys(self.STAGES, 0.0)
+        self.write_secs = dict.fromkeys(self.WRITE_STEPS, 0.0)
+
+        os.makedirs(os.path.dirname(jsonl_path), exist_ok=True)
+        self._jsonl = open(jsonl_path, "a")
+
+    @property
+    def done(self):
+        return sum(self.files.values())
+
+    def record(self, monitor, dataload_batch, file_name, detections, error, stats, write_secs):
+        """
+        Logs one file. stats is the engine's per-file stats dict (None on error).
+        """
+        status = 'error' if error is not None else 'ok'
+        stats = stats or {}
+        windows = stats.get('windows', 0)
+        chunks = windows - len(stats.get('skipped', []))
+        audio_secs = windows * self.segment_secs
+        stage_secs = {
+            'decode': stats.get('decode_secs', 0.0),
+            'prescreen': stats.get('prescreen_secs', 0.0),
+            'inference': stats.get('inference_secs', 0.0),
+            'write': write_secs,
+        }
+
+        self.files[(monitor, status)] = self.files.get((monitor, status), 0) + 1
+        self.detections[monitor] = self.detections.get(monitor, 0) + len(detections)
+        self.audio_secs[monitor] = self.audio_secs.get(monitor, 0.0) + audio_secs
+        self.chunks += chunks
+        for stage, secs in stage_secs.items():
+            self.stage_secs[stage] += secs
+        self.write_secs['buffer'] += write_secs
+
+        self._jsonl.write(json.dumps({
+            'run_id': self.run_id,
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'monitor_name': monitor,
+            'dataload_batch': dataload_batch,
+            'file_name': file_name,
+            'status': status,
+            'error': error,
+            'audio_secs': audio_secs,
+            'chunks': chunks,
+            'windows': windows,
+            'detections': len(detections),
+            **{f"{stage}_secs": round(secs, 4) for stage, secs in stage_secs.items()},
+        }) + "\n")
+        self._jsonl.flush()
+
+        if self.prom_path:
+            self.write_prometheus()
+
+    def record_write(self, monitor, step, secs):
+        """
+        Logs parquet I/O that isn't tied to one file: step is 'flush' (a
+        writer writing its part files) or 'finalize' (the day files, when
+        the batch ends). Counted in the 'write' stage.
+        """
+        self.stage_secs['write'] += secs
+        self.write_secs[step] += secs
+
+        self._jsonl.write(json.dumps({
+            'run_id': self.run_id,
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'monitor_name': monitor,
+            'event': step,
+            'write_secs': round(secs, 4),
+        }) + "\n")
+        self._jsonl.flush()
+
+        if self.prom_path:
+            self.write_prometheus()
+
+    def rollup(self):
+        """
+        Batch-level numbers so far: dict with elapsed_secs, files_done,
+        files_remaining, files_per_minute, real_time_factor and eta_secs.
+        """
+        elapsed = time.monotonic() - self.started
+        audio = sum(self.audio_secs.values())
+        remaining = max(self.total_files - self.done, 0)
+        files_per_sec = self.done / elapsed if elapsed > 0 else 0.0
+        return {
+            'elapsed_secs': elapsed,
+            'files_done': self.done,
+            'files_remaining': remaining,
+            'files_per_minute': files_per_sec * 60,
+            'real_time_factor': elapsed / audio if audio else None,
+            'eta_secs': remaining / files_per_sec if files_per_sec else None,
+        }
+
+    def progress(self):
+        """
+        Short rollup for the progress line, e.g. "RTF 0.031 | 12.4 files/min | ETA 1h05m".
+        """
+        r = self.rollup()
+        rtf = f"RTF {r['real_time_factor']:.3f}" if r['real_time_factor'] is not None else "RTF -"
+        return f"{rtf} | {r['files_per_minute']:.1f} files/min | ETA {_format_duration(r['eta_secs'])}"
+
+    def summary(self):
+        """
+        End-of-run report: throughput plus where the time went, by stage.
+        """
+        r = self.rollup()
+        lines = [
+            f"Analysed {r['files_done']} file(s) ({sum(self.audio_secs.values()) / 3600:.1f} h of audio, "
+            f"{self.chunks} chunks) in {_format_duration(r['elapsed_secs'])}",
+            f"  {self.progress()}",
+        ]
+        total = sum(self.stage_secs.values())
+        for stage, secs in self.stage_secs.items():
+            share = secs / total if total else 0.0
+            lines.append(f"  {stage:<10} {secs:9.1f}s  ({share:.0%})")
+        lines.append("  write: " + ", ".join(f"{step} {secs:.1f}s" for step, secs in self.write_secs.items()))
+        return "\n".join(lines)
+
+    def write_prometheus(self):
+        """
+        Rewrites the Prometheus textfile (tmp file + rename, as node_exporter expects).
+        """
+        r = self.rollup()
+        lines = [
+            "# HELP nt_birddetect_files_total Recordings analysed, by monitor and status.",
+            "# TYPE nt_birddetect_files_total counter",
+        ]
+        lines += [f'nt_birddetect_files_total{{monitor="{m}",status="{st}"}} {n}'
+                  for (m, st), n in sorted(self.files.items())]
+        lines += [
+            "# HELP nt_birddetect_detections_total Detections written, by monitor.",
+            "# TYPE nt_birddetect_detections_total counter",
+        ]
+        lines += [f'nt_birddetect_detections_total{{monitor="{m}"}} {n}' for m, n in sorted(self.detections.items())]
+        lines += [
+            "# HELP nt_birddetect_audio_seconds_total Seconds of audio analysed, by monitor.",
+            "# TYPE nt_birddetect_audio_seconds_total counter",
+        ]
+        lines += [f'nt_birddetect_audio_seconds_total{{monitor="{m}"}} {v:.1f}' for m, v in sorted(self.audio_secs.items())]
+        lines += [
+            "# HELP nt_birddetect_chunks_total 3 s chunks scored by BirdNET.",
+            "# TYPE nt_birddetect_chunks_total counter",
+            f"nt_birddetect_chunks_total {self.chunks}",
+            "# HELP nt_birddetect_stage_seconds_total Time spent per pipeline stage.",
+            "# TYPE nt_birddetect_stage_seconds_total counter",
+        ]
+        lines += [f'nt_birddetect_stage_seconds_total{{stage="{stage}"}} {secs:.3f}'
+                  for stage, secs in self.stage_secs.items()]
+        lines += [
+            "# HELP nt_birddetect_write_seconds_total Time spent writing detections, by step (buffer, flush, finalize).",
+            "# TYPE nt_birddetect_write_seconds_total counter",
+        ]
+        lines += [f'nt_birddetect_write_seconds_total{{step="{step}"}} {secs:.3f}'
+                  for step, secs in self.write_secs.items()]
+        gauges = [
+            ('real_time_factor', "Wall-clock seconds per second of audio in the current run.", r['real_time_factor']),
+            ('files_per_minute', "Recordings analysed per minute in the current run.", r['files_per_minute']),
+            ('queue_remaining_files', "Recordings still queued in the current run.", r['files_remaining']),
+            ('eta_seconds', "Estimated seconds until the current run's queue is empty.", r['eta_secs']),
+        ]
+        for name, help_text, value in gauges:
+            if value is None:
+                continue
+            lines += [f"# HELP nt_birddetect_{name} {help_text}", f"# TYPE nt_birddetect_{name} gauge",
+                      f"nt_birddetect_{name} {value:.6g}"]
+        lines += [
+            "# HELP nt_birddetect_last_update_timestamp_seconds When these metrics were written.",
+            "# TYPE nt_birddetect_last_update_timestamp_seconds gauge",
+            f"nt_birddetect_last_update_timestamp_seconds {time.time():.0f}",
+        ]
+
+        os.makedirs(os.path.dirname(self.prom_path), exist_ok=True)
+        tmp_path = self.prom_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.prom_path)
+
+    def close(self):
+        if self.prom_path:
+            self.write_prometheus()
+        self._jsonl.close()
+
+
+def _format_duration(secs):
+    if secs is None:
+        return "-"
+    minutes, secs = divmod(int(secs), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{secs:02d}s"
+
+# ==========================================
+# CSV Export Utilities
+# ==========================================
+
+# File extension per CSV compression (None = plain CSV)
+CSV_EXTENSIONS = {None: ".csv", "gzip": ".csv.gz", "zstd": ".csv.zst"}
+
+def csv_export_path(base_path, compression=None):
+    """
+    base_path (no extension) + the extension for the compression.
+    """
+    if compression not in CSV_EXTENSIONS:
+        raise ValueError(f"Unsupported CSV compression: {compression} (use gzip or zstd)")
+    return base_path + CSV_EXTENSIONS[compression]
+
+def export_parquet_to_csv(parquet_path, csv_path, row_groups=None, compression=None, append=False,
+                          batch_size=65536):
+    """
+    Streams a parquet file into a CSV, record batch by record batch, with
+    Arrow's CSV writer - the table is never loaded whole or converted to
+    pandas, so memory stays flat however long the history gets.
+    row_groups: only export these row groups (default: all of them).
+    compression: None, "gzip" or "zstd".
+    append: add the rows, without a header, to the end of an existing
+    export. A compressed export gets a new gzip/zstd frame, which readers
+    decompress as one continuous stream.
+    A new export is written to a temp file and renamed into place.
+    Returns the number of rows written.
+    """
+    parquet_file = pq.ParquetFile(parquet_path)
+    out_path = csv_path if append else csv_path + ".tmp"
+    write_options = pacsv.WriteOptions(include_header=not append, quoting_style="needed")
+
+    rows = 0
+    with open(out_path, "ab" if append else "wb") as raw:
+        sink = pa.PythonFile(raw, mode="w")
+        stream = pa.CompressedOutputStream(sink, compression) if compression else sink
+        with pacsv.CSVWriter(stream, parquet_file.schema_arrow, write_options=write_options) as writer:
+            # One row group at a time: a single reader over the whole file
+            # holds on to memory as it goes, so peak RSS grew with the history
+            if row_groups is None:
+                row_groups = range(parquet_file.metadata.num_row_groups)
+            for i in row_groups:
+                for batch in parquet_file.iter_batches(batch_size=batch_size, row_groups=[i]):
+                    writer.write_batch(batch)
+                    rows += batch.num_rows
+        stream.close()
+
+    if not append:
+        os.replace(out_path, csv_path)
+    return rows
 
 # ==========================================
 # Consolidate Daily Parquets Utility
 # ==========================================
 
-def consolidate_daily_parquets(processed_dir, monitor_name):
+def _conform_table(table, schema):
+    """
+    Casts a table to the master schema: missing columns (e.g. dataload_batch
+    in days written before it existed) are filled with nulls.
+    """
+    columns = [table.column(f.name).cast(f.type) if f.name in table.column_names
+               else pa.nulls(len(table), f.type) for f in schema]
+    return pa.Table.from_arrays(columns, schema=schema)
+
+def _daily_file_signatures(daily_files):
+    """
+    {file name: {'size', 'mtime_ns'}} for a list of daily parquet paths,
+    used as the watermark to spot new or changed days.
     """
-    Finds all daily recordings_batch_*.parquet files and merges them into a 
-    single master file for the dashboard.
-    uses glob and * to find all files matching the pattern.
+    signatures = {}
+    for f in daily_files:
+        st = os.stat(f)
+        signatures[os.path.basename(f)] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    return signatures
+
+def consolidate_daily_parquets(processed_dir, monitor_name, csv_compression=None, csv_mode="full",
+                               memory_budget_mb=256, batch_size=65536):
+    """
+    Merges the daily recordings_batch_*.parquet files into a single master
+    file for the dashboard - incrementally, so a run costs what changed, not
+    the whole history.
+    The master holds each day in its own row group(s), in date order. A
+    watermark file (recordings_MASTER_watermark.json) remembers each day
+    file's size and mtime and which row groups it became, and the
+    DETECTIONS_SCHEMA_VERSION it was written in (any other version rebuilds).
     1. Path to where the daily files live
-    2. Find all files
-    3. Read and concatenate 
-        - for each file in daily_files, read it as a dataframe and append to a list
-        - then concatenate all dataframes in the list
-    4. Save the master file
+    2. Find all files and compare them with the watermark
+        - new or changed days are re-read from their daily file
+        - unchanged days are copied row group by row group from the old
+          master (Arrow only, no pandas and no day files re-read)
+        - no changes at all: nothing is rewritten
+    3. Write the new master (temp file + rename) and the watermark. Days are
+       streamed through one ParquetWriter as record batches of batch_size
+       rows; up to memory_budget_mb of them are buffered before being
+       written as a row group, so peak memory stays flat however many days
+       there are (a large day just becomes several row groups)
+    4. Stream the CSV export from the new master (export_parquet_to_csv),
+       compressed if csv_compression is "gzip" or "zstd":
+        - csv_mode="full": recordings_MASTER.csv is appended in place when
+          only days after the last exported one changed, else rewritten
+        - csv_mode="delta": only this run's new/changed days are written,
+          to recordings_MASTER_delta_{run time}.csv
     """
     # 1. Path to where the daily files live
-    search_path = os.path.join(processed_dir, monitor_name, "recordings_batch_*.parquet")
-    master_output_path = os.path.join(processed_dir, monitor_name, "recordings_MASTER.parquet")
-    
+    monitor_dir = os.path.join(processed_dir, monitor_name)
+    search_path = os.path.join(monitor_dir, "recordings_batch_*.parquet")
+    master_output_path = os.path.join(monitor_dir, "recordings_MASTER.parquet")
+    csv_output_path = csv_export_path(os.path.join(monitor_dir, "recordings_MASTER"), csv_compression)
+    watermark_path = os.path.join(monitor_dir, "recordings_MASTER_watermark.json")
+
     # 2. Find all files
     daily_files = sorted(glob.glob(search_path))
-    
+
     if not daily_files:
         print(f"No daily files found in {search_path}")
         return None
 
-    print(f"Consolidating {len(daily_files)} files...")
+    current = _daily_file_signatures(daily_files)
+
+    previous, old_master, csv_state = {}, None, {}
+    if os.path.exists(watermark_path) and os.path.exists(master_output_path):
+        with open(watermark_path, "r") as f:
+            stored = json.load(f)
+        previous = stored.get('days', {})
+        # Which full CSV export is current, and the last day it holds
+        csv_state = stored.get('csv', {})
+        old_master = pq.ParquetFile(master_output_path)
+        # A master written by something else can't be spliced - rebuild it
+        if old_master.metadata.num_row_groups != sum(len(d['row_groups']) for d in previous.values()):
+            print("!! Master does not match its watermark; rebuilding from every daily file.")
+            previous, old_master = {}, None
+        # Nor can one written in an older detections schema
+        elif stored.get('schema_version') != DETECTIONS_SCHEMA_VERSION:
+            print(f"Master predates detections schema v{DETECTIONS_SCHEMA_VERSION}; rebuilding from every daily file.")
+            previous, old_master = {}, None
+
+    changed = [day for day, sig in current.items()
+               if day not in previous or (previous[day]['size'], previous[day]['mtime_ns']) != (sig['size'], sig['mtime_ns'])]
+    removed = [day for day in previous if day not in current]
+
+    if not changed and not removed:
+        print(f"Master is up to date ({len(current)} days, nothing changed).")
+        # The full CSV is still written if it's missing (e.g. NT_CSV_COMPRESSION changed)
+        if csv_mode != "delta" and not os.path.exists(csv_output_path):
+            export_parquet_to_csv(master_output_path, csv_output_path, compression=csv_compression)
+            print(f"Success: CSV export created at {csv_output_path}")
+            stored['csv'] = {'path': os.path.basename(csv_output_path), 'last_day': max(current)}
+            with open(watermark_path + ".tmp", "w") as f:
+                json.dump(stored, f)
+            os.replace(watermark_path + ".tmp", watermark_path)
+        return master_output_path
+
+    print(f"Consolidating {len(daily_files)} days: {len(changed)} new/changed, "
+          f"{len(removed)} removed, {len(current) - len(changed)} unchanged...")
+
+    # The master schema is the union of every day's columns (in
+    # DETECTIONS_SCHEMA, whatever layout they were written in) - worked out
+    # from the file footers, without reading any rows
+    schemas = [conform_detections_table(pq.read_schema(os.path.join(monitor_dir, day)).empty_table()).schema
+               for day in changed]
+    if old_master is not None:
+        schemas.insert(0, old_master.schema_arrow)
+    schema = pa.unify_schemas(schemas, promote_options="permissive")
+
+    def day_batches(day):
+        # Changed days are re-read from their daily file, the rest copied
+        # from the old master's row groups; either way one batch at a time
+        if day in changed:
+            batches = pq.ParquetFile(os.path.join(monitor_dir, day)).iter_batches(batch_size=batch_size)
+            return (conform_detections_table(pa.Table.from_batches([b])) for b in batches)
+        return (pa.Table.from_batches([b]) for b in
+                old_master.iter_batches(batch_size=batch_size, row_groups=previous[day]['row_groups']))
+
+    # 3. Write the new master, day by day (a day never shares a row group)
+    tmp_path = master_output_path + ".tmp"
+    budget = memory_budget_mb * 1024 * 1024
+    watermark = {}
+    buffered = []
+
+    def flush(writer):
+        # Buffered batches -> one row group
+        if buffered:
+            table = pa.concat_tables(buffered)
+            writer.write_table(table, row_group_size=len(table))
+            buffered.clear()
+
+    with pq.ParquetWriter(tmp_path, schema, compression=PARQUET_COMPRESSION) as writer:
+        for day in sorted(current):
+            rows, buffered_bytes = 0, 0
+            for table in day_batches(day):
+                if not len(table):
+                    continue
+                buffered.append(_conform_table(table, schema))
+                rows += len(table)
+                buffered_bytes += buffered[-1].nbytes
+                if buffered_bytes >= budget:
+                    flush(writer)
+                    buffered_bytes = 0
+            flush(writer)
+            watermark[day] = {**current[day], 'rows': rows, 'row_groups': []}
+
+    # Map the written row groups back to their days, by row count
+    metadata = pq.ParquetFile(tmp_path).metadata
+    days = iter(day for day in sorted(watermark) if watermark[day]['rows'])
+    day, left = None, 0
+    for i in range(metadata.num_row_groups):
+        if left == 0:
+            day = next(days)
+            left = watermark[day]['rows']
+        watermark[day]['row_groups'].append(i)
+        left -= metadata.row_group(i).num_rows
+    total_rows = metadata.num_rows
+
+    os.replace(tmp_path, master_output_path)
+    print(f"Success: Master file updated with {total_rows} total detections.")
+
+    # 4. CSV export, streamed from the new master's row groups
+    changed_row_groups = sorted(i for day in changed for i in watermark[day]['row_groups'])
+    if csv_mode == "delta":
+        run_stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        delta_path = csv_export_path(os.path.join(monitor_dir, f"recordings_MASTER_delta_{run_stamp}"), csv_compression)
+        rows = export_parquet_to_csv(master_output_path, delta_path, row_groups=changed_row_groups,
+                                     compression=csv_compression)
+        print(f"Success: {rows} detections from {len(changed)} new/changed day(s) exported to {delta_path}")
+        if removed:
+            print(f"!! {len(removed)} removed day(s) can't be expressed in a delta export: {', '.join(sorted(removed))}")
+    else:
+        # Append the new days when they all come after the ones already
+        # exported (the usual daily run), otherwise rewrite the whole file
+        # (also when the old master holds no days, so there's nothing to follow)
+        can_append = (os.path.exists(csv_output_path) and not removed and old_master is not None and previous
+                      and csv_state.get('path') == os.path.basename(csv_output_path)
+                      and csv_state.get('last_day') == max(previous)
+                      and schema.equals(old_master.schema_arrow)
+                      and min(changed) > max(previous))
+        if can_append:
+            export_parquet_to_csv(master_output_path, csv_output_path, row_groups=changed_row_groups,
+                                  compression=csv_compression, append=True)
+            print(f"Success: {len(changed)} day(s) appended to CSV export at {csv_output_path}")
+        else:
+            export_parquet_to_csv(master_output_path, csv_output_path, compression=csv_compression)
+            print(f"Success: CSV export created at {csv_output_path}")
+        csv_state = {'path': os.path.basename(csv_output_path), 'last_day': max(watermark)}
+
+    # Written last, so a crash before here rebuilds the CSV rather than
+    # trusting an export that may be missing days
+    with open(watermark_path + ".tmp", "w") as f:
+        json.dump({'schema_version': DETECTIONS_SCHEMA_VERSION, 'days': watermark, 'csv': csv_state}, f)
+    os.replace(watermark_path + ".tmp", watermark_path)
+
+    return master_output_path
+
+# ==========================================
+# Detections Dataset Utilities
+# ==========================================
+
+# Hive partition keys, in directory order: detections/monitor=/year=/month=/date=/
+DETECTIONS_PARTITIONING = ds.partitioning(
+    pa.schema([('monitor', pa.string()), ('year', pa.int32()), ('month', pa.int32()), ('date', pa.string())]),
+    flavor="hive",
+)
+# Rows within each day are sorted by these and written in row groups small
+# enough that a day spans several, so each row group covers a narrow range of
+# scientific names and read_detections skips the ones outside a species
+# filter by their statistics (_species_row_groups)
+DETECTIONS_SORT_COLUMNS = ['scientific_name', 'file_time', 'start_time']
+
+def publish_detections_dataset(processed_dir, monitor_name, row_group_size=8192):
+    """
+    Publishes the monitor's daily parquets as a Hive-partitioned Arrow dataset:
+        {processed_dir}/detections/monitor={monitor}/year=YYYY/month=MM/date=YYYYMMDD/part-0.parquet
+    Consumers read it with read_detections(), which only opens the
+    partitions and row groups a query needs - unlike recordings_MASTER.parquet,
+    which always has to be loaded whole.
+    Incremental, like consolidate_daily_parquets: a watermark
+    (detections/_watermarks/{monitor}.json) of each day file's size and
+    mtime means only new or changed days are rewritten, and removed days
+    are deleted. Partitions are written in DETECTIONS_SCHEMA, and a
+    watermark from an older schema version republishes every day. The union
+    schema of every partition is kept in detections/_common_metadata, so a
+    column added later is read as null for older days instead of being
+    dropped.
+    """
+    monitor_dir = os.path.join(processed_dir, monitor_name)
+    dataset_dir = os.path.join(processed_dir, "detections")
+    watermark_path = os.path.join(dataset_dir, "_watermarks", f"{monitor_name}.json")
+    schema_path = os.path.join(dataset_dir, "_common_metadata")
+
+    daily_files = sorted(glob.glob(os.path.join(monitor_dir, "recordings_batch_*.parquet")))
+    current = _daily_file_signatures(daily_files)
+
+    previous = {}
+    if os.path.exists(watermark_path):
+        with open(watermark_path, "r") as f:
+            stored = json.load(f)
+        # Days published in an older detections schema are all rewritten
+        if stored.get('schema_version') == DETECTIONS_SCHEMA_VERSION:
+            previous = stored['days']
+        else:
+            print(f"Republishing {monitor_name} in detections schema v{DETECTIONS_SCHEMA_VERSION}.")
+            previous = {day: None for day in stored.get('days', stored)}
+
+    changed = [day for day in current if previous.get(day) != current[day]]
+    removed = [day for day in previous if day not in current]
+    if not changed and not removed:
+        print(f"Detections dataset is up to date for {monitor_name} ({len(current)} days).")
+        return dataset_dir
+
+    def partition_dir(day):
+        file_date = day[len("recordings_batch_"):-len(".parquet")]
+        return os.path.join(dataset_dir, f"monitor={monitor_name}", f"year={file_date[:4]}",
+                            f"month={file_date[4:6]}", f"date={file_date}")
+
+    schemas = []
+    for day in changed:
+        table = conform_detections_table(pq.read_table(os.path.join(monitor_dir, day)))
+        # Arrow can't sort on dictionary columns directly: sort on their values
+        keys = pa.table({c: table.column(c).cast(pa.string()) for c in DETECTIONS_SORT_COLUMNS})
+        table = table.take(pc.sort_indices(keys, [(c, "ascending") for c in DETECTIONS_SORT_COLUMNS]))
+        schemas.append(table.schema)
+
+        out_dir = partition_dir(day)
+        os.makedirs(out_dir, exist_ok=True)
+        out_path = os.path.join(out_dir, "part-0.parquet")
+        pq.write_table(table, out_path + ".tmp", row_group_size=row_group_size,
+                       write_statistics=True, compression=PARQUET_COMPRESSION)
+        os.replace(out_path + ".tmp", out_path)
+
+    for day in removed:
+        out_path = os.path.join(partition_dir(day), "part-0.parquet")
+        if os.path.exists(out_path):
+            os.remove(out_path)
+            os.rmdir(partition_dir(day))
+
+    # Shared by every monitor: keep the columns the others added, unless it
+    # was written in an older schema (they catch up on their next publish)
+    schema = pa.unify_schemas(schemas or [DETECTIONS_SCHEMA], promote_options="permissive")
+    if os.path.exists(schema_path):
+        try:
+            schema = pa.unify_schemas([pq.read_schema(schema_path), schema], promote_options="permissive")
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            print("!! Existing dataset schema predates the detections schema; replacing it.")
+    pq.write_metadata(schema, schema_path)
+    os.makedirs(os.path.dirname(watermark_path), exist_ok=True)
+    with open(watermark_path + ".tmp", "w") as f:
+        json.dump({'schema_version': DETECTIONS_SCHEMA_VERSION, 'days': current}, f)
+    os.replace(watermark_path + ".tmp", watermark_path)
+
+    print(f"Success: Detections dataset updated for {monitor_name} "
+          f"({len(changed)} day(s) written, {len(removed)} removed) at {dataset_dir}")
+    return dataset_dir
+
+def open_detections_dataset(processed_dir):
+    """
+    Opens {processed_dir}/detections as a pyarrow dataset (lazy - nothing is
+    read until a scan). Returns None if it hasn't been published yet.
+    """
+    dataset_dir = os.path.join(processed_dir, "detections")
+    schema_path = os.path.join(dataset_dir, "_common_metadata")
+    if not os.path.exists(schema_path):
+        return None
+
+    schema = pq.read_schema(schema_path)
+    for field in DETECTIONS_PARTITIONING.schema:
+        schema = schema.append(field)
+    return ds.dataset(dataset_dir, format="parquet", partitioning=DETECTIONS_PARTITIONING, schema=schema)
+
+def _species_row_groups(fragment, scientific_names):
+    # The fragment cut down to the row groups whose scientific_name range can
+    # hold one of the names. Arrow doesn't prune dictionary columns by their
+    # statistics itself, so this is what makes the species sort pay off.
+    keep = []
+    for row_group in fragment.row_groups:
+        stats = (row_group.statistics or {}).get('scientific_name')
+        if not stats or any(stats['min'] <= name <= stats['max'] for name in scientific_names):
+            keep.append(row_group.id)
+    return fragment.subset(row_group_ids=keep)
+
+def _yyyymmdd(value):
+    return value if isinstance(value, str) else pd.Timestamp(value).strftime("%Y%m%d")
+
+def read_detections(processed_dir, monitor_name=None, start_date=None, end_date=None,
+                    species=None, min_confidence=None, columns=None):
+    """
+    Loads detections from the partitioned dataset with filter and projection
+    pushdown: the date range and monitor prune whole partitions (directories),
+    species and min_confidence prune row groups by their statistics, and only
+    the requested columns are decoded.
+    start_date / end_date: inclusive, as 'YYYYMMDD' strings or dates.
+    species: list of common or scientific names.
+    columns: columns to return (default: every detection column, without the
+    monitor/year/month/date partition keys - the same columns as the master).
+    Returns a DataFrame, or None if the dataset hasn't been published yet.
+    """
+    dataset = open_detections_dataset(processed_dir)
+    if dataset is None:
+        return None
 
-    # 3. Read and concatenate
-    df_list = [pd.read_parquet(f) for f in daily_files]
-    df_master = pd.concat(df_list, ignore_index=True)
+    def all_of(conditions):
+        row_filter = None
+        for condition in conditions:
+            row_filter = condition if row_filter is None else row_filter & condition
+        return row_filter
 
-    # 4. Save the master file
-    df_master.to_parquet(master_output_path, index=False)
-    print(f"Success: Master file created with {len(df_master)} total detections.")
+    conditions = []
+    if monitor_name is not None:
+        conditions.append(pc.field('monitor') == monitor_name)
+    if start_date is not None:
+        conditions.append(pc.field('date') >= _yyyymmdd(start_date))
+    if end_date is not None:
+        conditions.append(pc.field('date') <= _yyyymmdd(end_date))
+    if species:
+        # Common names are resolved to scientific names first (reading just
+        # that column, in the selected partitions), so the filter is on the
+        # column the day files are sorted by and prunes their row groups
+        species = list(species)
+        named = dataset.to_table(columns=['scientific_name'],
+                                 filter=all_of(conditions + [pc.field('common_name').isin(species)]))
+        scientific = set(species) | set(pc.unique(named.column('scientific_name')).to_pylist())
+        conditions.append(pc.field('scientific_name').isin(sorted(scientific)))
+    if min_confidence is not None:
+        conditions.append(pc.field('confidence') >= min_confidence)
 
-    csv_output_path = os.path.join(processed_dir, monitor_name, "recordings_MASTER.csv")
-    df_master.to_csv(csv_output_path, index=False)
-    print(f"Success: CSV export created at {csv_output_path}")
+    row_filter = all_of(conditions)
+    if species:
+        # The filter still checks every row read; this only drops row groups
+        fragments = [_species_row_groups(fragment, scientific) for fragment in dataset.get_fragments(filter=row_filter)]
+        dataset = ds.FileSystemDataset(fragments, dataset.schema, dataset.format, dataset.filesystem)
 
-    return master_output_path
\ No newline at end of file
+    if columns is None:
+        partition_keys = set(DETECTIONS_PARTITIONING.schema.names)
+        columns = [name for name in dataset.schema.names if name not in partition_keys]
+    return dataset.to_table(columns=columns, filter=row_filter).to_pandas()
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.analytics_gold_utils import build_confidence_histograms, build_detection_cube, histogram_column
+
+
+def test_threshold_counts_match_filtering_the_detections():
+    rng = np.random.default_rng(1)
+    n = 500
+    df = pd.DataFrame({
+        'file_date': rng.choice(["20250101", "20250102"], n),
+        'file_time': rng.choice(["050000", "061500", "220000"], n),
+        'common_name': rng.choice(["Robin", "Wren", "Owl"], n),
+        'confidence': rng.uniform(0.5, 1.0, n).round(2),
+        'monitor_name': "site_a",
+    })
+    df['scientific_name'] = df['common_name'] + " sci"
+    df['label'] = df['scientific_name'] + "_" + df['common_name']
+    df['hour'] = df['file_time'].str[:2].astype(int)
+    df_hist = build_confidence_histograms(build_detection_cube(df))
+
+    assert histogram_column(0.9) == "ge_090"
+    for threshold in (0.0, 0.5, 0.65, 0.9, 0.95, 1.0):
+        expected = df[df['confidence'] >= threshold].groupby(['file_date', 'hour', 'common_name']).size()
+        got = df_hist.set_index(['file_date', 'hour', 'common_name'])[histogram_column(threshold)]
+        got = got[got > 0]
+        assert got.sort_index().tolist() == expected.sort_index().tolist()
+
+
+def test_threshold_between_bin_edges_is_rejected():
+    assert histogram_column(0.15) == "ge_015"
+    # 0.93 would otherwise become ge_095 (or ge_090): neither counts >= 0.93
+    for threshold in (0.93, 0.925, 1.05):
+        with pytest.raises(ValueError):
+            histogram_column(threshold)
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from utils.analytics_gold_utils import build_detection_cube, compute_daily_summary, update_daily_summary, \
+    update_detection_cube
+
+
+def detections(file_date, species_counts, hour="05"):
+    rows = [(name, i) for name, n in species_counts.items() for i in range(n)]
+    return pd.DataFrame({
+        'file_date': [file_date] * len(rows),
+        'file_time': [f"{hour}0000"] * len(rows),
+        'common_name': [name for name, _ in rows],
+        'scientific_name': [name for name, _ in rows],
+        'label': [f"{name}_{name}" for name, _ in rows],
+        'confidence': [0.8] * len(rows),
+        'monitor_name': ["site_a"] * len(rows),
+    })
+
+
+def test_indices_match_their_formulas():
+    df = pd.concat([detections("20250101", {"Robin": 3, "Wren": 1}),
+                    detections("20250103", {"Robin": 2}, hour="21")], ignore_index=True)
+    df_summary = compute_daily_summary(build_detection_cube(df))
+
+    # Only recorded days get a row
+    assert df_summary['date'].tolist() == ["2025-01-01", "2025-01-03"]
+    day1 = df_summary.iloc[0]
+    p = np.array([0.75, 0.25])
+    assert day1['richness'] == 2
+    assert np.isclose(day1['shannon_index'], -(p * np.log(p)).sum())
+    assert np.isclose(day1['simpson_index'], 1 - (p ** 2).sum())
+    assert day1['occupancy_pct'] == round(100 / 24, 2)
+
+    # 7-day window on the 3rd pools both days: Robin 5, Wren 1
+    day3 = df_summary.iloc[1]
+    p = np.array([5, 1]) / 6
+    assert day3['detections_7d'] == 6 and day3['richness_7d'] == 2
+    assert np.isclose(day3['shannon_index_7d'], -(p * np.log(p)).sum())
+    assert day3['shannon_index'] == 0.0
+
+
+def test_incremental_update_matches_full_rebuild(tmp_path):
+    processed, analytics = tmp_path / "processed", tmp_path / "analytics" / "site_a"
+    monitor_dir = processed / "site_a"
+    monitor_dir.mkdir(parents=True)
+    for i, day in enumerate(["20250101", "20250105", "20250120"]):
+        detections(day, {"Robin": i + 1, "Wren": 2}).to_parquet(
+            monitor_dir / f"recordings_batch_{day}.parquet", index=False)
+    update_detection_cube(str(processed), str(analytics), "site_a")
+    update_daily_summary(str(analytics))
+
+    # A new day inside the earlier days' 30-day windows
+    detections("20250110", {"Owl": 4}).to_parquet(monitor_dir / "recordings_batch_20250110.parquet", index=False)
+    update_detection_cube(str(processed), str(analytics), "site_a")
+    summary_path = update_daily_summary(str(analytics))
+
+    df_incremental = pd.read_parquet(summary_path)
+    df_full = compute_daily_summary(pd.read_parquet(analytics / "detection_cube.parquet"))
+    pd.testing.assert_frame_equal(df_incremental, df_full, check_dtype=False)
+    assert df_incremental.loc[df_incremental['file_date'] == "20250120", 'richness_30d'].item() == 3
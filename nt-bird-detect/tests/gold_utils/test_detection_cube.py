@@ -0,0 +1,62 @@
+import os
+
+import pandas as pd
+
+from utils.analytics_gold_utils import build_detection_cube, query_detection_cube, update_detection_cube
+
+
+def detections(file_date, rows):
+    # rows: (file_time, common_name, confidence)
+    return pd.DataFrame({
+        'file_date': [file_date] * len(rows),
+        'file_time': [t for t, _, _ in rows],
+        'common_name': [c for _, c, _ in rows],
+        'scientific_name': [f"{c} sci" for _, c, _ in rows],
+        'label': [f"{c} sci_{c}" for _, c, _ in rows],
+        'confidence': [p for _, _, p in rows],
+        'monitor_name': ["site_a"] * len(rows),
+    })
+
+
+def test_cube_answers_threshold_queries_exactly():
+    df = detections("20250101", [
+        ("050000", "Robin", 0.55), ("050500", "Robin", 0.9), ("061000", "Robin", 0.95),
+        ("050000", "Wren", 0.89), ("050000", "Wren", 0.91),
+    ])
+    df_cube = build_detection_cube(df)
+
+    # Also in float32, as stored in the compact schema: 0.9 must still be >= 0.9
+    for df_conf in (df, df.astype({'confidence': 'float32'})):
+        cube = build_detection_cube(df_conf)
+        for threshold in (0.5, 0.9, 0.95):
+            expected = df_conf[df_conf['confidence'] >= threshold].groupby('common_name').size().to_dict()
+            got = query_detection_cube(cube, ['common_name'], min_confidence=threshold)
+            assert dict(zip(got['common_name'], got['detections'])) == expected
+
+    by_hour = query_detection_cube(df_cube, ['hour', 'common_name'], min_confidence=0.9)
+    assert by_hour[['hour', 'common_name', 'detections']].values.tolist() == [
+        [5, "Robin", 1], [5, "Wren", 1], [6, "Robin", 1]]
+    assert by_hour['confidence_max'].max() == 0.95
+
+
+def test_only_changed_days_are_reaggregated(tmp_path):
+    monitor_dir, analytics_dir = tmp_path / "processed" / "site_a", tmp_path / "analytics" / "site_a"
+    monitor_dir.mkdir(parents=True)
+    detections("20250101", [("050000", "Robin", 0.9)] * 3).to_parquet(
+        monitor_dir / "recordings_batch_20250101.parquet", index=False)
+    detections("20250102", [("050000", "Wren", 0.8)]).to_parquet(
+        monitor_dir / "recordings_batch_20250102.parquet", index=False)
+
+    cube_path = update_detection_cube(str(tmp_path / "processed"), str(analytics_dir), "site_a")
+    mtime = os.stat(cube_path).st_mtime_ns
+    update_detection_cube(str(tmp_path / "processed"), str(analytics_dir), "site_a")
+    assert os.stat(cube_path).st_mtime_ns == mtime
+
+    # Day 2 reprocessed with more detections, day 1 removed
+    detections("20250102", [("050000", "Wren", 0.8)] * 2).to_parquet(
+        monitor_dir / "recordings_batch_20250102.parquet", index=False)
+    (monitor_dir / "recordings_batch_20250101.parquet").unlink()
+    update_detection_cube(str(tmp_path / "processed"), str(analytics_dir), "site_a")
+
+    df_cube = pd.read_parquet(cube_path)
+    assert df_cube[['file_date', 'common_name', 'detections']].values.tolist() == [["20250102", "Wren", 2]]
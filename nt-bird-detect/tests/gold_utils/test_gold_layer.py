@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.analytics_gold_utils import (build_gold_layer_duckdb, build_gold_layer_pandas,
+                                        calculate_species_daily_profiles)
+
+OUTPUTS = ["species_totals.parquet", "daily_unique_species.parquet", "hourly_activity_patterns.parquet",
+           "calculate_species_daily_profiles.parquet"]
+CSV_OUTPUTS = ["bird_call_counts.csv", "date_bird_call_counts.csv", "date_time_call_counts.csv"]
+
+
+def synthetic_detections(seed=0, n=2000):
+    rng = np.random.default_rng(seed)
+    species = [("Erithacus rubecula", "European Robin"), ("Turdus merula", "Eurasian Blackbird"),
+               ("Troglodytes troglodytes", "Eurasian Wren"), ("Strix aluco", "Tawny Owl")]
+    pick = rng.integers(0, len(species), n)
+    return pd.DataFrame({
+        'common_name': [species[i][1] for i in pick],
+        'scientific_name': [species[i][0] for i in pick],
+        'confidence': rng.uniform(0.5, 1.0, n).astype('float32'),
+        'label': [f"{species[i][0]}_{species[i][1]}" for i in pick],
+        'file_date': rng.choice(["20250101", "20250102", "20250103"], n),
+        'file_time': rng.choice(["050000", "051000", "120000", "221500"], n),
+    })
+
+
+@pytest.fixture
+def gold_outputs(tmp_path):
+    df = synthetic_detections()
+    source = tmp_path / "detections.parquet"
+    df.to_parquet(source, index=False)
+
+    dirs = {}
+    for engine in ("pandas", "duckdb"):
+        analytics_dir, csv_dir = tmp_path / engine, tmp_path / engine / "csv"
+        csv_dir.mkdir(parents=True)
+        if engine == "pandas":
+            build_gold_layer_pandas(df.copy(), str(analytics_dir), str(csv_dir))
+        else:
+            build_gold_layer_duckdb([str(source)], str(analytics_dir), str(csv_dir), threads=2)
+        dirs[engine] = analytics_dir
+    return dirs
+
+
+@pytest.mark.parametrize("output", OUTPUTS)
+def test_duckdb_matches_pandas_parquet(gold_outputs, output):
+    expected = pd.read_parquet(gold_outputs["pandas"] / output)
+    got = pd.read_parquet(gold_outputs["duckdb"] / output)
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False, atol=1e-6)
+
+
+@pytest.mark.parametrize("output", CSV_OUTPUTS)
+def test_duckdb_matches_pandas_csv(gold_outputs, output):
+    # Only tie order within equal counts may differ, so compare as sorted sets
+    expected = pd.read_csv(gold_outputs["pandas"] / "csv" / output, dtype=str)
+    got = pd.read_csv(gold_outputs["duckdb"] / "csv" / output, dtype=str)
+    assert list(got.columns) == list(expected.columns)
+    key = list(expected.columns)
+    pd.testing.assert_frame_equal(got.sort_values(key, ignore_index=True), expected.sort_values(key, ignore_index=True))
+
+
+def test_profiles_use_stored_hour_and_leave_the_frame_alone():
+    df = synthetic_detections().assign(file_time=lambda d: d['file_time'].astype(int))
+    df['hour'] = (df['file_time'] // 10000).astype('int8')
+    before = df.copy()
+
+    with_hour = calculate_species_daily_profiles(df)
+    derived = calculate_species_daily_profiles(df.drop(columns='hour'))
+
+    pd.testing.assert_frame_equal(df, before)
+    pd.testing.assert_frame_equal(with_hour, derived)
+
+
+def test_pandas_csv_pads_integer_file_time(tmp_path):
+    df = synthetic_detections().assign(file_time=lambda d: d['file_time'].astype(int))
+    csv_dir = tmp_path / "csv"
+    csv_dir.mkdir()
+    build_gold_layer_pandas(df, str(tmp_path), str(csv_dir))
+
+    times = pd.read_csv(csv_dir / "date_time_call_counts.csv", dtype=str)['file_time']
+    assert set(times) == {"050000", "051000", "120000", "221500"}
+    assert df['file_time'].dtype.kind == 'i'
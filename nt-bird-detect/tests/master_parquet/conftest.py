@@ -2,7 +2,14 @@ import os
 import pytest
 import pandas as pd
 
+from utils.processing_silver_utils import read_detections
+
 @pytest.fixture(scope="session")
 def df_master(processed_data_dir, monitor_name):
+    # Prefer the partitioned dataset (only this monitor's partitions are read);
+    # fall back to the master file if it hasn't been published yet
+    df = read_detections(processed_data_dir, monitor_name=monitor_name)
+    if df is not None:
+        return df
     path = os.path.join(processed_data_dir, monitor_name, "recordings_MASTER.parquet")
     return pd.read_parquet(path)
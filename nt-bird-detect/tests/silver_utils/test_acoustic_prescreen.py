@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from utils.processing_silver_utils import (
+    format_window_ranges,
+    prescreen_keep_mask,
+    prescreen_recall,
+    window_activity_features,
+)
+
+SR = 48000
+
+
+def _window(seed, chirp=False):
+    rng = np.random.default_rng(seed)
+    segment = (rng.normal(0, 0.001, 3 * SR)).astype(np.float32)
+    if chirp:
+        # A 0.3 s whistle at 4 kHz, in the middle of the window
+        t = np.arange(int(0.3 * SR)) / SR
+        segment[SR:SR + len(t)] += 0.2 * np.sin(2 * np.pi * 4000 * t).astype(np.float32)
+    return segment
+
+
+def test_keeps_the_call_and_its_neighbours_skips_background():
+    features = [window_activity_features(_window(i, chirp=(i == 6))) for i in range(40)]
+    keep = prescreen_keep_mask(features, k=3.0, dilate=1)
+
+    assert keep[5:8].all()
+    # Steady background: nearly every other window is skipped
+    assert np.delete(keep, [5, 6, 7]).mean() < 0.2
+
+
+def test_short_files_are_kept_in_full():
+    assert prescreen_keep_mask([(0.0, 0.0)] * 3).all()
+
+
+def test_window_ranges_are_compacted():
+    assert format_window_ranges([27.0, 0.0, 3.0, 6.0]) == "0-9,27-30"
+    assert format_window_ranges([]) == ""
+
+
+def test_recall_against_full_run():
+    df_full = pd.DataFrame({'file_name': ["a.wav"] * 4, 'start_time': [0.0, 3.0, 6.0, 9.0],
+                            'label': ["robin"] * 4})
+    recall, missed = prescreen_recall(df_full, df_full.iloc[[0, 2, 3]])
+
+    assert recall == 0.75
+    assert missed['start_time'].tolist() == [3.0]
+
+
+def test_recall_is_zero_when_the_screened_run_finds_nothing():
+    df_full = pd.DataFrame({'file_name': ["a.wav"] * 2, 'start_time': [0.0, 3.0], 'label': ["robin", "wren"]})
+
+    # audit_prescreen builds an empty run as pd.DataFrame([]): no columns
+    recall, missed = prescreen_recall(df_full, pd.DataFrame([]))
+
+    assert recall == 0.0
+    assert len(missed) == 2
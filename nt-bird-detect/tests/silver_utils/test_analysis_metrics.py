@@ -0,0 +1,53 @@
+import json
+
+from utils.processing_silver_utils import AnalysisMetrics
+
+STATS = {'windows': 1200, 'skipped': [0.0, 3.0], 'decode_secs': 2.0, 'prescreen_secs': 0.0, 'inference_secs': 30.0}
+
+
+def test_records_jsonl_rows_and_prometheus_textfile(tmp_path):
+    metrics = AnalysisMetrics(str(tmp_path / "analysis_metrics.jsonl"), str(tmp_path / "analysis_metrics.prom"),
+                              total_files=3)
+    metrics.record("site_a", "DataLoad_20260101", "a.wav", [{}] * 5, None, STATS, write_secs=0.5)
+    metrics.record("site_a", "DataLoad_20260101", "b.wav", [], "bad header", None, write_secs=0.0)
+    metrics.close()
+
+    rows = [json.loads(line) for line in open(tmp_path / "analysis_metrics.jsonl")]
+    assert [(r['file_name'], r['status'], r['chunks'], r['detections']) for r in rows] == [
+        ("a.wav", "ok", 1198, 5), ("b.wav", "error", 0, 0)]
+    assert rows[0]['audio_secs'] == 3600.0 and rows[0]['inference_secs'] == 30.0
+
+    prom = (tmp_path / "analysis_metrics.prom").read_text()
+    assert 'nt_birddetect_files_total{monitor="site_a",status="ok"} 1' in prom
+    assert 'nt_birddetect_stage_seconds_total{stage="inference"} 30.000' in prom
+    assert "nt_birddetect_queue_remaining_files 1" in prom
+
+
+def test_rollup_gives_real_time_factor_and_eta(tmp_path):
+    metrics = AnalysisMetrics(str(tmp_path / "analysis_metrics.jsonl"), total_files=4)
+    metrics.started -= 60   # pretend the run started a minute ago
+    metrics.record("site_a", "DataLoad_20260101", "a.wav", [], None, STATS, write_secs=0.1)
+    rollup = metrics.rollup()
+    metrics.close()
+
+    assert abs(rollup['real_time_factor'] - 60 / 3600) < 1e-3
+    assert abs(rollup['files_per_minute'] - 1.0) < 0.01
+    assert abs(rollup['eta_secs'] - 180) < 1
+
+
+def test_flush_and_finalize_count_towards_the_write_stage(tmp_path):
+    metrics = AnalysisMetrics(str(tmp_path / "analysis_metrics.jsonl"), str(tmp_path / "analysis_metrics.prom"),
+                              total_files=1)
+    metrics.record("site_a", "DataLoad_20260101", "a.wav", [], None, STATS, write_secs=0.25)
+    metrics.record_write("site_a", "flush", 1.5)
+    metrics.record_write("site_a", "finalize", 4.0)
+    metrics.close()
+
+    rows = [json.loads(line) for line in open(tmp_path / "analysis_metrics.jsonl")]
+    assert [(r.get('event'), r['write_secs']) for r in rows] == [(None, 0.25), ("flush", 1.5), ("finalize", 4.0)]
+
+    assert metrics.stage_secs['write'] == 5.75
+    prom = (tmp_path / "analysis_metrics.prom").read_text()
+    assert 'nt_birddetect_stage_seconds_total{stage="write"} 5.750' in prom
+    assert 'nt_birddetect_write_seconds_total{step="finalize"} 4.000' in prom
+    assert "finalize 4.0s" in metrics.summary()
@@ -0,0 +1,138 @@
+import os
+import wave
+
+import utils.processing_silver_utils as silver
+from utils.processing_silver_utils import (
+    ProcessingManifest,
+    build_work_queue,
+    discover_dataload_batches,
+)
+
+
+def make_batch(raw_dir, monitor, folder, files):
+    data_dir = raw_dir / monitor / folder / "Data"
+    data_dir.mkdir(parents=True)
+    for file in files:
+        (data_dir / file).touch()
+
+
+def test_discovers_batches_and_skips_test_monitors_by_default(tmp_path):
+    raw_dir = tmp_path / "raw"
+    make_batch(raw_dir, "site_a", "DataLoad_20260101", [])
+    make_batch(raw_dir, "site_a", "DataLoad_20260201", [])
+    make_batch(raw_dir, "test_audio1", "DataLoad_20260612", [])
+    (raw_dir / "site_a" / "DataLoad_20260301").mkdir()  # no Data/ folder yet
+
+    batches = discover_dataload_batches(str(raw_dir))
+    assert [(m, f) for m, f, _ in batches] == [
+        ("site_a", "DataLoad_20260101"), ("site_a", "DataLoad_20260201")]
+
+    batches = discover_dataload_batches(str(raw_dir), ["test_audio1"])
+    assert [(m, f) for m, f, _ in batches] == [("test_audio1", "DataLoad_20260612")]
+
+
+def test_queue_is_newest_first_round_robin_and_skips_processed(tmp_path):
+    raw_dir = tmp_path / "raw"
+    make_batch(raw_dir, "site_a", "DataLoad_20260101", [
+        "S4A00001_20250101_050000.wav", "S4A00001_20250102_050000.wav"])
+    make_batch(raw_dir, "site_a", "DataLoad_20260201", [
+        "S4A00001_20250103_050000.wav", "S4A00001_20250102_050000.wav", "BADNAME.wav"])
+    make_batch(raw_dir, "site_b", "DataLoad_20260101", [
+        "S4A00002_20250101_050000.wav", "S4A00002_20250101_060000.wav"])
+
+    manifests = {m: ProcessingManifest(str(tmp_path / "processed"), m) for m in ("site_a", "site_b")}
+    manifests["site_b"].update("S4A00002_20250101_050000.wav", processed=1, success=1)
+
+    batches = discover_dataload_batches(str(raw_dir))
+    queue, rejected = build_work_queue(batches, manifests, newest_first=True, group_size=1)
+
+    assert [(item['monitor_name'], item['file_name']) for item in queue] == [
+        ("site_a", "S4A00001_20250103_050000.wav"),
+        ("site_b", "S4A00002_20250101_060000.wav"),
+        ("site_a", "S4A00001_20250102_050000.wav"),  # queued once, from the first batch
+        ("site_a", "S4A00001_20250101_050000.wav"),
+    ]
+    assert queue[2]['dataload_batch'] == "DataLoad_20260101"
+    assert rejected == [("site_a", "BADNAME.wav")]
+
+
+def write_wav(path, frames):
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(48000)
+        w.writeframes(bytes(2 * frames))
+
+
+def differing_copies(tmp_path, earlier_truncated):
+    # Two batches holding the same recording, one copy cut short mid-offload
+    raw_dir = tmp_path / "raw"
+    name = "S4A00001_20250101_050000.wav"
+    make_batch(raw_dir, "site_a", "DataLoad_20260101", [name])
+    make_batch(raw_dir, "site_a", "DataLoad_20260201", [name])
+    earlier, later = (raw_dir / "site_a" / folder / "Data" / name for folder in ("DataLoad_20260101", "DataLoad_20260201"))
+    write_wav(earlier, 48000)
+    write_wav(later, 48000)
+    truncated = earlier if earlier_truncated else later
+    truncated.write_bytes(truncated.read_bytes()[:-1000])
+    return discover_dataload_batches(str(raw_dir))
+
+
+def test_differing_copies_use_the_complete_one(tmp_path):
+    queue, _ = build_work_queue(differing_copies(tmp_path, earlier_truncated=True), None)
+    assert [(item['dataload_batch'], item['status']) for item in queue] == [("DataLoad_20260201", "new")]
+
+    # Not which batch is later: an earlier complete copy beats a truncated re-copy
+    queue, _ = build_work_queue(differing_copies(tmp_path / "again", earlier_truncated=False), None)
+    assert [item['dataload_batch'] for item in queue] == ["DataLoad_20260101"]
+
+
+def test_differing_copies_without_wav_headers_use_the_larger_one(tmp_path):
+    raw_dir = tmp_path / "raw"
+    name = "S4A00001_20250101_050000.wav"
+    make_batch(raw_dir, "site_a", "DataLoad_20260101", [name])
+    make_batch(raw_dir, "site_a", "DataLoad_20260201", [name])
+    (raw_dir / "site_a" / "DataLoad_20260101" / "Data" / name).write_bytes(b"full copy")
+    (raw_dir / "site_a" / "DataLoad_20260201" / "Data" / name).write_bytes(b"trunc")
+
+    queue, _ = build_work_queue(discover_dataload_batches(str(raw_dir)), None)
+
+    assert [item['dataload_batch'] for item in queue] == ["DataLoad_20260101"]
+
+
+def test_processed_duplicate_copies_are_not_rehashed_every_run(tmp_path, monkeypatch):
+    raw_dir = tmp_path / "raw"
+    name = "S4A00001_20250101_050000.wav"
+    make_batch(raw_dir, "site_a", "DataLoad_20260101", [name])
+    make_batch(raw_dir, "site_a", "DataLoad_20260201", [name])
+    paths = [raw_dir / "site_a" / folder / "Data" / name for folder in ("DataLoad_20260101", "DataLoad_20260201")]
+    for i, path in enumerate(paths):
+        path.write_bytes(b"same recording")
+        os.utime(path, (1_700_000_000 + i, 1_700_000_000 + i))
+
+    hashed = []
+    fingerprint = silver.file_fingerprint
+    def counting_fingerprint(file_path, *args, with_hash=True, **kwargs):
+        if with_hash:
+            hashed.append(os.path.basename(os.path.dirname(os.path.dirname(file_path))))
+        return fingerprint(file_path, *args, with_hash=with_hash, **kwargs)
+    monkeypatch.setattr(silver, "file_fingerprint", counting_fingerprint)
+
+    manifests = {"site_a": ProcessingManifest(str(tmp_path / "processed"), "site_a")}
+    batches = discover_dataload_batches(str(raw_dir))
+
+    # First run: a new file, queued once (from the first batch); each copy hashed once
+    queue, _ = build_work_queue(batches, manifests)
+    assert [item['dataload_batch'] for item in queue] == ["DataLoad_20260101"]
+    assert sorted(hashed) == ["DataLoad_20260101", "DataLoad_20260201"]
+    manifests["site_a"].update(name, processed=1, success=1, fingerprint=fingerprint(queue[0]['file_path']))
+
+    # Second run: the later copy's mtime differs, so it's hashed once and recognised
+    hashed.clear()
+    assert build_work_queue(batches, manifests)[0] == []
+    assert hashed == ["DataLoad_20260201"]
+
+    # From then on size and mtime match: nothing is read at all
+    hashed.clear()
+    assert build_work_queue(batches, manifests)[0] == []
+    assert hashed == []
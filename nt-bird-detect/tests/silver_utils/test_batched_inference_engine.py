@@ -0,0 +1,142 @@
+from datetime import datetime
+
+import numpy as np
+
+from utils.processing_silver_utils import BatchedInferenceEngine
+
+LABELS = ["Erithacus rubecula_European Robin", "Turdus merula_Eurasian Blackbird", "Strix aluco_Tawny Owl"]
+
+
+class FakeInterpreter:
+    """
+    Stand-in for the TFLite interpreter: a segment filled with value k scores
+    label k-1 with a high logit, every other label with a low one.
+    """
+    def __init__(self):
+        self.batch_shapes = []
+
+    def resize_tensor_input(self, index, shape):
+        self.batch_shapes.append(tuple(shape))
+
+    def allocate_tensors(self):
+        pass
+
+    def set_tensor(self, index, batch):
+        self.batch = batch
+
+    def invoke(self):
+        self.calls = getattr(self, 'calls', 0) + 1
+
+    def get_tensor(self, index):
+        first = self.batch[:, :1]
+        return np.where(first == np.arange(1, len(LABELS) + 1), 10.0, -10.0)
+
+
+class FakeAnalyzer:
+    labels = LABELS
+    input_layer_index = 0
+    output_layer_index = 1
+
+    def __init__(self):
+        self.interpreter = FakeInterpreter()
+        self.species_list_calls = 0
+
+    def flat_sigmoid(self, x, sensitivity=-1):
+        return 1 / (1.0 + np.exp(sensitivity * np.clip(x, -15, 15)))
+
+    def return_predicted_species_list(self, lon=None, lat=None, week_48=None):
+        self.species_list_calls += 1
+        return LABELS[:2]   # no owls expected at this site
+
+
+class FakeEngine(BatchedInferenceEngine):
+    SEGMENTS = {"a.wav": [1, 0, 2], "b.wav": [3, 1], "c.wav": [2]}
+
+    def read_segments(self, file_path):
+        if file_path not in self.SEGMENTS:
+            raise FileNotFoundError(file_path)
+        for i, value in enumerate(self.SEGMENTS[file_path]):
+            yield i * 3.0, i * 3.0 + 3.0, np.full(144000, value, dtype=np.float32)
+
+
+def _task(name):
+    return (name, name, 50.9, -3.2, datetime(2025, 9, 18), 0.5)
+
+
+def test_batches_span_files_and_map_back_to_file_and_time():
+    analyzer = FakeAnalyzer()
+    engine = FakeEngine(analyzer, batch_size=2)
+
+    results = {f: (d, e) for f, d, e, _ in engine.run([_task("a.wav"), _task("b.wav"), _task("c.wav")])}
+
+    # 6 segments in fixed batches of 2, allocated once
+    assert analyzer.interpreter.batch_shapes == [(2, 144000)]
+    assert analyzer.interpreter.calls == 3
+
+    a_detections, _ = results["a.wav"]
+    assert [(d['start_time'], d['common_name']) for d in a_detections] == [
+        (0.0, "European Robin"), (6.0, "Eurasian Blackbird")]
+
+    # The owl (label 3) is filtered out by the location/week species list
+    b_detections, _ = results["b.wav"]
+    assert [(d['start_time'], d['scientific_name']) for d in b_detections] == [(3.0, "Erithacus rubecula")]
+    assert results["c.wav"][0][0]['label'] == "Turdus merula_Eurasian Blackbird"
+
+    # Species list computed once for the shared (lat, lon, week)
+    assert analyzer.species_list_calls == 1
+
+
+def test_stats_time_each_stage():
+    engine = FakeEngine(FakeAnalyzer(), batch_size=2)
+
+    stats = {f: st for f, _, _, st in engine.run([_task("a.wav"), _task("b.wav")])}
+
+    # Every file gets a share of the model time, and they add up to the total
+    assert all(st['inference_secs'] > 0 and st['decode_secs'] >= 0 for st in stats.values())
+    assert abs(sum(st['inference_secs'] for st in stats.values()) - engine._inference_clock) < 1e-9
+
+
+def test_unreadable_file_reports_error_without_stopping_the_run():
+    engine = FakeEngine(FakeAnalyzer(), batch_size=4)
+
+    results = list(engine.run([_task("missing.wav"), _task("c.wav")]))
+
+    assert results[0][0] == "missing.wav" and results[0][2] is not None
+    assert results[1][0] == "c.wav" and len(results[1][1]) == 1
+
+
+def test_failed_model_batch_reports_its_files_and_keeps_going():
+    class FlakyInterpreter(FakeInterpreter):
+        def invoke(self):
+            super().invoke()
+            if self.calls in (1, 3):
+                raise RuntimeError("invoke failed")
+
+    analyzer = FakeAnalyzer()
+    analyzer.interpreter = FlakyInterpreter()
+    engine = FakeEngine(analyzer, batch_size=2)
+
+    # a.wav fails in a batch mid-run, c.wav in the last (padded) batch
+    results = {f: (d, e) for f, d, e, _ in engine.run([_task("a.wav"), _task("b.wav"), _task("c.wav")])}
+
+    assert set(results) == {"a.wav", "b.wav", "c.wav"}
+    assert results["a.wav"] == ([], "model batch failed: invoke failed")
+    assert results["c.wav"] == ([], "model batch failed: invoke failed")
+    assert results["b.wav"][1] is None and len(results["b.wav"][0]) == 1
+    assert engine._files == {} and engine._pending == []
+
+
+def test_prescreen_skips_windows_and_reports_them():
+    class QuietEngine(FakeEngine):
+        def prescreen(self, file_path):
+            return np.array([value != 0 for value in self.SEGMENTS[file_path]])
+
+    analyzer = FakeAnalyzer()
+    engine = QuietEngine(analyzer, batch_size=2, prescreen_k=0.5)
+
+    (file_name, detections, error, stats), = engine.run([_task("a.wav")])
+
+    # The silent middle window never reaches the model
+    assert analyzer.interpreter.calls == 1
+    assert (stats['windows'], stats['skipped']) == (3, [3.0])
+    assert [d['start_time'] for d in detections] == [0.0, 6.0]
@@ -0,0 +1,147 @@
+import json
+import os
+
+import pandas as pd
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from utils.processing_silver_utils import consolidate_daily_parquets
+
+
+def write_day(monitor_dir, file_date, n, **extra):
+    df = pd.DataFrame({
+        'file_name': [f"S4A00001_{file_date}_050000.wav"] * n,
+        'start_time': [float(i * 3) for i in range(n)],
+        'label': ["Erithacus rubecula_European Robin"] * n,
+        'file_date': [file_date] * n,
+        **{k: [v] * n for k, v in extra.items()},
+    })
+    path = monitor_dir / f"recordings_batch_{file_date}.parquet"
+    df.to_parquet(path, index=False)
+    return path
+
+
+def test_only_new_and_changed_days_are_reread(tmp_path):
+    monitor_dir = tmp_path / "site_a"
+    monitor_dir.mkdir()
+    write_day(monitor_dir, "20250101", 3)
+    write_day(monitor_dir, "20250102", 2)
+
+    master_path = consolidate_daily_parquets(str(tmp_path), "site_a")
+    assert pq.ParquetFile(master_path).metadata.num_row_groups == 2
+    mtime = os.stat(master_path).st_mtime_ns
+
+    # Nothing changed: the master is left alone
+    consolidate_daily_parquets(str(tmp_path), "site_a")
+    assert os.stat(master_path).st_mtime_ns == mtime
+
+    # A new day, with a column older days don't have: appended, CSV rewritten
+    write_day(monitor_dir, "20250103", 4, dataload_batch="DataLoad_20250110")
+    consolidate_daily_parquets(str(tmp_path), "site_a")
+    df_master = pd.read_parquet(master_path)
+    assert df_master['file_date'].tolist() == ["20250101"] * 3 + ["20250102"] * 2 + ["20250103"] * 4
+    assert df_master['dataload_batch'].isna().sum() == 5
+
+    # An older day is replaced; the days around it are spliced from the old master
+    write_day(monitor_dir, "20250102", 1, dataload_batch="DataLoad_20250110")
+    consolidate_daily_parquets(str(tmp_path), "site_a")
+    df_master = pd.read_parquet(master_path)
+    assert df_master['file_date'].value_counts().to_dict() == {"20250101": 3, "20250102": 1, "20250103": 4}
+
+    df_csv = pd.read_csv(monitor_dir / "recordings_MASTER.csv", dtype={'file_date': str})
+    assert len(df_csv) == len(df_master)
+
+
+def test_daily_run_appends_to_csv(tmp_path):
+    monitor_dir = tmp_path / "site_a"
+    monitor_dir.mkdir()
+    write_day(monitor_dir, "20250101", 3)
+    consolidate_daily_parquets(str(tmp_path), "site_a")
+
+    write_day(monitor_dir, "20250102", 2)
+    consolidate_daily_parquets(str(tmp_path), "site_a")
+
+    df_csv = pd.read_csv(monitor_dir / "recordings_MASTER.csv", dtype={'file_date': str})
+    assert df_csv.columns[0] == "common_name"
+    assert df_csv['file_date'].tolist() == ["20250101"] * 3 + ["20250102"] * 2
+    watermark = json.loads((monitor_dir / "recordings_MASTER_watermark.json").read_text())
+    assert watermark['days']["recordings_batch_20250102.parquet"]['row_groups'] == [1]
+
+
+def test_empty_old_master_rewrites_csv(tmp_path):
+    monitor_dir = tmp_path / "site_a"
+    monitor_dir.mkdir()
+    write_day(monitor_dir, "20250101", 3)
+    master_path = consolidate_daily_parquets(str(tmp_path), "site_a")
+
+    # A master (and watermark) that holds no days at all, next to a CSV export
+    with pq.ParquetWriter(master_path, pq.read_schema(master_path)):
+        pass
+    watermark_path = monitor_dir / "recordings_MASTER_watermark.json"
+    watermark = json.loads(watermark_path.read_text())
+    watermark_path.write_text(json.dumps({**watermark, 'days': {}}))
+
+    write_day(monitor_dir, "20250102", 2)
+    consolidate_daily_parquets(str(tmp_path), "site_a")
+
+    df_csv = pd.read_csv(monitor_dir / "recordings_MASTER.csv", dtype={'file_date': str})
+    assert df_csv['file_date'].tolist() == ["20250101"] * 3 + ["20250102"] * 2
+
+
+def test_removed_day_is_dropped(tmp_path):
+    monitor_dir = tmp_path / "site_a"
+    monitor_dir.mkdir()
+    write_day(monitor_dir, "20250101", 3)
+    write_day(monitor_dir, "20250102", 2)
+    consolidate_daily_parquets(str(tmp_path), "site_a")
+
+    (monitor_dir / "recordings_batch_20250101.parquet").unlink()
+    master_path = consolidate_daily_parquets(str(tmp_path), "site_a")
+    assert pd.read_parquet(master_path)['file_date'].unique().tolist() == ["20250102"]
+
+
+def test_compressed_and_delta_exports(tmp_path):
+    monitor_dir = tmp_path / "site_a"
+    monitor_dir.mkdir()
+    write_day(monitor_dir, "20250101", 3)
+    consolidate_daily_parquets(str(tmp_path), "site_a", csv_compression="gzip")
+    write_day(monitor_dir, "20250102", 2)
+    consolidate_daily_parquets(str(tmp_path), "site_a", csv_compression="gzip")
+
+    # Appended as a second gzip member, read back as one file
+    df_csv = pd.read_csv(monitor_dir / "recordings_MASTER.csv.gz", dtype={'file_date': str})
+    assert df_csv['file_date'].tolist() == ["20250101"] * 3 + ["20250102"] * 2
+
+    # Delta mode: only the day consolidated by this run
+    write_day(monitor_dir, "20250103", 4)
+    consolidate_daily_parquets(str(tmp_path), "site_a", csv_compression="zstd", csv_mode="delta")
+    [delta_path] = monitor_dir.glob("recordings_MASTER_delta_*.csv.zst")
+    assert pacsv.read_csv(delta_path).column('file_date').to_pylist() == [20250103] * 4
+
+    # The full export missed that day, so the next full run rewrites it
+    write_day(monitor_dir, "20250104", 1)
+    consolidate_daily_parquets(str(tmp_path), "site_a", csv_compression="gzip")
+    df_csv = pd.read_csv(monitor_dir / "recordings_MASTER.csv.gz", dtype={'file_date': str})
+    assert len(df_csv) == 3 + 2 + 4 + 1
+
+
+def test_streams_days_in_budget_sized_row_groups(tmp_path):
+    monitor_dir = tmp_path / "site_a"
+    monitor_dir.mkdir()
+    write_day(monitor_dir, "20250101", 50)
+    write_day(monitor_dir, "20250102", 30)
+
+    # A tiny budget: every 8-row batch is written as its own row group
+    master_path = consolidate_daily_parquets(str(tmp_path), "site_a", memory_budget_mb=0, batch_size=8)
+    assert pq.ParquetFile(master_path).metadata.num_row_groups == 7 + 4
+    with open(monitor_dir / "recordings_MASTER_watermark.json") as f:
+        days = json.load(f)['days']
+    assert days["recordings_batch_20250101.parquet"]['row_groups'] == list(range(7))
+    assert days["recordings_batch_20250102.parquet"]['row_groups'] == list(range(7, 11))
+
+    # The split days are still spliced from the old master on the next run
+    write_day(monitor_dir, "20250101", 5)
+    consolidate_daily_parquets(str(tmp_path), "site_a", memory_budget_mb=0, batch_size=8)
+    df_master = pd.read_parquet(master_path)
+    assert df_master['file_date'].value_counts().to_dict() == {"20250102": 30, "20250101": 5}
+    assert df_master['start_time'].tolist()[5:] == [float(i * 3) for i in range(30)]
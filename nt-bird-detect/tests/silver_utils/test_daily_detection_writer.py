@@ -0,0 +1,85 @@
+import os
+
+import pandas as pd
+
+from utils.processing_silver_utils import DailyDetectionWriter
+
+
+def _detections(file_name, n, file_date="20250918"):
+    return pd.DataFrame({
+        'common_name': ['European Robin'] * n,
+        'scientific_name': ['Erithacus rubecula'] * n,
+        'start_time': [i * 3.0 for i in range(n)],
+        'end_time': [i * 3.0 + 3.0 for i in range(n)],
+        'confidence': [0.8] * n,
+        'label': ['Erithacus rubecula_European Robin'] * n,
+        'file_name': [file_name] * n,
+        'file_date': [file_date] * n,
+    })
+
+
+def test_flushes_parts_and_finalizes_each_day_once(tmp_path):
+    writer = DailyDetectionWriter(str(tmp_path), flush_rows=5, flush_seconds=3600)
+
+    assert writer.add("20250918", _detections("a.wav", 3)) is False
+    assert writer.add("20250918", _detections("b.wav", 3)) is True   # 6 rows >= 5
+    writer.add("20250919", _detections("c.wav", 2, "20250919"))
+
+    # Nothing is written to the day file until the batch ends
+    assert not os.path.exists(tmp_path / "recordings_batch_20250918.parquet")
+
+    written = writer.finalize()
+
+    assert len(written) == 2
+    assert len(pd.read_parquet(tmp_path / "recordings_batch_20250918.parquet")) == 6
+    assert len(pd.read_parquet(tmp_path / "recordings_batch_20250919.parquet")) == 2
+    assert not os.listdir(tmp_path / "_parts")
+
+
+def test_finalize_appends_to_existing_day_and_drops_replayed_rows(tmp_path):
+    _detections("a.wav", 3).to_parquet(tmp_path / "recordings_batch_20250918.parquet", index=False)
+
+    writer = DailyDetectionWriter(str(tmp_path))
+    writer.add("20250918", _detections("a.wav", 3))   # replay after a crash
+    writer.add("20250918", _detections("b.wav", 2))
+    writer.finalize()
+
+    df_day = pd.read_parquet(tmp_path / "recordings_batch_20250918.parquet")
+    assert len(df_day) == 5
+    assert sorted(df_day['file_name'].unique()) == ["a.wav", "b.wav"]
+
+
+def test_reprocessed_file_replaces_its_old_rows(tmp_path):
+    writer = DailyDetectionWriter(str(tmp_path))
+    writer.add("20250918", pd.DataFrame({
+        'file_name': ["a.wav", "a.wav", "b.wav"], 'start_time': [0.0, 3.0, 0.0],
+        'end_time': [3.0, 6.0, 3.0], 'label': ["robin", "wren", "robin"]}))
+    writer.finalize()
+
+    # a.wav changed on disk and was analysed again: only its new rows remain
+    writer.add("20250918", pd.DataFrame({
+        'file_name': ["a.wav"], 'start_time': [9.0], 'end_time': [12.0], 'label': ["owl"]}))
+    writer.finalize()
+
+    df_day = pd.read_parquet(tmp_path / "recordings_batch_20250918.parquet")
+    assert sorted(zip(df_day['file_name'], df_day['label'])) == [("a.wav", "owl"), ("b.wav", "robin")]
+
+
+def test_reprocessed_file_without_detections_loses_its_old_rows(tmp_path):
+    writer = DailyDetectionWriter(str(tmp_path))
+    writer.add("20250918", _detections("a.wav", 2))
+    writer.add("20250918", _detections("b.wav", 1))
+    writer.finalize()
+
+    # a.wav changed on disk and now has no detections at all
+    writer.add("20250918", pd.DataFrame(), reprocessed="a.wav")
+    writer.finalize()
+
+    df_day = pd.read_parquet(tmp_path / "recordings_batch_20250918.parquet")
+    assert list(df_day['file_name']) == ["b.wav"]
+
+    # ...and once the day's last file is gone, so is the day file
+    writer.add("20250918", pd.DataFrame(), reprocessed="b.wav")
+    assert writer.finalize() == [str(tmp_path / "recordings_batch_20250918.parquet")]
+    assert not os.path.exists(tmp_path / "recordings_batch_20250918.parquet")
+    assert not os.listdir(tmp_path / "_parts")
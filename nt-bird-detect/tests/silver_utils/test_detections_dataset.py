@@ -0,0 +1,82 @@
+import pandas as pd
+import pyarrow.compute as pc
+
+from utils.processing_silver_utils import (
+    _species_row_groups,
+    open_detections_dataset,
+    publish_detections_dataset,
+    read_detections,
+)
+
+
+def write_day(monitor_dir, file_date, common_names, **extra):
+    n = len(common_names)
+    pd.DataFrame({
+        'common_name': common_names,
+        'scientific_name': [f"Sci {name}" for name in common_names],
+        'confidence': [0.6 + 0.1 * i for i in range(n)],
+        'label': [f"Sci {name}_{name}" for name in common_names],
+        'file_date': [file_date] * n,
+        'file_time': ["050000"] * n,
+        **{k: [v] * n for k, v in extra.items()},
+    }).to_parquet(monitor_dir / f"recordings_batch_{file_date}.parquet", index=False)
+
+
+def test_filters_prune_partitions_and_match_the_master(tmp_path):
+    monitor_dir = tmp_path / "site_a"
+    monitor_dir.mkdir()
+    write_day(monitor_dir, "20250930", ["Wren", "Robin"])
+    write_day(monitor_dir, "20251001", ["Robin", "Wren", "Wren"])
+    write_day(monitor_dir, "20251102", ["Wren"], dataload_batch="DataLoad_20251110")
+    publish_detections_dataset(str(tmp_path), "site_a")
+
+    dataset = open_detections_dataset(str(tmp_path))
+    october = (pc.field('date') >= "20251001") & (pc.field('date') <= "20251031")
+    assert len(list(dataset.get_fragments(filter=october))) == 1
+
+    df = read_detections(str(tmp_path), "site_a", start_date="20251001", end_date=pd.Timestamp("2025-10-31"),
+                         species=["Wren"], columns=['file_date', 'common_name'])
+    assert df.values.tolist() == [["20251001", "Wren"], ["20251001", "Wren"]]
+
+    # Same columns as the master; a column added later is null for older days
+    df_all = read_detections(str(tmp_path), "site_a")
+    assert len(df_all) == 6 and 'monitor' not in df_all.columns
+    assert df_all['dataload_batch'].notna().sum() == 1
+
+
+def test_species_filter_skips_row_groups(tmp_path):
+    monitor_dir = tmp_path / "site_a"
+    monitor_dir.mkdir()
+    write_day(monitor_dir, "20251001", ["Wren", "Robin", "Blackbird", "Wren", "Robin", "Blackbird"])
+    publish_detections_dataset(str(tmp_path), "site_a", row_group_size=2)
+
+    # Sorted by scientific name: one species per row group here, and only that
+    # species' row group is kept
+    [fragment] = open_detections_dataset(str(tmp_path)).get_fragments()
+    assert fragment.num_row_groups == 3
+    assert _species_row_groups(fragment, {"Sci Robin"}).num_row_groups == 1
+
+    # By common or scientific name alike; a species that isn't there reads nothing
+    df = read_detections(str(tmp_path), "site_a", species=["Robin", "Sci Wren"], columns=['common_name'])
+    assert sorted(df['common_name']) == ["Robin", "Robin", "Wren", "Wren"]
+    assert read_detections(str(tmp_path), "site_a", species=["Dodo"]).empty
+
+
+def test_republish_rewrites_only_changed_days_and_drops_removed(tmp_path):
+    monitor_dir = tmp_path / "site_a"
+    monitor_dir.mkdir()
+    write_day(monitor_dir, "20250930", ["Wren"])
+    write_day(monitor_dir, "20251001", ["Robin"])
+    publish_detections_dataset(str(tmp_path), "site_a")
+
+    (monitor_dir / "recordings_batch_20250930.parquet").unlink()
+    write_day(monitor_dir, "20251001", ["Robin", "Blackbird"])
+    publish_detections_dataset(str(tmp_path), "site_a")
+
+    df = read_detections(str(tmp_path), "site_a")
+    assert sorted(df['common_name']) == ["Blackbird", "Robin"]
+    assert not (tmp_path / "detections" / "monitor=site_a" / "year=2025" / "month=09" / "date=20250930").exists()
+
+
+def test_returns_none_before_publishing(tmp_path):
+    assert read_detections(str(tmp_path), "site_a") is None
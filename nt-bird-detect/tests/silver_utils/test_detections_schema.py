@@ -0,0 +1,83 @@
+import json
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.processing_silver_utils import (
+    DETECTIONS_SCHEMA,
+    DailyDetectionWriter,
+    conform_detections_table,
+    consolidate_daily_parquets,
+)
+
+
+def legacy_detections(n=3):
+    # The layout written before the compact schema: object strings, float64,
+    # file_time as an integer after a CSV round trip
+    return pd.DataFrame({
+        'common_name': ["European Robin"] * n,
+        'scientific_name': ["Erithacus rubecula"] * n,
+        'start_time': [float(i * 3) for i in range(n)],
+        'end_time': [float(i * 3 + 3) for i in range(n)],
+        'confidence': [0.9] * n,
+        'label': ["Erithacus rubecula_European Robin"] * n,
+        'file_name': ["S4A00001_20250101_050000.wav"] * n,
+        'file_date': ["20250101"] * n,
+        'file_time': [50000] * n,
+        'monitor_name': ["site_a"] * n,
+        'dataload_batch': ["DataLoad_20250110"] * n,
+    })
+
+
+def test_conform_casts_and_derives_timestamp_and_hour():
+    table = conform_detections_table(legacy_detections().assign(extra=1))
+
+    assert table.schema.names == DETECTIONS_SCHEMA.names + ['extra']
+    assert table.schema.field('label').type == pa.dictionary(pa.int32(), pa.string())
+    assert table.schema.field('confidence').type == pa.float32()
+
+    df = table.to_pandas()
+    assert df['file_time'].astype(str).unique().tolist() == ["050000"]
+    assert df['recorded_at'][0] == pd.Timestamp("2025-01-01 05:00:00")
+    assert df['hour'].tolist() == [5, 5, 5]
+
+    # Already conformed: unchanged
+    assert conform_detections_table(table).equals(table)
+
+
+def test_writer_and_master_use_the_compact_schema(tmp_path):
+    monitor_dir = tmp_path / "site_a"
+    writer = DailyDetectionWriter(str(monitor_dir))
+    df = legacy_detections()
+    writer.add("20250101", df.assign(file_time="050000"))
+    [day_path] = writer.finalize()
+
+    schema = pq.read_schema(day_path)
+    assert schema.equals(DETECTIONS_SCHEMA)
+    assert pq.ParquetFile(day_path).metadata.row_group(0).column(0).compression == "ZSTD"
+
+    # A day written in the old layout is conformed into the master too
+    df.assign(file_date="20250102", file_name="S4A00001_20250102_050000.wav").to_parquet(
+        monitor_dir / "recordings_batch_20250102.parquet", index=False)
+    master_path = consolidate_daily_parquets(str(tmp_path), "site_a")
+    df_master = pd.read_parquet(master_path)
+    assert isinstance(df_master['common_name'].dtype, pd.CategoricalDtype)
+    assert df_master['hour'].tolist() == [5] * 6
+
+
+def test_master_from_older_schema_is_rebuilt(tmp_path):
+    monitor_dir = tmp_path / "site_a"
+    monitor_dir.mkdir()
+    legacy_detections().to_parquet(monitor_dir / "recordings_batch_20250101.parquet", index=False)
+    master_path = consolidate_daily_parquets(str(tmp_path), "site_a")
+
+    # Pretend the master was written before the schema version was recorded
+    watermark_path = monitor_dir / "recordings_MASTER_watermark.json"
+    watermark = json.loads(watermark_path.read_text())
+    del watermark['schema_version']
+    watermark_path.write_text(json.dumps(watermark))
+    legacy_detections().to_parquet(master_path, index=False)
+
+    consolidate_daily_parquets(str(tmp_path), "site_a")
+    assert pq.read_schema(master_path).field('label').type == pa.dictionary(pa.int32(), pa.string())
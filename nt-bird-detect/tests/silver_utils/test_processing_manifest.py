@@ -0,0 +1,82 @@
+import os
+import sqlite3
+
+import pandas as pd
+
+from utils.processing_silver_utils import ProcessingManifest, file_fingerprint
+
+
+def test_update_is_durable_only_after_checkpoint(tmp_path):
+    manifest = ProcessingManifest(str(tmp_path), "test_audio1")
+    manifest.update("a.wav", processed=1, success=1)
+    manifest.checkpoint()
+    manifest.update("b.wav", processed=1, success=0)
+
+    # A second connection only sees committed rows, as a restarted run would
+    reopened = ProcessingManifest(str(tmp_path), "test_audio1")
+    assert reopened.is_processed("a.wav")
+    assert not reopened.is_processed("b.wav")
+    assert not reopened.is_processed("never_seen.wav")
+
+
+def test_update_replaces_existing_row_and_exports_compacted_parquet(tmp_path):
+    manifest = ProcessingManifest(str(tmp_path), "test_audio1")
+    manifest.update("a.wav", processed=0, success=0)
+    manifest.update("a.wav", processed=1, success=1)
+    df_manifest = manifest.export_parquet()
+
+    assert len(df_manifest) == 1
+    df_export = pd.read_parquet(tmp_path / "test_audio1" / "processing_manifest.parquet")
+    assert df_export[['file_name', 'processed', 'success']].values.tolist() == [["a.wav", 1, 1]]
+
+
+def test_imports_existing_parquet_manifest(tmp_path):
+    (tmp_path / "test_audio1").mkdir()
+    pd.DataFrame({
+        'file_name': ["old.wav"], 'processed': [1], 'success': [1],
+        'last_updated': ["2026-04-28 10:00:00"],
+    }).to_parquet(tmp_path / "test_audio1" / "processing_manifest.parquet", index=False)
+
+    manifest = ProcessingManifest(str(tmp_path), "test_audio1")
+    assert len(manifest) == 1
+    assert manifest.is_processed("old.wav")
+
+
+def test_adds_prescreen_columns_to_an_older_database(tmp_path):
+    (tmp_path / "test_audio1").mkdir()
+    conn = sqlite3.connect(tmp_path / "test_audio1" / "processing_manifest.sqlite")
+    conn.execute("CREATE TABLE manifest (file_name TEXT PRIMARY KEY, processed INTEGER NOT NULL,"
+                 " success INTEGER NOT NULL, last_updated TEXT NOT NULL)")
+    conn.execute("INSERT INTO manifest VALUES ('old.wav', 1, 1, '2026-04-28 10:00:00')")
+    conn.commit()
+    conn.close()
+
+    manifest = ProcessingManifest(str(tmp_path), "test_audio1")
+    manifest.update("new.wav", processed=1, success=0, windows_total=1200,
+                    windows_skipped=900, skipped_windows="0-2700")
+    df_manifest = manifest.to_dataframe().set_index('file_name')
+
+    assert manifest.is_processed("old.wav")
+    assert df_manifest.loc["new.wav", 'windows_skipped'] == 900
+    assert pd.isna(df_manifest.loc["old.wav", 'windows_total'])
+
+
+def test_check_tells_recopies_from_changed_files(tmp_path):
+    recording = tmp_path / "S4A00001_20250101_050000.wav"
+    recording.write_bytes(b"RIFF" + bytes(5000))
+    manifest = ProcessingManifest(str(tmp_path), "test_audio1")
+    assert manifest.check(recording.name, str(recording)) == 'new'
+
+    manifest.update(recording.name, processed=1, success=1, fingerprint=file_fingerprint(str(recording)))
+    assert manifest.check(recording.name, str(recording)) == 'unchanged'
+
+    # Same bytes copied again later: new mtime, same content
+    os.utime(recording, (1_800_000_000, 1_800_000_000))
+    assert manifest.check(recording.name, str(recording)) == 'duplicate'
+    assert manifest.check(recording.name, str(recording)) == 'unchanged'   # mtime refreshed
+
+    # Truncated, then a same-size file with different content
+    recording.write_bytes(b"RIFF" + bytes(100))
+    assert manifest.check(recording.name, str(recording)) == 'changed'
+    recording.write_bytes(b"RIFF" + bytes(4999) + b"x")
+    assert manifest.check(recording.name, str(recording)) == 'changed'
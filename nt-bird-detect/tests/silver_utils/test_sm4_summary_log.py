@@ -0,0 +1,62 @@
+import json
+import os
+
+import pyarrow as pa
+
+from utils.processing_silver_utils import get_monitor_coords, read_sm4_summary_file, update_sm4_summary_log
+
+HEADER = "DATE,TIME,LAT,NS,LON,EW,POWER(V),TEMP(C),#FILES,MIC0 TYPE,MIC1 TYPE\n"
+
+
+def write_log(raw_dir, folder, rows, name="S4A00001_A_Summary.txt"):
+    batch_dir = raw_dir / folder
+    batch_dir.mkdir(parents=True, exist_ok=True)
+    path = batch_dir / name
+    path.write_text(HEADER + "".join(row + "\n" for row in rows))
+    return path
+
+
+def test_reads_padded_values_as_typed_columns(tmp_path):
+    path = write_log(tmp_path, "DataLoad_20260101", [
+        "2025-Sep-17,  16:00:00,  50.94810, N,   3.25030, W, 4.8, 18.25, 0, U1, -",
+        "2025-Sep-17,  17:00:00,          ,  ,          ,  , 4.7, 18.00, 12, U1, -",
+    ])
+    table = read_sm4_summary_file(str(path))
+
+    assert table.schema.field('LAT').type == pa.float64()
+    assert table.schema.field('#FILES').type == pa.int64()
+    assert table.column('LAT').to_pylist() == [50.9481, None]
+    assert table.column('TIME').to_pylist() == ["16:00:00", "17:00:00"]
+
+
+def test_only_new_logs_are_parsed_and_coords_are_saved(tmp_path, capsys):
+    raw_dir, out_dir = tmp_path / "raw" / "site_a", tmp_path / "processed" / "site_a"
+    out_dir.mkdir(parents=True)
+    write_log(raw_dir, "DataLoad_20260101", ["2025-Sep-17, 16:00:00, 50.90000, N, 3.20000, W, 4.8, 18.25, 0, U1, -"])
+    (raw_dir / "DataLoad_20260101" / "._S4A00001_A_Summary.txt").write_bytes(b"\x00\x05binary")
+
+    table = update_sm4_summary_log(str(raw_dir), str(out_dir), "site_a")
+    assert table.num_rows == 1
+    assert get_monitor_coords(str(tmp_path / "processed"), "site_a") == (50.9, -3.2)
+
+    # A new batch whose last row has no fix: the latest valid row wins
+    write_log(raw_dir, "DataLoad_20260201", [
+        "2025-Oct-01, 16:00:00, 51.00000, N, 3.30000, W, 4.8, 18.25, 0, U1, -",
+        "2025-Oct-01, 17:00:00,         ,  ,        ,  , 4.8, 18.25, 0, U1, -",
+    ])
+    capsys.readouterr()
+    table = update_sm4_summary_log(str(raw_dir), str(out_dir), "site_a")
+    assert "from DataLoad_20260101" not in capsys.readouterr().out
+    assert table.column('dataload_batch').to_pylist() == ["DataLoad_20260101"] + ["DataLoad_20260201"] * 2
+    assert json.loads((out_dir / "monitor_coords.json").read_text())['dataload_batch'] == "DataLoad_20260201"
+    assert get_monitor_coords(str(tmp_path / "processed"), "site_a") == (51.0, -3.3)
+
+    # Nothing changed: the log isn't rewritten
+    mtime = os.stat(out_dir / "monitor_summary_log.parquet").st_mtime_ns
+    update_sm4_summary_log(str(raw_dir), str(out_dir), "site_a")
+    assert os.stat(out_dir / "monitor_summary_log.parquet").st_mtime_ns == mtime
+
+    # A log rewritten in place replaces its old rows
+    write_log(raw_dir, "DataLoad_20260101", ["2025-Sep-17, 16:00:00, 50.90000, N, 3.20000, W, 4.8, 18.25, 0, U1, -"] * 3)
+    table = update_sm4_summary_log(str(raw_dir), str(out_dir), "site_a")
+    assert table.column('dataload_batch').to_pylist() == ["DataLoad_20260101"] * 3 + ["DataLoad_20260201"] * 2
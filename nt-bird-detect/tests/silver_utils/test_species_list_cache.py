@@ -0,0 +1,30 @@
+import json
+
+from utils.processing_silver_utils import SpeciesListCache
+
+
+def test_computes_once_and_reuses_on_disk_store(tmp_path):
+    cache_path = str(tmp_path / "species_list_cache.json")
+    calls = []
+
+    def compute(lat, lon, week_48):
+        calls.append(week_48)
+        return ["Erithacus rubecula_European Robin"]
+
+    cache = SpeciesListCache(cache_path)
+    assert cache.get(50.9481, -3.2503, 37, compute=compute) == ["Erithacus rubecula_European Robin"]
+    cache.get(50.9481, -3.2503, 37, compute=compute)
+    assert calls == [37]
+
+    # A later run (or another worker) starts warm from the file
+    reopened = SpeciesListCache(cache_path)
+    reopened.get(50.9481, -3.2503, 37, compute=compute)
+    assert calls == [37]
+
+
+def test_ignores_lists_from_another_model_version(tmp_path):
+    cache_path = tmp_path / "species_list_cache.json"
+    key = SpeciesListCache.key(50.9481, -3.2503, 37)
+    cache_path.write_text(json.dumps({'model_version': "0.0", 'threshold': 0.03, 'lists': {key: []}}))
+
+    assert SpeciesListCache(str(cache_path)).lists == {}
@@ -0,0 +1,53 @@
+import wave
+
+import numpy as np
+
+from utils.processing_silver_utils import iter_wav_segments, read_wav_header
+
+
+def _write_wav(path, samples, sample_rate, channels=1):
+    pcm = (np.clip(samples, -1, 1) * 32767).astype(np.int16)
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm.tobytes())
+
+
+def test_windows_match_birdnetlib_chunking(tmp_path):
+    # 7.6 s at 48 kHz: two full windows plus a 1.6 s tail (kept, zero-padded)
+    path = tmp_path / "a.wav"
+    _write_wav(path, np.full(int(7.6 * 48000), 0.25), 48000)
+
+    segments = list(iter_wav_segments(str(path)))
+
+    assert [(start, end) for start, end, _ in segments] == [(0.0, 3.0), (3.0, 6.0), (6.0, 9.0)]
+    assert all(len(seg) == 144000 for _, _, seg in segments)
+    assert np.allclose(segments[2][2][:int(1.6 * 48000)], 0.25, atol=1e-4)
+    assert not segments[2][2][int(1.6 * 48000):].any()
+
+
+def test_short_tail_is_dropped(tmp_path):
+    path = tmp_path / "a.wav"
+    _write_wav(path, np.zeros(int(4.0 * 48000)), 48000)
+
+    assert len(list(iter_wav_segments(str(path)))) == 1
+
+
+def test_resamples_24khz_stereo_to_48khz_mono(tmp_path):
+    sr = 24000
+    t = np.arange(6 * sr) / sr
+    tone = 0.5 * np.sin(2 * np.pi * 3000 * t)
+    path = tmp_path / "a.wav"
+    _write_wav(path, np.repeat(tone, 2), sr, channels=2)
+
+    (_, channels, sample_rate, bits), _, _ = read_wav_header(str(path))
+    assert (channels, sample_rate, bits) == (2, 24000, 16)
+
+    segments = [seg for _, _, seg in iter_wav_segments(str(path))]
+    out = np.concatenate(segments)
+    expected = 0.5 * np.sin(2 * np.pi * 3000 * np.arange(len(out)) / 48000)
+
+    # Compare away from the file edges, where the filter sees zeros
+    assert len(segments) == 2
+    assert np.abs(out[1000:-1000] - expected[1000:-1000]).max() < 0.01
@@ -1,55 +1,102 @@
-import os
-
 import pandas as pd
 import plotly.express as px
 import streamlit as st
+from aggregation_cache import AggregationCache
 from bird_metadata import render_bird_card
+from data_access import (COUNT_COLUMNS, RAW_COLUMNS, monitor_name, data_version, date_bounds, histogram_column,
+                         load_detections, load_histograms)
 
 st.set_page_config(page_title="Bio-Acoustic Monitor", layout="wide")
 
-DATA_DIR = os.path.join(os.path.dirname(__file__), "streamlit_data")
-monitor_name = "wrangcombe_audio1"
 
+@st.cache_resource
+def aggregation_cache():
+    # Shared by every session: up to 64 MB of panel aggregates
+    return AggregationCache(max_bytes=64 * 1024 * 1024)
+
+
+def detection_counts(version, min_conf, start, end):
+    # Detections per (date, hour, species) at or above min_conf within the
+    # date range; every chart below is a sum over these rows. From the
+    # histograms if available and they have a column for min_conf (no scan of
+    # the detections), else from the selected detections' counting columns.
+    df_hist = load_histograms(version)
+    column = histogram_column(df_hist, min_conf) if df_hist is not None else None
+    if column is not None:
+        in_range = df_hist[(df_hist['file_date'] >= start) & (df_hist['file_date'] <= end)]
+        df_counts = in_range[['file_date', 'hour', 'common_name', 'scientific_name']].assign(
+            count=in_range[column])
+        return df_counts[df_counts['count'] > 0]
+    df_filtered = load_detections(version, tuple(COUNT_COLUMNS), min_conf, start, end)
+    return df_filtered.groupby(['file_date', 'hour', 'common_name', 'scientific_name'],
+                               observed=True).size().reset_index(name='count')
+
+
+def overview_metrics(df_counts):
+    return {
+        'detections': int(df_counts['count'].sum()),
+        'species': df_counts['common_name'].nunique(),
+        'days': df_counts['file_date'].nunique(),
+        'first_day': df_counts['file_date'].min(),
+        'last_day': df_counts['file_date'].max(),
+    }
+
+
+def species_totals(df_counts):
+    # Every species, fewest detections first; the top-N slider takes the tail
+    return df_counts.groupby('common_name', observed=True)['count'].sum().reset_index(name='count').sort_values('count', ascending=True)
 
-@st.cache_data
-def load_data():
-    path = os.path.join(DATA_DIR, monitor_name, "recordings_MASTER.parquet")
-    df = pd.read_parquet(path)
-    df['file_date'] = pd.to_datetime(df['file_date'], format='%Y%m%d')
-    df['hour'] = df['file_time'].astype(str).str.zfill(6).str[:2].astype(int)
-    return df
+
+def scientific_names(df_counts):
+    return df_counts.drop_duplicates('common_name').set_index('common_name')['scientific_name']
+
+
+def hourly_heatmap(df_counts):
+    # Top 15 species by hour, each row scaled to its own busiest hour
+    top_species = df_counts.groupby('common_name', observed=True)['count'].sum().nlargest(15).index
+    df_hourly = df_counts[df_counts['common_name'].isin(top_species)].groupby(['hour', 'common_name'], observed=True)['count'].sum().reset_index(name='count')
+    df_pivot = df_hourly.pivot(index='common_name', columns='hour', values='count').fillna(0)
+    return df_pivot.div(df_pivot.max(axis=1), axis=0).fillna(0)
 
 
 st.title("Bio-Acoustic Monitor Dashboard")
 st.caption(f"Monitor: {monitor_name}")
 
 try:
-    df = load_data()
+    version = data_version()
+    first_day, last_day = date_bounds(version)
 
     # Sidebar filters
     st.sidebar.header("Filters")
     min_conf = st.sidebar.slider("Min Confidence", 0.0, 1.0, 0.9, 0.05)
-    date_range = st.sidebar.date_input("Date Range", [df['file_date'].min(), df['file_date'].max()])
+    date_range = st.sidebar.date_input("Date Range", [first_day, last_day])
 
-    df_filtered = df[
-        (df['confidence'] >= min_conf) &
-        (df['file_date'] >= pd.to_datetime(date_range[0])) &
-        (df['file_date'] <= pd.to_datetime(date_range[1]))
-    ]
+    start, end = pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])
+
+    # Every aggregate is cached per (panel, data version, filters): widgets that
+    # don't change the filters (top N, species pick) re-use them, and going back
+    # to an earlier filter is a cache hit until the parquet files change
+    cache = aggregation_cache()
+    filters = (version, min_conf, start, end)
+    df_counts = cache.get(('counts', *filters), lambda: detection_counts(version, min_conf, start, end))
+
+    def panel(name, build):
+        return cache.get((name, *filters), lambda: build(df_counts))
 
     # Overview metrics
+    metrics = panel('metrics', overview_metrics)
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Total Detections", f"{len(df_filtered):,}")
-    col2.metric("Unique Species", df_filtered['common_name'].nunique())
-    col3.metric("Recording Days", df_filtered['file_date'].nunique())
-    col4.metric("Date Range", f"{df_filtered['file_date'].min().strftime('%d %b')} – {df_filtered['file_date'].max().strftime('%d %b %Y')}")
+    col1.metric("Total Detections", f"{metrics['detections']:,}")
+    col2.metric("Unique Species", metrics['species'])
+    col3.metric("Recording Days", metrics['days'])
+    col4.metric("Date Range", f"{metrics['first_day'].strftime('%d %b')} – {metrics['last_day'].strftime('%d %b %Y')}")
 
     st.divider()
 
     # Top species
     st.subheader("Top Species by Call Count")
     top_n = st.slider("Show top N species", 5, 30, 15)
-    df_species = df_filtered.groupby('common_name').size().reset_index(name='count').sort_values('count', ascending=True).tail(top_n)
+    df_species = panel('species', species_totals).tail(top_n)
     fig = px.bar(df_species, x='count', y='common_name', orientation='h', labels={'count': 'Detections', 'common_name': ''})
     st.plotly_chart(fig, use_container_width=True)
 
@@ -62,34 +109,32 @@ try:
         index=options.index(top_species_default),
     )
     if selected_species:
-        sci_name = df_filtered[df_filtered["common_name"] == selected_species]["scientific_name"].iloc[0]
+        sci_name = panel('scientific_names', scientific_names)[selected_species]
         render_bird_card(sci_name)
 
     # Daily detections
     st.subheader("Daily Detections")
-    df_daily = df_filtered.groupby('file_date').size().reset_index(name='count')
+    df_daily = panel('daily', lambda df: df.groupby('file_date')['count'].sum().reset_index(name='count'))
     fig2 = px.line(df_daily, x='file_date', y='count', labels={'file_date': 'Date', 'count': 'Detections'})
     st.plotly_chart(fig2, use_container_width=True)
 
     # Hourly heatmap
     st.subheader("Hourly Activity by Species")
 
-    df_by_hour = df_filtered.groupby('hour').size().reset_index(name='count')
+    df_by_hour = panel('hourly', lambda df: df.groupby('hour')['count'].sum().reset_index(name='count'))
     fig_hour = px.bar(df_by_hour, x='hour', y='count', labels={'hour': 'Hour of Day', 'count': 'Detections'})
     fig_hour.update_xaxes(tickmode='linear', tick0=0, dtick=1)
     st.plotly_chart(fig_hour, use_container_width=True)
 
-    top_species = df_filtered['common_name'].value_counts().head(15).index
-    df_hourly = df_filtered[df_filtered['common_name'].isin(top_species)].groupby(['hour', 'common_name']).size().reset_index(name='count')
-    df_pivot = df_hourly.pivot(index='common_name', columns='hour', values='count').fillna(0)
-    df_pivot = df_pivot.div(df_pivot.max(axis=1), axis=0).fillna(0)
+    df_pivot = panel('heatmap', hourly_heatmap)
     fig3 = px.imshow(df_pivot, labels={'x': 'Hour of Day', 'y': 'Species', 'color': 'Relative Activity'}, aspect='auto', color_continuous_scale='Viridis')
     fig3.update_xaxes(tickmode='linear', tick0=0, dtick=1)
     st.plotly_chart(fig3, use_container_width=True)
 
     # Raw data
     with st.expander("View raw data"):
-        st.dataframe(df_filtered[['file_date', 'file_time', 'common_name', 'scientific_name', 'confidence', 'file_name']].head(500), use_container_width=True)
+        df_raw = load_detections(version, tuple(RAW_COLUMNS), min_conf, start, end, limit=500)
+        st.dataframe(df_raw, use_container_width=True)
 
 except FileNotFoundError:
     st.error("No data found. Copy recordings_MASTER.parquet into the data/ directory.")
@@ -1,58 +1,194 @@
+import asyncio
 import json
 import os
-from datetime import datetime
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
 
-import requests
 import streamlit as st
 
+from metadata_fetcher import MetadataFetcher
+
+# SQLite store (WAL mode): one row per species, read and written one entry at
+# a time, so concurrent sessions never rewrite each other's entries.
+# bird_metadata.json (the original whole-file cache) is imported once, as a seed.
+STORE_PATH = os.path.join(os.path.dirname(__file__), "bird_metadata.sqlite")
 CACHE_PATH = os.path.join(os.path.dirname(__file__), "bird_metadata.json")
-WIKIPEDIA_API = "https://en.wikipedia.org/api/rest_v1/page/summary/{}"
-USER_AGENT = "BirdAcousticDashboard/1.0 (contact@example.com)"
+
+# Species with no Wikipedia page or thumbnail, and thumbnails that couldn't be
+# downloaded, aren't asked for again for this long
+NEGATIVE_TTL_SECONDS = 7 * 86400
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS species (
+    scientific_name TEXT PRIMARY KEY,
+    entry TEXT,                 -- metadata as JSON; NULL = nothing on Wikipedia
+    fetched_at TEXT NOT NULL,
+    expires_at REAL             -- negative entries: retry after this unix time
+);
+CREATE TABLE IF NOT EXISTS thumbnails (
+    scientific_name TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    content_type TEXT,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS thumbnail_failures (
+    scientific_name TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    expires_at REAL NOT NULL    -- download again after this unix time
+);
+"""
+
+# On-demand lookups while a page renders: one request at a time, one retry
+ON_DEMAND_FETCHER = MetadataFetcher(max_in_flight=1, retries=1)
+
+_init_lock = threading.Lock()
+_initialised = set()
+# One fetch per species at a time in this process; other sessions wait for it
+_fetch_locks = defaultdict(threading.Lock)
+
+
+@contextmanager
+def _connect():
+    # A short-lived connection per call, in one transaction: sqlite3
+    # connections can't be shared between Streamlit's session threads, and
+    # opening one is cheap
+    path = STORE_PATH
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        with _init_lock:
+            if path not in _initialised:
+                conn.execute("PRAGMA journal_mode = WAL")
+                conn.executescript(SCHEMA)
+                _import_json_cache(conn)
+                _initialised.add(path)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _import_json_cache(conn: sqlite3.Connection) -> None:
+    # Entries from the old bird_metadata.json; ones already in the store win.
+    # Anything that isn't a metadata dict (e.g. null for a species with no
+    # page) is skipped, so that species is simply fetched again.
+    if not os.path.exists(CACHE_PATH):
+        return
+    with open(CACHE_PATH, "r") as f:
+        cache = json.load(f)
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO species (scientific_name, entry, fetched_at) VALUES (?, ?, ?)",
+            [(name, json.dumps(entry), entry.get("fetched_at", "")) for name, entry in cache.items()
+             if isinstance(entry, dict)],
+        )
+
+
+def read_entry(scientific_name: str) -> tuple[bool, dict | None]:
+    """
+    (found, entry) for one species. found is False if the species has never
+    been fetched or its negative entry has expired; entry is None for a
+    species known to have no Wikipedia thumbnail.
+    """
+    with _connect() as conn:
+        row = conn.execute("SELECT entry, expires_at FROM species WHERE scientific_name = ?",
+                           (scientific_name,)).fetchone()
+    if row is None:
+        return False, None
+    entry, expires_at = row
+    if entry is None:
+        return (expires_at is None or expires_at > time.time()), None
+    return True, json.loads(entry)
+
+
+def write_entry(scientific_name: str, entry: dict | None, negative_ttl: float = NEGATIVE_TTL_SECONDS) -> None:
+    # One row, in its own transaction; entry None stores a negative entry
+    now = datetime.now(timezone.utc).isoformat()
+    with _connect() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO species (scientific_name, entry, fetched_at, expires_at) VALUES (?, ?, ?, ?)",
+            (scientific_name, json.dumps(entry) if entry else None, entry["fetched_at"] if entry else now,
+             None if entry else time.time() + negative_ttl),
+        )
+
+
+def read_thumbnail(scientific_name: str, url: str) -> bytes | None:
+    with _connect() as conn:
+        row = conn.execute("SELECT data FROM thumbnails WHERE scientific_name = ? AND url = ?",
+                           (scientific_name, url)).fetchone()
+    return row[0] if row else None
 
 
-def _load_cache() -> dict:
-    if os.path.exists(CACHE_PATH):
-        with open(CACHE_PATH, "r") as f:
-            return json.load(f)
-    return {}
+def write_thumbnail(scientific_name: str, url: str, data: bytes, content_type: str | None = None) -> None:
+    with _connect() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO thumbnails (scientific_name, url, content_type, data) VALUES (?, ?, ?, ?)",
+            (scientific_name, url, content_type, data),
+        )
+
+
+def thumbnail_failed(scientific_name: str, url: str) -> bool:
+    # True if downloading this thumbnail failed recently (negative entry)
+    with _connect() as conn:
+        row = conn.execute("SELECT expires_at FROM thumbnail_failures WHERE scientific_name = ? AND url = ?",
+                           (scientific_name, url)).fetchone()
+    return row is not None and row[0] > time.time()
+
+
+def write_thumbnail_failure(scientific_name: str, url: str, negative_ttl: float = NEGATIVE_TTL_SECONDS) -> None:
+    with _connect() as conn:
+        conn.execute("INSERT OR REPLACE INTO thumbnail_failures (scientific_name, url, expires_at) VALUES (?, ?, ?)",
+                     (scientific_name, url, time.time() + negative_ttl))
 
 
-def _save_cache(cache: dict) -> None:
-    with open(CACHE_PATH, "w") as f:
-        json.dump(cache, f, indent=2)
+def checkpoint() -> None:
+    # Folds the WAL back into bird_metadata.sqlite, so the file can be committed on its own
+    with _connect() as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def store_result(scientific_name: str, definitive: bool, entry: dict | None,
+                 thumbnail: tuple[bytes, str | None] | None) -> None:
+    # MetadataFetcher's on_result: each species is stored as soon as it's
+    # fetched; failed requests aren't stored, so they're retried later
+    if not definitive:
+        return
+    write_entry(scientific_name, entry)
+    if entry and thumbnail:
+        write_thumbnail(scientific_name, entry["thumbnail_url"], *thumbnail)
 
 
 @st.cache_data(ttl=86400)
 def get_bird_metadata(scientific_name: str) -> dict | None:
-    cache = _load_cache()
-    if scientific_name in cache:
-        return cache[scientific_name]
-
-    name_underscored = scientific_name.replace(" ", "_")
-    url = WIKIPEDIA_API.format(name_underscored)
-    try:
-        response = requests.get(url, headers={"User-Agent": USER_AGENT}, timeout=10)
-        if response.status_code != 200:
-            return None
-        data = response.json()
-        thumbnail_url = data.get("thumbnail", {}).get("source")
-        if not thumbnail_url:
-            return None
-        entry = {
-            "common_name": data.get("title", scientific_name),
-            "scientific_name": scientific_name,
-            "extract": data.get("extract", ""),
-            "thumbnail_url": thumbnail_url,
-            "wikipedia_url": data.get("content_urls", {}).get("desktop", {}).get("page", ""),
-            "license": "CC BY-SA 3.0",
-            "fetched_at": datetime.utcnow().isoformat(),
-        }
-    except Exception:
-        return None
-
-    cache[scientific_name] = entry
-    _save_cache(cache)
-    return entry
+    found, entry = read_entry(scientific_name)
+    if found:
+        return entry
+
+    with _fetch_locks[scientific_name]:
+        # Another session may have fetched it while this one waited
+        found, entry = read_entry(scientific_name)
+        if found:
+            return entry
+        ON_DEMAND_FETCHER.fetch([scientific_name], store_result)
+        return read_entry(scientific_name)[1]
+
+
+def get_bird_thumbnail(scientific_name: str, url: str) -> bytes | None:
+    # The stored image, fetched and stored first if it isn't there yet. A
+    # failed download is stored as a negative entry, so renders don't wait on
+    # it again until it expires (the card hot-links the URL meanwhile).
+    data = read_thumbnail(scientific_name, url)
+    if data is None and not thumbnail_failed(scientific_name, url):
+        fetched = asyncio.run(ON_DEMAND_FETCHER.fetch_bytes(url))
+        if fetched:
+            write_thumbnail(scientific_name, url, *fetched)
+            data = fetched[0]
+        else:
+            write_thumbnail_failure(scientific_name, url)
+    return data
 
 
 def render_bird_card(scientific_name: str) -> None:
@@ -67,7 +203,8 @@ def render_bird_card(scientific_name: str) -> None:
 
     if thumbnail_url:
         with col_img:
-            st.image(thumbnail_url, width=200)
+            # Served from the store; the remote URL only if it couldn't be downloaded
+            st.image(get_bird_thumbnail(scientific_name, thumbnail_url) or thumbnail_url, width=200)
 
     text_col = col_text if thumbnail_url else col_img
     with text_col:
@@ -0,0 +1,133 @@
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import streamlit as st
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "streamlit_data")
+monitor_name = "wrangcombe_audio1"
+
+# Columns each part of the dashboard reads - nothing else is decoded
+COUNT_COLUMNS = ['file_date', 'hour', 'common_name', 'scientific_name']
+RAW_COLUMNS = ['file_date', 'file_time', 'common_name', 'scientific_name', 'confidence', 'file_name']
+
+
+def _partitions_dir() -> str:
+    return os.path.join(DATA_DIR, "detections", f"monitor={monitor_name}")
+
+
+def data_version() -> tuple:
+    # (path, size, mtime) of every parquet file the dashboard reads. Passed to
+    # each cached loader (and used in the aggregation cache's keys), so
+    # replacing any of them invalidates what was computed from the old ones.
+    # Only stats files - cheap enough to run on every rerun.
+    paths = [os.path.join(DATA_DIR, monitor_name, name)
+             for name in ("recordings_MASTER.parquet", "confidence_histograms.parquet")]
+    for root, _, files in os.walk(_partitions_dir()):
+        paths += [os.path.join(root, f) for f in files if f.endswith(".parquet")]
+    version = []
+    for path in sorted(paths):
+        if os.path.exists(path):
+            st_file = os.stat(path)
+            version.append((path, st_file.st_size, st_file.st_mtime_ns))
+    return tuple(version)
+
+
+@st.cache_resource(max_entries=1)
+def _detections(version: tuple) -> ds.Dataset:
+    # This monitor's partitions of the pipeline's partitioned dataset
+    # (detections/monitor=/year=/month=/date=/) if it has been copied over,
+    # otherwise the single recordings_MASTER.parquet. Only the footers are
+    # read here; rows are read per query, through the filters below.
+    partitions = _partitions_dir()
+    if os.path.isdir(partitions):
+        return ds.dataset(partitions, format="parquet", partitioning="hive")
+    path = os.path.join(DATA_DIR, monitor_name, "recordings_MASTER.parquet")
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    return ds.dataset(path, format="parquet")
+
+
+def _day_value(dataset: ds.Dataset, field: str, day) -> int | str:
+    # A day as `field` stores it: YYYYMMDD text (plain or dictionary), or an
+    # integer (file_date in old files, hive-inferred date partitions)
+    value = pd.Timestamp(day).strftime('%Y%m%d')
+    return int(value) if pa.types.is_integer(dataset.schema.field(field).type) else value
+
+
+def _filter(dataset: ds.Dataset, min_conf: float, start, end) -> ds.Expression:
+    # Pushed down to the reader: the date partitions (if any) prune whole
+    # directories, and row-group statistics on file_date / confidence skip
+    # the row groups with nothing selected
+    expr = pc.field('confidence') >= min_conf
+    for field in ('file_date', 'date'):
+        if field in dataset.schema.names:
+            expr &= ((pc.field(field) >= _day_value(dataset, field, start)) &
+                     (pc.field(field) <= _day_value(dataset, field, end)))
+    return expr
+
+
+@st.cache_data(max_entries=4)
+def date_bounds(version: tuple) -> tuple[pd.Timestamp, pd.Timestamp]:
+    # First and last recording day, from the row-group statistics in the
+    # parquet footers; file_date is only read if a file has no statistics
+    dataset = _detections(version)
+    dates = []
+    for fragment in dataset.get_fragments():
+        stats = [rg.statistics.get('file_date') for rg in fragment.row_groups]
+        if stats and all(stats):
+            dates += [s[k] for s in stats for k in ('min', 'max')]
+        else:
+            dates += fragment.to_table(columns=['file_date']).column('file_date').to_pylist()
+    dates = [str(d) for d in dates if d is not None]
+    return (pd.to_datetime(min(dates), format='%Y%m%d'), pd.to_datetime(max(dates), format='%Y%m%d'))
+
+
+@st.cache_data(max_entries=16)
+def load_detections(version: tuple, columns: tuple[str, ...], min_conf: float, start, end,
+                    limit: int | None = None) -> pd.DataFrame:
+    # Detections with confidence >= min_conf between start and end (inclusive),
+    # with only the given columns; the first `limit` rows if set. Data in
+    # the compact schema carries a precomputed hour; it's only derived from
+    # file_time for older files.
+    dataset = _detections(version)
+    names = dataset.schema.names
+    read = [c for c in columns if c in names]
+    if 'hour' in columns and 'hour' not in names:
+        read.append('file_time')
+    expr = _filter(dataset, min_conf, start, end)
+    table = dataset.head(limit, columns=read, filter=expr) if limit else dataset.to_table(columns=read, filter=expr)
+
+    df = table.to_pandas()
+    if 'file_date' in df.columns:
+        df['file_date'] = pd.to_datetime(df['file_date'].astype(str), format='%Y%m%d')
+    if 'hour' in columns and 'hour' not in names:
+        df['hour'] = df['file_time'].astype(str).str.zfill(6).str[:2].astype(int)
+    return df[list(columns)]
+
+
+@st.cache_data(max_entries=2)
+def load_histograms(version: tuple) -> pd.DataFrame | None:
+    # Cumulative confidence histograms per (date, hour, species), built by the
+    # pipeline (confidence_histograms.parquet): column ge_090 holds the number
+    # of detections with confidence >= 0.90, so a threshold is a column pick.
+    # None if the file hasn't been copied over.
+    path = os.path.join(DATA_DIR, monitor_name, "confidence_histograms.parquet")
+    if not os.path.exists(path):
+        return None
+    df_hist = pd.read_parquet(path)
+    df_hist['file_date'] = pd.to_datetime(df_hist['file_date'].astype(str), format='%Y%m%d')
+    return df_hist
+
+
+def histogram_column(df_hist: pd.DataFrame, min_conf: float) -> str | None:
+    # The histograms column counting detections with confidence >= min_conf
+    # (0.9 -> ge_090), or None if there's none for exactly that threshold (it
+    # falls between the pipeline's bin edges) - then the detections are counted
+    hundredths = min_conf * 100
+    column = f"ge_{round(hundredths):03d}"
+    if abs(hundredths - round(hundredths)) > 1e-6 or column not in df_hist.columns:
+        return None
+    return column
@@ -0,0 +1,142 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+import httpx
+
+WIKIPEDIA_API = "https://en.wikipedia.org/api/rest_v1/page/summary/{}"
+USER_AGENT = "BirdAcousticDashboard/1.0 (contact@example.com)"
+
+# Responses worth asking again for; anything else non-200 is treated as final
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# on_result(scientific_name, definitive, entry, thumbnail): called as soon as
+# each species is done. definitive is False when every attempt failed (nothing
+# should be stored); entry is None when Wikipedia has no page or thumbnail;
+# thumbnail is (bytes, content_type), or None if there is none or it failed.
+OnResult = Callable[[str, bool, dict | None, tuple[bytes, str | None] | None], None]
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average, in bursts of up to `burst`.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def entry_from_summary(scientific_name: str, data: dict) -> dict | None:
+    # The stored metadata from a page summary; None if it has no thumbnail
+    thumbnail_url = data.get("thumbnail", {}).get("source")
+    if not thumbnail_url:
+        return None
+    return {
+        "common_name": data.get("title", scientific_name),
+        "scientific_name": scientific_name,
+        "extract": data.get("extract", ""),
+        "thumbnail_url": thumbnail_url,
+        "wikipedia_url": data.get("content_urls", {}).get("desktop", {}).get("page", ""),
+        "license": "CC BY-SA 3.0",
+        "fetched_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+class MetadataFetcher:
+    """
+    Fetches Wikipedia summaries and thumbnails for many species concurrently:
+    one pooled HTTP client, at most max_in_flight requests open at once, no
+    more than `rate` requests per second (token bucket), and up to `retries`
+    retries per request on network errors, 429s and 5xx, with exponential
+    backoff (Retry-After is honoured). Used by both prefetch_bird_metadata.py
+    and the dashboard's on-demand lookups. api_url can point at a local
+    stand-in server.
+    """
+
+    def __init__(self, rate: float = 5.0, max_in_flight: int = 4, retries: int = 3, backoff: float = 0.5,
+                 timeout: float = 10.0, api_url: str = WIKIPEDIA_API, fetch_thumbnails: bool = True):
+        self.rate = rate
+        self.max_in_flight = max_in_flight
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.api_url = api_url
+        self.fetch_thumbnails = fetch_thumbnails
+
+    async def _get(self, client: httpx.AsyncClient, url: str, limiter: TokenBucket,
+                   in_flight: asyncio.Semaphore) -> httpx.Response | None:
+        # The response (200 or a final error status), or None if every attempt failed
+        for attempt in range(self.retries + 1):
+            await limiter.acquire()
+            try:
+                async with in_flight:
+                    response = await client.get(url)
+            except httpx.HTTPError:
+                response = None
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                return response
+            if attempt == self.retries:
+                return None
+            delay = self.backoff * 2 ** attempt * (1 + random.random() / 2)
+            retry_after = response.headers.get("Retry-After") if response is not None else None
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            await asyncio.sleep(delay)
+
+    async def _fetch_species(self, client, scientific_name, limiter, in_flight, on_result) -> None:
+        response = await self._get(client, self.api_url.format(scientific_name.replace(" ", "_")), limiter, in_flight)
+        if response is None or response.status_code not in (200, 404):
+            definitive, entry = False, None
+        elif response.status_code == 404:
+            definitive, entry = True, None
+        else:
+            try:
+                definitive, entry = True, entry_from_summary(scientific_name, response.json())
+            except ValueError:
+                definitive, entry = False, None
+
+        thumbnail = None
+        if entry and self.fetch_thumbnails:
+            image = await self._get(client, entry["thumbnail_url"], limiter, in_flight)
+            if image is not None and image.status_code == 200:
+                thumbnail = (image.content, image.headers.get("Content-Type"))
+        on_result(scientific_name, definitive, entry, thumbnail)
+
+    async def fetch_many(self, scientific_names: list[str], on_result: OnResult) -> None:
+        limiter = TokenBucket(self.rate, burst=self.max_in_flight)
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+        limits = httpx.Limits(max_connections=self.max_in_flight, max_keepalive_connections=self.max_in_flight)
+        async with httpx.AsyncClient(headers={"User-Agent": USER_AGENT}, timeout=self.timeout, limits=limits,
+                                     follow_redirects=True) as client:
+            await asyncio.gather(*(self._fetch_species(client, name, limiter, in_flight, on_result)
+                                   for name in scientific_names))
+
+    async def fetch_bytes(self, url: str) -> tuple[bytes, str | None] | None:
+        # One file (e.g. a thumbnail not downloaded yet), with the same retries
+        async with httpx.AsyncClient(headers={"User-Agent": USER_AGENT}, timeout=self.timeout,
+                                     follow_redirects=True) as client:
+            response = await self._get(client, url, TokenBucket(self.rate), asyncio.Semaphore(1))
+        if response is None or response.status_code != 200:
+            return None
+        return response.content, response.headers.get("Content-Type")
+
+    def fetch(self, scientific_names: list[str], on_result: OnResult) -> None:
+        # Blocking wrapper, for scripts and Streamlit's (loop-less) session threads
+        asyncio.run(self.fetch_many(scientific_names, on_result))
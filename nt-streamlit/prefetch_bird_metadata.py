@@ -1,56 +1,32 @@
-import time
-from datetime import datetime
-
 import pandas as pd
-import requests
 
-from bird_metadata import CACHE_PATH, USER_AGENT, WIKIPEDIA_API, _load_cache, _save_cache
+from bird_metadata import STORE_PATH, checkpoint, read_entry, store_result
+from metadata_fetcher import MetadataFetcher
 
 PARQUET_PATH = "streamlit_data/wrangcombe_audio1/recordings_MASTER.parquet"
-DELAY_SECONDS = 0.5
-
-
-def fetch_from_wikipedia(scientific_name: str) -> dict | None:
-    name_underscored = scientific_name.replace(" ", "_")
-    url = WIKIPEDIA_API.format(name_underscored)
-    try:
-        response = requests.get(url, headers={"User-Agent": USER_AGENT}, timeout=10)
-        if response.status_code != 200:
-            return None
-        data = response.json()
-        thumbnail_url = data.get("thumbnail", {}).get("source")
-        if not thumbnail_url:
-            return None
-        return {
-            "common_name": data.get("title", scientific_name),
-            "scientific_name": scientific_name,
-            "extract": data.get("extract", ""),
-            "thumbnail_url": thumbnail_url,
-            "wikipedia_url": data.get("content_urls", {}).get("desktop", {}).get("page", ""),
-            "license": "CC BY-SA 3.0",
-            "fetched_at": datetime.utcnow().isoformat(),
-        }
-    except Exception:
-        return None
+# Politeness towards Wikipedia: requests per second, and how many may be open at once
+REQUESTS_PER_SECOND = 5
+MAX_IN_FLIGHT = 4
 
 
 if __name__ == "__main__":
-    df = pd.read_parquet(PARQUET_PATH)
-    scientific_names = df["scientific_name"].dropna().unique().tolist()
-    cache = _load_cache()
+    df = pd.read_parquet(PARQUET_PATH, columns=["scientific_name"])
+    scientific_names = df["scientific_name"].dropna().astype(str).unique().tolist()
 
-    to_fetch = [n for n in scientific_names if n not in cache]
+    to_fetch = [n for n in scientific_names if not read_entry(n)[0]]
     print(f"Found {len(scientific_names)} unique species. {len(to_fetch)} not yet cached.")
 
-    for name in to_fetch:
-        print(f"Fetching {name}...", end=" ", flush=True)
-        entry = fetch_from_wikipedia(name)
-        if entry:
-            cache[name] = entry
-            print("done")
-        else:
-            print("no data")
-        time.sleep(DELAY_SECONDS)
-
-    _save_cache(cache)
-    print(f"\nCache saved to {CACHE_PATH} ({len(cache)} entries total)")
+    done = []
+
+    def on_result(name, definitive, entry, thumbnail):
+        # Stored as soon as it arrives, so an interrupted run keeps its progress
+        store_result(name, definitive, entry, thumbnail)
+        done.append(name)
+        status = "done" if entry else "no data" if definitive else "failed, will retry next run"
+        print(f"[{len(done)}/{len(to_fetch)}] {name}: {status}")
+
+    try:
+        MetadataFetcher(rate=REQUESTS_PER_SECOND, max_in_flight=MAX_IN_FLIGHT).fetch(to_fetch, on_result)
+    finally:
+        checkpoint()
+    print(f"\nStore saved to {STORE_PATH}")
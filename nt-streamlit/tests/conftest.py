@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Add the app folder to path so tests import its modules as the app does
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")))
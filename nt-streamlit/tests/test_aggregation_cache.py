@@ -0,0 +1,73 @@
+import pandas as pd
+
+from aggregation_cache import AggregationCache
+
+
+def counting(value):
+    # A compute function that records how often it runs
+    def compute():
+        compute.calls += 1
+        return value
+    compute.calls = 0
+    return compute
+
+
+def frame(rows):
+    return pd.DataFrame({'count': range(rows)})
+
+
+def test_second_get_is_a_hit():
+    cache = AggregationCache()
+    compute = counting(frame(10))
+
+    first = cache.get(('species', 'v1', 0.9), compute)
+    second = cache.get(('species', 'v1', 0.9), compute)
+
+    assert second is first
+    assert compute.calls == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.nbytes == first.memory_usage(deep=True).sum()
+
+
+def test_least_recently_used_is_evicted_at_the_size_limit():
+    size = int(frame(100).memory_usage(deep=True).sum())
+    cache = AggregationCache(max_bytes=2 * size)
+
+    cache.get('a', counting(frame(100)))
+    cache.get('b', counting(frame(100)))
+    cache.get('a', counting(frame(100)))  # 'a' used again, so 'b' is now the oldest
+    cache.get('c', counting(frame(100)))
+
+    assert len(cache) == 2
+    assert cache.nbytes <= cache.max_bytes
+    compute = counting(frame(100))
+    cache.get('a', compute)
+    cache.get('c', compute)
+    assert compute.calls == 0
+    cache.get('b', compute)
+    assert compute.calls == 1
+
+
+def test_entry_larger_than_the_cache_is_not_kept():
+    cache = AggregationCache(max_bytes=16)
+    compute = counting(frame(1000))
+
+    cache.get('big', compute)
+    cache.get('big', compute)
+
+    assert compute.calls == 2
+    assert len(cache) == 0 and cache.nbytes == 0
+
+
+def test_new_data_version_misses():
+    # The dashboard keys every aggregate on data_access.data_version(), so
+    # replacing a parquet file recomputes rather than serving the old result
+    cache = AggregationCache()
+    old_version = (('recordings_MASTER.parquet', 100, 1),)
+    new_version = (('recordings_MASTER.parquet', 100, 2),)
+
+    assert cache.get(('counts', old_version, 0.9), counting(frame(1))).shape == (1, 1)
+    fresh = cache.get(('counts', new_version, 0.9), counting(frame(3)))
+
+    assert fresh.shape == (3, 1)
+    assert (cache.hits, cache.misses) == (0, 2)
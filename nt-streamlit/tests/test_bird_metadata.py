@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+import bird_metadata
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # A fresh store per test; the JSON seed is only written by tests that need it
+    monkeypatch.setattr(bird_metadata, "STORE_PATH", str(tmp_path / "bird_metadata.sqlite"))
+    monkeypatch.setattr(bird_metadata, "CACHE_PATH", str(tmp_path / "bird_metadata.json"))
+    return tmp_path
+
+
+def entry(name):
+    return {"scientific_name": name, "common_name": name.split()[-1], "thumbnail_url": f"https://img/{name}.jpg",
+            "fetched_at": "2026-01-01T00:00:00"}
+
+
+def test_negative_entries_expire(store):
+    bird_metadata.write_entry("Nullus avis", None)
+    assert bird_metadata.read_entry("Nullus avis") == (True, None)
+
+    bird_metadata.write_entry("Nullus avis", None, negative_ttl=-1)
+    assert bird_metadata.read_entry("Nullus avis") == (False, None)
+
+    bird_metadata.write_entry("Erithacus rubecula", entry("Erithacus rubecula"))
+    assert bird_metadata.read_entry("Erithacus rubecula") == (True, entry("Erithacus rubecula"))
+    assert bird_metadata.read_entry("Never fetched") == (False, None)
+
+
+def test_json_cache_is_imported_once(store, monkeypatch):
+    (store / "bird_metadata.json").write_text(json.dumps({
+        "Erithacus rubecula": entry("Erithacus rubecula"),
+        "Turdus merula": entry("Turdus merula"),
+        "Nullus avis": None,  # legacy entry that isn't a metadata dict
+    }))
+
+    assert bird_metadata.read_entry("Erithacus rubecula") == (True, entry("Erithacus rubecula"))
+    assert bird_metadata.read_entry("Nullus avis") == (False, None)
+
+    # Later writes win over the seed, even when the store is opened again
+    # (a restart: the JSON is read once more, but only fills in missing species)
+    newer = dict(entry("Turdus merula"), common_name="Blackbird")
+    bird_metadata.write_entry("Turdus merula", newer)
+    monkeypatch.setattr(bird_metadata, "_initialised", set())
+    assert bird_metadata.read_entry("Turdus merula") == (True, newer)
+
+
+def test_failed_thumbnail_is_remembered(store, monkeypatch):
+    url = "https://img/Erithacus.jpg"
+    calls = []
+
+    async def fetch_bytes(requested):
+        calls.append(requested)
+        return None
+
+    monkeypatch.setattr(bird_metadata.ON_DEMAND_FETCHER, "fetch_bytes", fetch_bytes)
+
+    assert bird_metadata.get_bird_thumbnail("Erithacus rubecula", url) is None
+    assert bird_metadata.get_bird_thumbnail("Erithacus rubecula", url) is None
+    assert calls == [url]
+
+
+def test_expired_thumbnail_failure_is_retried(store, monkeypatch):
+    url = "https://img/Erithacus.jpg"
+    calls = []
+
+    async def fetch_bytes(requested):
+        calls.append(requested)
+        return b"jpeg bytes", "image/jpeg"
+
+    monkeypatch.setattr(bird_metadata.ON_DEMAND_FETCHER, "fetch_bytes", fetch_bytes)
+    bird_metadata.write_thumbnail_failure("Erithacus rubecula", url, negative_ttl=-1)
+
+    assert bird_metadata.get_bird_thumbnail("Erithacus rubecula", url) == b"jpeg bytes"
+    # Stored now, so no second download
+    assert bird_metadata.get_bird_thumbnail("Erithacus rubecula", url) == b"jpeg bytes"
+    assert calls == [url]
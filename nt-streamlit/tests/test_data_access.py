@@ -0,0 +1,93 @@
+import os
+
+import pandas as pd
+import pytest
+import streamlit as st
+
+import data_access
+
+
+def test_histogram_column_only_for_exact_thresholds():
+    df_hist = pd.DataFrame(columns=['file_date', 'hour', 'common_name', 'scientific_name', 'ge_085', 'ge_090'])
+
+    assert data_access.histogram_column(df_hist, 0.9) == "ge_090"
+    assert data_access.histogram_column(df_hist, 0.85) == "ge_085"
+    # Between the pipeline's bin edges, or a column it didn't write: count the detections instead
+    assert data_access.histogram_column(df_hist, 0.93) is None
+    assert data_access.histogram_column(df_hist, 0.905) is None
+    assert data_access.histogram_column(df_hist, 0.95) is None
+
+
+# Loaders, against a throwaway streamlit_data folder
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_access, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(data_access, "monitor_name", "test_monitor")
+    (tmp_path / "test_monitor").mkdir()
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    yield tmp_path / "test_monitor"
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+
+def write_master(folder, confidences, mtime_ns=None):
+    path = folder / "recordings_MASTER.parquet"
+    pd.DataFrame({
+        'file_date': ['20260301'] * len(confidences),
+        'file_time': ['053000'] * len(confidences),
+        'common_name': ['Robin'] * len(confidences),
+        'scientific_name': ['Erithacus rubecula'] * len(confidences),
+        'confidence': confidences,
+        'file_name': ['a.wav'] * len(confidences),
+    }).to_parquet(path, index=False)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_missing_histograms_fall_back_to_the_master(data_dir):
+    write_master(data_dir, [0.5, 0.9, 0.95])
+    version = data_access.data_version()
+
+    assert data_access.load_histograms(version) is None
+    # No partitions copied over either: read the master, deriving hour from file_time
+    df = data_access.load_detections(version, tuple(data_access.COUNT_COLUMNS), 0.9, '2026-03-01', '2026-03-01')
+    assert len(df) == 2
+    assert list(df.columns) == data_access.COUNT_COLUMNS
+    assert (df['hour'] == 5).all()
+
+
+def test_no_data_at_all_raises(data_dir):
+    with pytest.raises(FileNotFoundError):
+        data_access.load_detections(data_access.data_version(), ('confidence',), 0.0, '2026-03-01', '2026-03-01')
+
+
+def test_replacing_the_master_changes_the_cache_key(data_dir):
+    write_master(data_dir, [0.9], mtime_ns=1_000_000_000)
+    old = data_access.data_version()
+    assert len(data_access.load_detections(old, ('confidence',), 0.0, '2026-03-01', '2026-03-01')) == 1
+
+    # Same size, only the contents and the modification time differ
+    write_master(data_dir, [0.8], mtime_ns=2_000_000_000)
+    new = data_access.data_version()
+    assert new != old
+
+    # Keyed on the old version, the cached result still stands; the new version reads the new file
+    assert data_access.load_detections(old, ('confidence',), 0.0, '2026-03-01', '2026-03-01')['confidence'].tolist() == [0.9]
+    assert data_access.load_detections(new, ('confidence',), 0.0, '2026-03-01', '2026-03-01')['confidence'].tolist() == [0.8]
+
+
+def test_copying_histograms_over_changes_the_version(data_dir):
+    write_master(data_dir, [0.9])
+    before = data_access.data_version()
+    assert data_access.load_histograms(before) is None
+
+    pd.DataFrame({'file_date': ['20260301'], 'hour': [5], 'common_name': ['Robin'],
+                  'scientific_name': ['Erithacus rubecula'], 'ge_090': [1]}).to_parquet(
+        data_dir / "confidence_histograms.parquet", index=False)
+    after = data_access.data_version()
+
+    assert after != before
+    df_hist = data_access.load_histograms(after)
+    assert df_hist['ge_090'].tolist() == [1]
+    assert data_access.histogram_column(df_hist, 0.9) == "ge_090"
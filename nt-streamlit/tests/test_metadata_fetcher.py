@@ -0,0 +1,106 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from metadata_fetcher import MetadataFetcher
+
+
+class StandInWikipedia(BaseHTTPRequestHandler):
+    """
+    Local stand-in for the page summary API and its thumbnails:
+      /summary/Good_species  -> 200 with a thumbnail
+      /summary/Missing_species -> 404
+      /summary/Busy_species  -> 429 (Retry-After: 1) the first time, then 200
+      /summary/Down_species  -> always 503
+      /img/...               -> image bytes
+    Each response is held briefly, so overlapping requests can be counted.
+    """
+    lock = threading.Lock()
+
+    def do_GET(self):
+        server = self.server
+        with self.lock:
+            server.requests.append((self.path, time.monotonic()))
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(0.05)
+            self.respond()
+        finally:
+            with self.lock:
+                server.in_flight -= 1
+
+    def respond(self):
+        name = self.path.rsplit("/", 1)[-1]
+        if self.path.startswith("/img/"):
+            self.send(200, b"jpeg bytes", "image/jpeg")
+        elif name == "Missing_species":
+            self.send(404, b"{}")
+        elif name == "Down_species":
+            self.send(503, b"")
+        elif name == "Busy_species" and sum(p == self.path for p, _ in self.server.requests) == 1:
+            self.send(429, b"", headers={"Retry-After": "1"})
+        else:
+            host, port = self.server.server_address
+            body = {"title": name.replace("_", " ").title(), "extract": "A bird.",
+                    "thumbnail": {"source": f"http://{host}:{port}/img/{name}.jpg"},
+                    "content_urls": {"desktop": {"page": f"https://en.wikipedia.org/wiki/{name}"}}}
+            self.send(200, json.dumps(body).encode())
+
+    def send(self, status, body, content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInWikipedia)
+    server.requests, server.in_flight, server.max_in_flight = [], 0, 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetches_retries_and_caps_requests_in_flight(server):
+    host, port = server.server_address
+    fetcher = MetadataFetcher(rate=100, max_in_flight=2, retries=2, backoff=0.01, timeout=5,
+                              api_url=f"http://{host}:{port}/summary/{{}}")
+    results = {}
+
+    def on_result(name, definitive, entry, thumbnail):
+        results[name] = (definitive, entry, thumbnail)
+
+    fetcher.fetch(["Good species", "Missing species", "Busy species", "Down species"], on_result)
+
+    # 200: entry and its thumbnail
+    definitive, entry, thumbnail = results["Good species"]
+    assert definitive and entry["common_name"] == "Good Species"
+    assert entry["thumbnail_url"].endswith("/img/Good_species.jpg")
+    assert thumbnail == (b"jpeg bytes", "image/jpeg")
+
+    # 404: a final answer with no entry (stored as a negative entry)
+    assert results["Missing species"] == (True, None, None)
+
+    # 429: retried after Retry-After, not the (much shorter) backoff
+    busy = [t for p, t in server.requests if p.endswith("/Busy_species")]
+    assert len(busy) == 2 and busy[1] - busy[0] >= 0.9
+    assert results["Busy species"][0] and results["Busy species"][1] is not None
+
+    # 503 every time: given up after retries, not definitive (so nothing is stored)
+    assert sum(p.endswith("/Down_species") for p, _ in server.requests) == 3
+    assert results["Down species"] == (False, None, None)
+
+    assert server.max_in_flight <= 2
@@ -1,12 +1,17 @@
 import time
 import os
 import glob
+import json
+import hashlib
+import threading
+from collections import OrderedDict
 import pandas as pd
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 
 app = Flask(__name__)
-CORS(app)
+# ETag / X-Total-Count have to be exposed for cross-origin clients to read them
+CORS(app, expose_headers=["ETag", "X-Total-Count"])
 
 # ==========================================
 # 1. DIRECTORY CONFIGURATION
@@ -31,7 +36,196 @@ monitor_name = "wrangcombe_audio1"
 
 
 # ==========================================
-# 2. API ENDPOINTS
+# 2. CACHED, FILTERED RESPONSES
+# ==========================================
+
+# Parsed parquet files, kept until the file changes (size or mtime)
+_tables = {}
+# Serialised responses by (endpoint, source files' versions, query), least
+# recently used dropped first once they hold more than RESPONSE_CACHE_BYTES
+_responses = OrderedDict()
+_responses_bytes = 0
+RESPONSE_CACHE_BYTES = 64 * 1024 * 1024
+_cache_lock = threading.Lock()
+
+
+def file_signature(path):
+    st = os.stat(path)
+    return (path, st.st_size, st.st_mtime_ns)
+
+
+def read_table(path):
+    """Parquet file as a DataFrame, read once per version of the file"""
+    signature = file_signature(path)
+    with _cache_lock:
+        cached = _tables.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    df = pd.read_parquet(path)
+    with _cache_lock:
+        _tables[path] = (signature, df)
+    return df
+
+
+def query_params():
+    """
+    Filters and paging from the query string, normalised so that equivalent
+    requests share a cache entry and an ETag:
+    start_date / end_date (YYYY-MM-DD or YYYYMMDD, inclusive), species
+    (repeated or comma-separated; label, common or scientific name),
+    min_confidence (0-1), limit, offset. Raises ValueError if one is invalid.
+    """
+    args = request.args
+    params = {}
+    for name in ('start_date', 'end_date'):
+        if args.get(name):
+            value = args[name].replace('-', '')
+            if len(value) != 8 or not value.isdigit():
+                raise ValueError(f"{name} must be YYYY-MM-DD or YYYYMMDD")
+            params[name] = value
+    species = {s.strip().lower() for value in args.getlist('species') for s in value.split(',') if s.strip()}
+    if species:
+        params['species'] = tuple(sorted(species))
+    if args.get('min_confidence'):
+        try:
+            value = float(args['min_confidence'])
+        except ValueError:
+            raise ValueError("min_confidence must be a number between 0 and 1")
+        if not 0 <= value <= 1:
+            raise ValueError("min_confidence must be between 0 and 1")
+        params['min_confidence'] = value
+    for name in ('limit', 'offset'):
+        if args.get(name):
+            if not args[name].isdigit():
+                raise ValueError(f"{name} must be a non-negative integer")
+            value = int(args[name])
+            params[name] = value
+    return params
+
+
+def filter_table(df, params):
+    """Rows of a gold table matching the filters; ValueError if it lacks a filter's column"""
+    mask = pd.Series(True, index=df.index)
+    unsupported = []
+
+    if 'start_date' in params or 'end_date' in params:
+        if 'file_date' in df.columns:
+            dates = df['file_date'].astype(str).str.replace('-', '')
+            mask &= dates >= params.get('start_date', '')
+            if 'end_date' in params:
+                mask &= dates <= params['end_date']
+        else:
+            unsupported.append('start_date/end_date')
+
+    if 'species' in params:
+        wanted = set(params['species'])
+        columns = [c for c in ('label', 'common_name', 'scientific_name') if c in df.columns]
+        if not columns:
+            unsupported.append('species')
+        matched = pd.Series(False, index=df.index)
+        for column in columns:
+            values = df[column].astype(str).str.lower()
+            matched |= values.isin(wanted)
+            if column == 'label':
+                # BirdNET labels are "Scientific name_Common Name"
+                parts = values.str.split('_', n=1, expand=True).reindex(columns=[0, 1])
+                matched |= parts[0].isin(wanted) | parts[1].isin(wanted)
+        mask &= matched
+
+    if 'min_confidence' in params:
+        if 'confidence' in df.columns:
+            mask &= df['confidence'] >= params['min_confidence']
+        else:
+            unsupported.append('min_confidence')
+
+    if unsupported:
+        raise ValueError(f"This endpoint can't filter by {', '.join(unsupported)}")
+    return df[mask]
+
+
+def query_cube(cube_path, by, params):
+    """
+    Detection counts per `by` from the detection cube (detection_cube.parquet),
+    which has every filter's column. Counts are by confidence bin, so only
+    a min_confidence on a bin edge (a multiple of the bin width) can be
+    answered exactly - any other is a ValueError (400), not rounded.
+    """
+    watermark_path = os.path.join(os.path.dirname(cube_path), "detection_cube_watermark.json")
+    bin_width = 0.05
+    if os.path.exists(watermark_path):
+        with open(watermark_path) as f:
+            bin_width = json.load(f).get('bin_width', bin_width)
+
+    min_bin = 0
+    if params.get('min_confidence'):
+        edge = params['min_confidence'] / bin_width
+        if abs(edge - round(edge)) > 1e-9:
+            raise ValueError(f"min_confidence must be a multiple of {bin_width:g} (e.g. 0.9, 0.95): "
+                             f"detections are only counted per {bin_width:g} of confidence")
+        min_bin = round(edge)
+
+    df = filter_table(read_table(cube_path), {k: v for k, v in params.items() if k != 'min_confidence'})
+    df = df[df['confidence_bin'] >= min_bin]
+    return df.groupby(by, observed=True)['detections'].sum().reset_index(name='count')
+
+
+def hourly_from_patterns(df):
+    """hourly_activity_patterns rows (file_time, label, count) rolled up to (hour, label, count)"""
+    hours = df['file_time'].astype(str).str.zfill(6).str[:2].astype(int)
+    return df.assign(hour=hours).groupby(['hour', 'label'])['count'].sum().reset_index()
+
+
+def cached_response(endpoint, sources, build):
+    """
+    JSON records from build(params) (a DataFrame), for the current request.
+    - The ETag is a hash of the source files' size/mtime and the query, so a
+      client's If-None-Match is answered with 304 without reading anything
+    - Responses are cached in memory until a source file changes
+    - limit / offset page the rows; X-Total-Count is the count before paging
+    """
+    try:
+        params = query_params()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    key = (endpoint, tuple(file_signature(p) for p in sources), tuple(sorted(params.items())))
+    etag = hashlib.sha1(repr(key).encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    global _responses_bytes
+    with _cache_lock:
+        cached = _responses.get(key)
+        if cached is not None:
+            _responses.move_to_end(key)
+    if cached is None:
+        try:
+            df = build(params)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        offset = params.get('offset', 0)
+        page = df.iloc[offset:offset + params['limit'] if 'limit' in params else None]
+        cached = (page.to_json(orient='records'), len(df))
+        with _cache_lock:
+            if key not in _responses:
+                _responses[key] = cached
+                _responses_bytes += len(cached[0])
+                while _responses_bytes > RESPONSE_CACHE_BYTES and len(_responses) > 1:
+                    _, (body, _) = _responses.popitem(last=False)
+                    _responses_bytes -= len(body)
+
+    body, total = cached
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['X-Total-Count'] = str(total)
+    # Clients may keep it, but must revalidate (cheap: usually a 304)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+# ==========================================
+# 3. API ENDPOINTS
 # ==========================================
 
 @app.route('/api/time')
@@ -56,9 +250,7 @@ def get_bird_summary():
         ])
     
     try:
-        df = pd.read_parquet(DATA_PATH)
-        data = df.to_dict(orient='records')
-        return jsonify(data)
+        return cached_response('summary', [DATA_PATH], lambda params: filter_table(read_table(DATA_PATH), params))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -69,29 +261,41 @@ def get_daily_stats():
     path = os.path.join(ANALYTICS_DATA_DIR, monitor_name, "daily_summary.parquet")
     if not os.path.exists(path):
         return jsonify({"error": f"File not found at: {path}"}), 404
-    
-    df = pd.read_parquet(path)
-    return df.to_json(orient='records')
+
+    return cached_response('daily-stats', [path], lambda params: filter_table(read_table(path), params))
 
 @app.route('/api/species-totals')
 def get_species_totals():
-    """Fetches Total Detections per Species"""
+    """Fetches Total Detections per Species (label, count)"""
+    # From the detection cube when there is one: it can filter by date and
+    # confidence too. species_totals.parquet only knows the species.
+    cube_path = os.path.join(ANALYTICS_DATA_DIR, monitor_name, "detection_cube.parquet")
+    if os.path.exists(cube_path):
+        return cached_response('species-totals', [cube_path],
+                               lambda params: query_cube(cube_path, ['label'], params))
+
     path = os.path.join(ANALYTICS_DATA_DIR, monitor_name, "species_totals.parquet")
     if not os.path.exists(path):
         return jsonify({"error": f"File not found at: {path}"}), 404
-    
-    df = pd.read_parquet(path)
-    return df.to_json(orient='records')
+
+    return cached_response('species-totals', [path], lambda params: filter_table(read_table(path), params))
 
 @app.route('/api/hourly-patterns')
 def get_hourly_activity_patterns():
-    """Fetches Hourly Activity Patterns"""
+    """Fetches Hourly Activity Patterns (hour, label, count)"""
+    # From the detection cube when there is one; otherwise from
+    # hourly_activity_patterns.parquet, whose per-file_time rows are rolled up to the hour
+    cube_path = os.path.join(ANALYTICS_DATA_DIR, monitor_name, "detection_cube.parquet")
+    if os.path.exists(cube_path):
+        return cached_response('hourly-patterns', [cube_path],
+                               lambda params: query_cube(cube_path, ['hour', 'label'], params))
+
     path = os.path.join(ANALYTICS_DATA_DIR, monitor_name, "hourly_activity_patterns.parquet")
     if not os.path.exists(path):
         return jsonify({"error": f"File not found at: {path}"}), 404
-    
-    df = pd.read_parquet(path)
-    return df.to_json(orient='records')
+
+    return cached_response('hourly-patterns', [path],
+                           lambda params: hourly_from_patterns(filter_table(read_table(path), params)))
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000)
\ No newline at end of file